@@ -0,0 +1,68 @@
+from nicegui import app
+from app.db import engine
+from app.maintenance import rehydrate_project
+from app.models import Project
+from app.review import apply_decisions, backfill_task_keys
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from typing import Any, AsyncIterator, IO, List, Tuple
+import asyncio
+import json
+import tempfile
+
+# Decisions per transaction; results are streamed back after each batch
+DECISION_BATCH_SIZE = 5000
+
+# Request bodies above this size are spooled to a temporary file
+SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+async def _spool_body(request: Request) -> IO[bytes]:
+    # The body must be read before the response starts: StreamingResponse
+    # consumes the ASGI receive channel to watch for client disconnects
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+@app.post('/api/projects/{project_id}/decisions')
+async def post_decisions(project_id: int, request: Request):
+    """
+    Records decisions sent as NDJSON, one object per line:
+    {"task_id": 12 | "key": "<Target join key value>", "decision": "Accept Source",
+     "final_data": {...}, "status": "Resolved"}
+    Answers with one NDJSON result per non-blank line, in order:
+    {"line": 1, "task_id": 12, "status": "Resolved"} or {"line": 2, "error": "..."}.
+    """
+    with Session(engine) as session:
+        if not session.get(Project, project_id):
+            return Response("Project not found", status_code=404)
+    await asyncio.to_thread(rehydrate_project, project_id)
+    await asyncio.to_thread(backfill_task_keys, project_id)
+    body = await _spool_body(request)
+
+    async def results() -> AsyncIterator[str]:
+        batch: List[Tuple[int, Any]] = []
+        parse_errors: List[dict] = []
+
+        async def flush() -> str:
+            applied = await asyncio.to_thread(apply_decisions, project_id, batch) if batch else []
+            out = sorted(parse_errors + applied, key=lambda r: r["line"])
+            batch.clear()
+            parse_errors.clear()
+            return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in out)
+
+        with body:
+            for line_no, line in enumerate(body, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append((line_no, json.loads(line)))
+                except ValueError as e:
+                    parse_errors.append({"line": line_no, "error": f"invalid JSON: {e}"})
+                if len(batch) + len(parse_errors) >= DECISION_BATCH_SIZE:
+                    yield await flush()
+            yield await flush()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
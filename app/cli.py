@@ -0,0 +1,344 @@
+"""
+Headless batch mode: the reconciliation pipeline without the web UI.
+
+    reconlab run --name nightly --target target.csv --source source.csv --mapping mapping.json \
+                 --rules rules.json --output result.csv
+    reconlab export 3 result.csv
+
+Also runnable as `python -m app.cli`. The mapping file holds a project's
+mapping_config: {"join_key": {"target": ..., "source": ...}, "field_map": {...}}.
+"""
+from datetime import datetime
+from loguru import logger
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+class CLIError(Exception):
+    """
+    A problem with the inputs; reported without a traceback, exit status 2.
+    """
+
+
+def progress(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def _load_json(path: str, expected: type) -> Any:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise CLIError(f"Cannot read {path}: {e}")
+    if not isinstance(data, expected):
+        raise CLIError(f"{path} must hold a JSON {'object' if expected is dict else 'list'}")
+    return data
+
+
+def _get_project(project_id: int):
+    from app.db import engine
+    from app.models import Project
+    from sqlmodel import Session
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+    if not project:
+        raise CLIError(f"Project {project_id} not found")
+    return project
+
+
+def _check_mapping(mapping: Dict[str, Any], target_cols: List[str], source_cols: Optional[List[str]]) -> None:
+    join_key = mapping.get("join_key", {})
+    if join_key.get("target") not in target_cols:
+        raise CLIError(f"Target join key {join_key.get('target')!r} is not a Target column ({', '.join(target_cols)})")
+    if source_cols is not None and join_key.get("source") not in source_cols:
+        raise CLIError(f"Source join key {join_key.get('source')!r} is not a Source column ({', '.join(source_cols)})")
+    for t_col in mapping.get("field_map", {}):
+        if t_col not in target_cols:
+            raise CLIError(f"Mapped field {t_col!r} is not a Target column")
+
+
+def _ingest(project_id: int, role: str, csv_path: str, args: argparse.Namespace) -> List[str]:
+    from app.duckdb_client import duckdb_client
+    table = duckdb_client.project_table(project_id, role)
+    start = time.perf_counter()
+    columns = duckdb_client.ingest_csv(table, csv_path, delimiter=args.delimiter, encoding=args.encoding,
+                                       skip=args.skip, has_header=not args.no_header)
+    with duckdb_client.tables(table):
+        rows = duckdb_client.query(f"SELECT count(*) FROM {table}")[0][0]
+    progress(f"  {role}: {rows:,} rows, {len(columns)} columns in {time.perf_counter() - start:.1f} s")
+    return columns
+
+
+def create_project(args: argparse.Namespace) -> int:
+    """
+    Creates a project, ingests its CSV files and stores the mapping; returns its id.
+    """
+    from app.db import engine
+    from app.models import Project
+    from app.duckdb_client import duckdb_client
+    from app.maintenance import purge_project
+    from sqlmodel import Session
+
+    mapping = _load_json(args.mapping, dict)
+    mode = "API" if args.api else "CSV"
+    for path in (args.target, args.source):
+        if path and not Path(path).is_file():
+            raise CLIError(f"{path} does not exist")
+    if mode == "CSV" and not args.source:
+        raise CLIError("--source is required unless --api is given")
+    if mode == "API" and args.token:
+        mapping["api_token"] = args.token
+
+    with Session(engine) as session:
+        project = Project(name=args.name, mode=mode, status="Mapping", mapping_config={})
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        project_id = project.id
+        # Table names first, so purge_project finds the files if ingestion or the mapping fails
+        project.target_table_name = duckdb_client.project_table(project_id, "target")
+        if mode == "CSV":
+            project.source_table_name = duckdb_client.project_table(project_id, "source")
+        session.add(project)
+        session.commit()
+    progress(f"Project {project_id} ({args.name}, {mode})")
+
+    progress("Ingesting")
+    try:
+        target_cols = _ingest(project_id, "target", str(Path(args.target).absolute()), args)
+        source_cols = _ingest(project_id, "source", str(Path(args.source).absolute()), args) if mode == "CSV" else None
+        _check_mapping(mapping, target_cols, source_cols)
+    except BaseException:
+        purge_project(project_id)
+        raise
+
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        project.mapping_config = mapping
+        project.status = "Processing"
+        session.add(project)
+        session.commit()
+    return project_id
+
+
+def initialize(project_id: int) -> None:
+    from app.engine import initialize_tasks_csv, initialize_tasks_api_pre, key_issue_counts
+    from app.siret import KEY_ISSUES
+    project = _get_project(project_id)
+    progress("Initializing tasks")
+    start = time.perf_counter()
+    created = initialize_tasks_csv(project_id) if project.mode == "CSV" else initialize_tasks_api_pre(project_id)
+    if created is None:
+        raise RuntimeError("Task initialization failed, see the log above")
+    progress(f"  {created:,} tasks in {time.perf_counter() - start:.1f} s")
+    for issue, count in key_issue_counts(project_id).items():
+        progress(f"  {KEY_ISSUES.get(issue, issue)}: {count:,} tasks, not sent to the API")
+
+
+async def _enrich(project_id: int, token: Optional[str], interval: float, only_failed: bool) -> None:
+    from app.engine import run_api_worker
+    from app.review import count_tasks
+    from app.db import engine
+    from sqlalchemy import text
+
+    def enriched() -> int:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT count(*) FROM reconciliationtask WHERE project_id = :p AND candidate_data IS NOT NULL"),
+                                {"p": project_id}).scalar()
+
+    total = count_tasks(project_id)
+    worker = asyncio.create_task(run_api_worker(project_id, token, only_failed=only_failed))
+    while not worker.done():
+        await asyncio.wait([worker], timeout=interval)
+        progress(f"  {enriched():,}/{total:,} tasks enriched")
+    worker.result()
+
+
+def enrich(project_id: int, token: Optional[str] = None, interval: float = 10, only_failed: bool = False) -> None:
+    from app.engine import list_failures
+    project = _get_project(project_id)
+    if project.mode != "API":
+        progress("Enrichment skipped: not an API project")
+        return
+    progress("Retrying failed Sirene lookups" if only_failed else "Enriching from the Sirene API")
+    token = token or project.mapping_config.get("api_token") or os.getenv("SIRENE_TOKEN")
+    asyncio.run(_enrich(project_id, token, interval, only_failed))
+    failures = list_failures(project_id)
+    if failures:
+        progress(f"  {len(failures):,} SIRETs failed (last: {failures[0].error}); retry with: reconlab enrich {project_id} --failed")
+
+
+def resync(project_id: int, token: Optional[str] = None) -> Dict[str, Any]:
+    from app.engine import resync_project
+    from app.maintenance import rehydrate_project
+    project = _get_project(project_id)
+    rehydrate_project(project_id)
+    token = token or project.mapping_config.get("api_token") or os.getenv("SIRENE_TOKEN")
+    progress("Re-syncing from the Sirene API")
+    try:
+        report = asyncio.run(resync_project(project_id, token))
+    except ValueError as e:
+        raise CLIError(str(e))
+    progress(f"  {report['changed']:,} of {report['sirets']:,} SIRETs changed since {report['since']:%Y-%m-%d %H:%M} "
+             f"({report['queries']:,} queries), {report['reopened']:,} tasks reopened")
+    return report
+
+
+def apply_rules_file(project_id: int, rules_path: str, dry_run: bool = False) -> Dict[str, Any]:
+    from app.rules import apply_rules, validate_rules
+    rules = _load_json(rules_path, list)
+    try:
+        validate_rules(rules, _get_project(project_id).mapping_config.get("field_map", {}))
+    except ValueError as e:
+        raise CLIError(str(e))
+    progress("Applying rules" + (" (dry run)" if dry_run else ""))
+    report = apply_rules(project_id, rules, dry_run=dry_run)
+    progress(f"  {report['matched']:,} of {report['pending']:,} pending tasks matched, {report['applied']:,} resolved")
+    return report
+
+
+def export(project_id: int, output: str, delta: bool = False, since: Optional[str] = None) -> int:
+    from app.export import write_export, write_delta_export
+    from app.maintenance import rehydrate_project
+    _get_project(project_id)
+    rehydrate_project(project_id)
+    try:
+        since_dt = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        raise CLIError(f"--since must be an ISO timestamp, got {since!r}")
+    progress(f"Exporting {'changes' if delta else 'rows'} to {output}")
+    start = time.perf_counter()
+    # Written next to the destination and renamed, so a failed run never leaves half a file
+    tmp = Path(output).with_name(Path(output).name + ".part")
+    try:
+        with tmp.open("w", encoding="utf-8", newline="") as f:
+            rows = write_delta_export(project_id, f, since_dt) if delta else write_export(project_id, f)
+        tmp.replace(output)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    progress(f"  {rows:,} rows in {time.perf_counter() - start:.1f} s")
+    return rows
+
+
+def list_projects() -> None:
+    from app.db import engine
+    from app.models import Project
+    from app.review import count_tasks
+    from sqlmodel import Session, select
+    with Session(engine) as session:
+        for p in session.exec(select(Project).order_by(Project.id)):
+            print(f"{p.id}\t{p.name}\t{p.mode}\t{p.status}\t{count_tasks(p.id)} tasks\t{count_tasks(p.id, status='Pending')} pending")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="reconlab", description=__doc__.splitlines()[1])
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the application log")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_create_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--name", required=True)
+        p.add_argument("--target", required=True, help="Target CSV file")
+        p.add_argument("--source", help="Source CSV file (CSV mode)")
+        p.add_argument("--api", action="store_true", help="Enrich from the Sirene API instead of a Source file")
+        p.add_argument("--token", help="Sirene API token (default: SIRENE_TOKEN)")
+        p.add_argument("--mapping", required=True, help="Mapping JSON: join_key, field_map, projection")
+        p.add_argument("--delimiter", help="CSV delimiter (default: auto-detect)")
+        p.add_argument("--encoding", help="CSV encoding (default: auto-detect)")
+        p.add_argument("--skip", type=int, default=0, help="Rows to skip at the start of each CSV")
+        p.add_argument("--no-header", action="store_true", help="The CSV files have no header row")
+
+    run = sub.add_parser("run", help="Create, ingest, initialize, enrich, apply rules and export in one go")
+    add_create_args(run)
+    run.add_argument("--rules", help="Rules JSON list, applied after initialization")
+    run.add_argument("--output", help="Export the result to this CSV file")
+
+    create = sub.add_parser("create", help="Create a project and ingest its files")
+    add_create_args(create)
+
+    for name, help_text in (("init", "Initialize the tasks of a project"), ("enrich", "Fetch Sirene candidates of an API project"),
+                            ("resync", "Refresh an API project from Sirene, reopening tasks whose data changed")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("project_id", type=int)
+        if name != "init":
+            p.add_argument("--token", help="Sirene API token (default: the project's, then SIRENE_TOKEN)")
+        if name == "enrich":
+            p.add_argument("--failed", action="store_true", help="Only retry the SIRETs whose lookup failed")
+
+    rules = sub.add_parser("rules", help="Apply decision rules to the pending tasks of a project")
+    rules.add_argument("project_id", type=int)
+    rules.add_argument("rules_file")
+    rules.add_argument("--dry-run", action="store_true", help="Only count the tasks each rule would change")
+
+    exp = sub.add_parser("export", help="Export a project to CSV")
+    exp.add_argument("project_id", type=int)
+    exp.add_argument("output")
+    exp.add_argument("--delta", action="store_true", help="Only the changed fields: one row per task and field")
+    exp.add_argument("--since", help="With --delta, only decisions made since this ISO timestamp (UTC)")
+
+    sub.add_parser("list", help="List the projects")
+    return parser
+
+
+def run(args: argparse.Namespace) -> None:
+    from app.db import create_db_and_tables
+    import app.models  # Registers the tables with SQLModel
+    create_db_and_tables()
+
+    if args.command in ("run", "create"):
+        project_id = create_project(args)
+        if args.command == "run":
+            initialize(project_id)
+            enrich(project_id, args.token)
+            if args.rules:
+                apply_rules_file(project_id, args.rules)
+            if args.output:
+                export(project_id, args.output)
+        print(project_id)
+    elif args.command == "init":
+        initialize(args.project_id)
+    elif args.command == "enrich":
+        enrich(args.project_id, args.token, only_failed=args.failed)
+    elif args.command == "resync":
+        resync(args.project_id, args.token)
+    elif args.command == "rules":
+        apply_rules_file(args.project_id, args.rules_file, dry_run=args.dry_run)
+    elif args.command == "export":
+        export(args.project_id, args.output, delta=args.delta, since=args.since)
+    elif args.command == "list":
+        list_projects()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "WARNING")
+    start = time.perf_counter()
+    try:
+        run(args)
+    except CLIError as e:
+        progress(f"error: {e}")
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        progress("interrupted")
+        return EXIT_FAILED
+    except Exception as e:
+        if args.verbose:
+            logger.exception(e)
+        progress(f"failed: {e}")
+        return EXIT_FAILED
+    progress(f"Done in {time.perf_counter() - start:.1f} s")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+from sqlalchemy.types import TypeDecorator, LargeBinary
+from typing import Dict, Any, Optional, Iterable, Union
+import json
+import struct
+import threading
+import zlib
+
+# Blob layout: version byte, dictionary id (uint32, 0 = none), raw deflate stream
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">BI")
+COMPRESSION_LEVEL = 6
+
+# Key dictionaries, by id and by the exact key set they were built for
+_dictionaries: Dict[int, bytes] = {}
+_by_keyset: Dict[frozenset, int] = {}
+_lock = threading.Lock()
+
+
+def build_dictionary(keys: Iterable[str]) -> bytes:
+    """
+    Preset deflate dictionary for rows with these keys: each key as it
+    appears in compact JSON, so key names compress to back-references.
+    """
+    return b"".join(json.dumps(k).encode("utf-8") + b":" for k in keys)
+
+
+def dictionary_id(zdict: bytes) -> int:
+    return zlib.crc32(zdict) or 1
+
+
+def register_dictionary(keys: Iterable[str]) -> int:
+    """
+    Makes a key dictionary available to encode rows with exactly these keys.
+    Returns its id; callers persist it (see engine.register_task_keys) so other
+    processes can decode.
+    """
+    keys = list(keys)
+    zdict = build_dictionary(keys)
+    dict_id = dictionary_id(zdict)
+    with _lock:
+        _dictionaries[dict_id] = zdict
+        _by_keyset[frozenset(keys)] = dict_id
+    return dict_id
+
+
+def load_dictionary(dict_id: int, keys: Iterable[str]) -> None:
+    """
+    Adds a persisted dictionary to the process cache.
+    """
+    keys = list(keys)
+    with _lock:
+        _dictionaries[dict_id] = build_dictionary(keys)
+        _by_keyset.setdefault(frozenset(keys), dict_id)
+
+
+def _get_dictionary(dict_id: int) -> bytes:
+    zdict = _dictionaries.get(dict_id)
+    if zdict is None:
+        # Registered by another process: read it from the metadata database
+        from app.db import engine
+        from app.models import CodecDictionary
+        from sqlmodel import Session
+        with Session(engine) as session:
+            row = session.get(CodecDictionary, dict_id)
+            if row is None:
+                raise ValueError(f"Unknown codec dictionary {dict_id}")
+            load_dictionary(row.id, json.loads(row.key_list))
+        zdict = _dictionaries[dict_id]
+    return zdict
+
+
+def encode(value: Any) -> bytes:
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    dict_id = _by_keyset.get(frozenset(value), 0) if isinstance(value, dict) else 0
+
+    if dict_id:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=_dictionaries[dict_id])
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+    return HEADER.pack(FORMAT_VERSION, dict_id) + compressor.compress(raw) + compressor.flush()
+
+
+def decode_text(blob: Union[bytes, str]) -> str:
+    """
+    JSON text of a stored value. Rows written before the codec hold plain JSON text.
+    """
+    if isinstance(blob, str):
+        return blob
+    version, dict_id = HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported codec version {version}")
+
+    if dict_id:
+        decompressor = zlib.decompressobj(-15, zdict=_get_dictionary(dict_id))
+    else:
+        decompressor = zlib.decompressobj(-15)
+    return (decompressor.decompress(blob[HEADER.size:]) + decompressor.flush()).decode("utf-8")
+
+
+def decode(blob: Union[bytes, str]) -> Any:
+    return json.loads(decode_text(blob))
+
+
+class CompactJSON(TypeDecorator):
+    """
+    Drop-in replacement for the JSON column type storing deflate-compressed
+    JSON with per-project key dictionaries. None is stored as SQL NULL.
+    In raw SQL, read these columns through rl_json() and write through rl_pack().
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[Any], dialect) -> Optional[bytes]:
+        return None if value is None else encode(value)
+
+    def process_result_value(self, value: Optional[Union[bytes, str]], dialect) -> Optional[Any]:
+        return None if value is None else decode(value)
+
+
+def sql_json(blob: Optional[Union[bytes, str]]) -> Optional[str]:
+    """
+    rl_json(column): JSON text of a stored value, for SQLite JSON functions.
+    """
+    return None if blob is None else decode_text(blob)
+
+
+def sql_pack(json_text: Optional[str]) -> Optional[bytes]:
+    """
+    rl_pack(json): stored form of a JSON text built in SQL.
+    """
+    if json_text is None:
+        return None
+    value = json.loads(json_text)
+    return None if value is None else encode(value)
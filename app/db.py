@@ -1,6 +1,12 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import inspect, text, event
+from sqlalchemy.engine import Engine
+from app.codec import sql_json, sql_pack
+from app import query_log  # Registers the slow-query listeners on every engine
+from loguru import logger
 from pathlib import Path
 import os
+import sqlite3
 
 # SQLite Database for Metadata
 DB_FILE = Path(os.getenv("SQLITE_FILE", "reconlab.db"))
@@ -9,8 +15,90 @@ sqlite_url = f"sqlite:///{DB_FILE}"
 connect_args = {"check_same_thread": False}
 engine = create_engine(sqlite_url, echo=False, connect_args=connect_args)
 
+@event.listens_for(Engine, "connect")
+def register_sql_functions(dbapi_connection, connection_record) -> None:
+    """
+    Task JSON columns are stored compressed (app.codec): raw SQL reads them
+    through rl_json() and writes them through rl_pack().
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("rl_json", 1, sql_json, deterministic=True)
+        dbapi_connection.create_function("rl_pack", 1, sql_pack)
+
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Lets app.maintenance free pages online; only takes effect on a new
+        # database, existing ones are converted by compact_sqlite
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        SQLModel.metadata.create_all(conn)
+    upgrade_schema(engine)
+    create_search_index(engine)
+
+# Indexes no longer declared on the models, dropped from existing databases
+OBSOLETE_INDEXES = ["ix_task_project_status_lease"]
+
+def upgrade_schema(db_engine) -> None:
+    """
+    Adds columns and indexes introduced after a table was first created, and
+    drops those replaced since. create_all only creates missing tables; new
+    columns are always nullable, so SQLite's ALTER TABLE ADD COLUMN is enough.
+    """
+    inspector = inspect(db_engine)
+    with db_engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=db_engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def _search_text(row: str) -> str:
+    # Every value of the Target and Source payloads, space separated
+    return " || ' ' || ".join(
+        f"coalesce((SELECT group_concat(value, ' ') FROM json_each(rl_json({row}.{column}))), '')"
+        for column in ("target_data", "candidate_data")
+    )
+
+# Full-text index of the Target and Source payloads (see app.search). Decisions only
+# write final_data, so they never touch it. Contentless: only the index is stored,
+# so deleting an entry takes the indexed text again, rebuilt from the old row.
+# The triggers need rl_json, registered on every engine above.
+SEARCH_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_insert AFTER INSERT ON reconciliationtask BEGIN
+        INSERT INTO task_search (rowid, project, body) VALUES (new.id, new.project_id, {_search_text("new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_delete AFTER DELETE ON reconciliationtask BEGIN
+        INSERT INTO task_search (task_search, rowid, project, body) VALUES ('delete', old.id, old.project_id, {_search_text("old")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_update AFTER UPDATE OF target_data, candidate_data ON reconciliationtask
+    WHEN old.target_data IS NOT new.target_data OR old.candidate_data IS NOT new.candidate_data BEGIN
+        INSERT INTO task_search (task_search, rowid, project, body) VALUES ('delete', old.id, old.project_id, {_search_text("old")});
+        INSERT INTO task_search (rowid, project, body) VALUES (new.id, new.project_id, {_search_text("new")});
+    END""",
+]
+
+def create_search_index(db_engine) -> None:
+    """
+    Creates the task_search FTS5 table and the triggers keeping it in sync with
+    every task write. Tasks created before the index existed are indexed once.
+    """
+    with db_engine.begin() as conn:
+        exists = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'task_search'").first()
+        if not exists:
+            conn.exec_driver_sql("CREATE VIRTUAL TABLE task_search USING fts5("
+                                 "project, body, content='', tokenize='unicode61 remove_diacritics 2')")
+            indexed = conn.exec_driver_sql(f"""
+                INSERT INTO task_search (rowid, project, body)
+                SELECT id, project_id, {_search_text("reconciliationtask")} FROM reconciliationtask
+            """).rowcount
+            if indexed:
+                logger.info(f"Indexed {indexed} existing tasks for search")
+        for trigger in SEARCH_TRIGGERS:
+            conn.exec_driver_sql(trigger)
 
 def get_session():
     with Session(engine) as session:
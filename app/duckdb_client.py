@@ -1,44 +1,204 @@
 import duckdb
 from pathlib import Path
 from loguru import logger
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
+from contextlib import contextmanager
 import os
+import threading
+import time
+from app.metrics import INGEST_ROWS, INGEST_BYTES, INGEST_SECONDS
+from app import query_log
 
 DUCKDB_FILE = Path(os.getenv("DUCKDB_FILE", "reconlab.duckdb"))
 
+# One DuckDB file per project, attached on demand
+DUCKDB_PROJECTS_DIR = Path(os.getenv("DUCKDB_PROJECTS_DIR", "data/projects"))
+
 class DuckDBClient:
-    def __init__(self):
-        self.conn = duckdb.connect(str(DUCKDB_FILE))
-        logger.info(f"Connected to DuckDB at {DUCKDB_FILE}")
+    def __init__(self, db_path: Optional[str] = None, projects_dir: Optional[Path] = None):
+        db_path = db_path or str(DUCKDB_FILE)
+        self.conn = duckdb.connect(db_path)
+        self.projects_dir = Path(projects_dir or DUCKDB_PROJECTS_DIR)
+        logger.info(f"Connected to DuckDB at {db_path}")
+
+        # Attached project catalogs: name -> {"in_use": int, "last_used": float}
+        self._attached: Dict[str, Dict[str, Any]] = {}
+        self._attach_lock = threading.Lock()
+
+    # --- Per-project databases ---
+
+    def project_table(self, project_id: int, role: str) -> str:
+        """
+        Qualified name of a project table, e.g. "proj_3.target".
+        """
+        return f"proj_{project_id}.{role}"
+
+    def project_db_path(self, catalog: str) -> Path:
+        return self.projects_dir / f"{catalog}.duckdb"
+
+    @staticmethod
+    def _catalog(table_name: Optional[str]) -> Optional[str]:
+        # Tables of projects created before per-project files are unqualified
+        if table_name and "." in table_name:
+            return table_name.split(".", 1)[0]
+        return None
+
+    def tables(self, *table_names: Optional[str]):
+        """
+        Keeps the project databases holding these tables attached while in use.
+        """
+        return self.attached(*(c for c in map(self._catalog, table_names) if c))
+
+    @contextmanager
+    def attached(self, *catalogs: str) -> Iterator[None]:
+        catalogs = set(catalogs)
+        with self._attach_lock:
+            for catalog in catalogs:
+                if catalog not in self._attached:
+                    path = self.project_db_path(catalog)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    self.conn.execute(f"ATTACH IF NOT EXISTS '{path.as_posix()}' AS {catalog}")
+                    self._attached[catalog] = {"in_use": 0, "last_used": time.monotonic()}
+                    logger.info(f"Attached {path} as {catalog}")
+                self._attached[catalog]["in_use"] += 1
+        try:
+            yield
+        finally:
+            with self._attach_lock:
+                for catalog in catalogs:
+                    self._attached[catalog]["in_use"] -= 1
+                    self._attached[catalog]["last_used"] = time.monotonic()
+
+    def detach_idle(self, max_idle_seconds: float = 300) -> List[str]:
+        """
+        Detaches the project databases unused for `max_idle_seconds`.
+        """
+        detached = []
+        now = time.monotonic()
+        with self._attach_lock:
+            for catalog, usage in list(self._attached.items()):
+                if usage["in_use"] == 0 and now - usage["last_used"] >= max_idle_seconds:
+                    self.conn.execute(f"DETACH {catalog}")
+                    del self._attached[catalog]
+                    detached.append(catalog)
+        if detached:
+            logger.info(f"Detached idle project databases: {', '.join(detached)}")
+        return detached
+
+    def drop_project_tables(self, *table_names: Optional[str]) -> None:
+        """
+        Deletes project data: per-project files are detached and unlinked,
+        which gives the space back; legacy tables are dropped.
+        """
+        for table_name in table_names:
+            catalog = self._catalog(table_name)
+            if not catalog:
+                if table_name:
+                    self.drop_table(table_name)
+                continue
+            with self._attach_lock:
+                if catalog in self._attached:
+                    self.conn.execute(f"DETACH {catalog}")
+                    del self._attached[catalog]
+            path = self.project_db_path(catalog)
+            for file in (path, path.with_name(path.name + ".wal")):
+                if file.exists():
+                    file.unlink()
+                    logger.info(f"Deleted {file}")
+
+    def project_catalogs(self) -> List[str]:
+        """
+        Catalog names of the project databases on disk, attached or not.
+        """
+        if not self.projects_dir.exists():
+            return []
+        return sorted(p.stem for p in self.projects_dir.glob("proj_*.duckdb"))
+
+    def checkpoint(self, catalog: Optional[str] = None) -> None:
+        """
+        Folds the WAL into the database file (the main one, or a project's).
+        """
+        if catalog is None:
+            self.conn.execute("CHECKPOINT")
+            return
+        with self.attached(catalog):
+            self.conn.execute(f"CHECKPOINT {catalog}")
+
+    def rewrite_project_database(self, catalog: str) -> int:
+        """
+        Copies a project database into a fresh file and swaps it in, which
+        drops the blocks left free by deleted tables. Returns bytes saved.
+        Skipped (returns 0) while the database is in use.
+        """
+        path = self.project_db_path(catalog)
+        if not path.exists():
+            return 0
+        tmp_path = path.with_name(path.name + ".rewrite")
+        before = path.stat().st_size
+
+        with self._attach_lock:
+            usage = self._attached.get(catalog)
+            if usage and usage["in_use"]:
+                logger.info(f"{catalog} is in use, rewrite skipped")
+                return 0
+            if usage is None:
+                self.conn.execute(f"ATTACH '{path.as_posix()}' AS {catalog}")
+            tmp_path.unlink(missing_ok=True)
+            self.conn.execute(f"ATTACH '{tmp_path.as_posix()}' AS {catalog}_rewrite")
+            error = None
+            try:
+                self.conn.execute(f"COPY FROM DATABASE {catalog} TO {catalog}_rewrite")
+            except Exception as e:
+                error = e
+            self.conn.execute(f"DETACH {catalog}_rewrite")
+            self.conn.execute(f"DETACH {catalog}")
+            self._attached.pop(catalog, None)
+            if error:
+                tmp_path.unlink(missing_ok=True)
+                raise error
+            tmp_path.replace(path)
+
+        saved = before - path.stat().st_size
+        logger.info(f"Rewrote {path}, {saved} bytes saved")
+        return saved
+
+    # --- Tables ---
 
     def ingest_csv(self, table_name: str, csv_path: str, delimiter: str = None, encoding: str = None, skip: int = None, has_header: bool = None):
         """
         Ingests a CSV file into a DuckDB table using read_csv_auto.
+        Runs on its own cursor, so ingests into different projects can run in parallel threads.
         """
         try:
-            # Drop table if exists
-            self.conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-
-            # Build options string
-            options = ["auto_detect=True", "normalize_names=True"]
-            if delimiter:
-                options.append(f"delim='{delimiter}'")
-            if encoding:
-                options.append(f"encoding='{encoding}'")
-            if skip is not None:
-                options.append(f"skip={skip}")
-            if has_header is not None:
-                options.append(f"header={str(has_header).lower()}")
-
-            options_str = ", ".join(options)
-
-            # Create table and insert data
-            query = f"""
-            CREATE TABLE {table_name} AS
-            SELECT * FROM read_csv('{csv_path}', {options_str})
-            """
-            self.conn.execute(query)
-            logger.info(f"Successfully ingested {csv_path} into {table_name}")
+            with self.tables(table_name), self.conn.cursor() as cursor:
+                # Drop table if exists
+                cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+
+                # Build options string
+                options = ["auto_detect=True", "normalize_names=True"]
+                if delimiter:
+                    options.append(f"delim='{delimiter}'")
+                if encoding:
+                    options.append(f"encoding='{encoding}'")
+                if skip is not None:
+                    options.append(f"skip={skip}")
+                if has_header is not None:
+                    options.append(f"header={str(has_header).lower()}")
+
+                options_str = ", ".join(options)
+
+                # Create table and insert data
+                query = f"""
+                CREATE TABLE {table_name} AS
+                SELECT * FROM read_csv('{csv_path}', {options_str})
+                """
+                start = time.perf_counter()
+                cursor.execute(query)
+                rows = cursor.execute(f"SELECT count(*) FROM {table_name}").fetchone()[0]
+                INGEST_SECONDS.observe(time.perf_counter() - start, table=table_name)
+                INGEST_ROWS.inc(rows, table=table_name)
+                INGEST_BYTES.inc(os.path.getsize(csv_path), table=table_name)
+                logger.info(f"Successfully ingested {csv_path} into {table_name} ({rows} rows)")
 
             # Return column names
             return self.get_columns(table_name)
@@ -53,15 +213,17 @@ class DuckDBClient:
             # return [row[1] for row in result]
 
             # Using DESCRIBE is also possible, or LIMIT 0
-            df = self.conn.execute(f"SELECT * FROM {table_name} LIMIT 0").df()
-            return list(df.columns)
+            with self.tables(table_name), self.conn.cursor() as cursor:
+                cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
+                return [col[0] for col in cursor.description]
         except Exception as e:
              logger.error(f"Failed to get columns for {table_name}: {e}")
              return []
 
     def drop_table(self, table_name: str):
         try:
-            self.conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+            with self.tables(table_name), self.conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
             logger.info(f"Dropped table {table_name}")
         except Exception as e:
             logger.error(f"Failed to drop table {table_name}: {e}")
@@ -69,33 +231,79 @@ class DuckDBClient:
     def query(self, query: str, params: Optional[List[Any]] = None) -> List[Any]:
         """
         Executes a raw query and returns the result.
+        Project tables must be attached by the caller, see tables().
         """
         try:
-            if params:
-                return self.conn.execute(query, params).fetchall()
-            else:
-                return self.conn.execute(query).fetchall()
+            with self.conn.cursor() as cursor:
+                start = time.perf_counter()
+                if params:
+                    rows = cursor.execute(query, params).fetchall()
+                else:
+                    rows = cursor.execute(query).fetchall()
+                query_log.log_duckdb(cursor, query, params, time.perf_counter() - start)
+                return rows
         except Exception as e:
             logger.error(f"Query failed: {query} Error: {e}")
             raise e
 
+    def query_batches(self, query: str, params: Optional[List[Any]] = None, batch_size: int = 10000) -> Iterator[List[Dict]]:
+        """
+        Like query_as_dict, but yields the rows batch by batch so results larger
+        than memory can be consumed. Project tables must be attached by the caller.
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, params or None)
+            columns = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+
     def query_as_dict(self, query: str, params: Optional[List[Any]] = None) -> List[Dict]:
         """
         Executes a query and returns list of dicts.
+        Project tables must be attached by the caller, see tables().
         """
         try:
-            if params:
-                df = self.conn.execute(query, params).df()
-            else:
-                df = self.conn.execute(query).df()
-
-            # Convert NaN to None for JSON compatibility if needed,
-            # though SQLModel/JSON handling might prefer native types.
-            # For now, just to_dict
-            return df.to_dict(orient='records')
+            with self.conn.cursor() as cursor:
+                start = time.perf_counter()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                # Plain tuples rather than .df(): no pandas import, and NULLs stay None
+                columns = [col[0] for col in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                query_log.log_duckdb(cursor, query, params, time.perf_counter() - start)
+            return rows
         except Exception as e:
             logger.error(f"Query failed: {query} Error: {e}")
             raise e
 
+class LazyDuckDBClient:
+    """
+    Stands in for the global DuckDBClient and opens it on first use, so
+    importing the app (pages, tests, benchmarks) does not open the DuckDB file.
+    """
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._client: Optional[DuckDBClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def get(self) -> DuckDBClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = DuckDBClient(**self._kwargs)
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
 # Global instance
-duckdb_client = DuckDBClient()
+duckdb_client = LazyDuckDBClient()
@@ -1,25 +1,226 @@
-from sqlmodel import Session, select, or_
+from sqlmodel import Session, select, or_, and_, func
 from sqlalchemy import cast, String
-from app.models import Project, ReconciliationTask
+from app.models import Project, ReconciliationTask, CodecDictionary, SireneFailure, utc_now
 from app.db import engine
 from app.duckdb_client import duckdb_client
-from app.sirene import SireneClient, RateLimitExceeded
+from app.sirene import SireneClient, RateLimitExceeded, SireneError
+from app.raw_store import save_raw_response, load_raw_responses
+from app.codec import register_dictionary
+from app.siret import normalized_sql, issue_sql
+from app.metrics import TASK_INIT_ROWS, TASK_INIT_SECONDS, TASK_INIT_RATE
 from loguru import logger
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+from datetime import timedelta
 import json
 import asyncio
 import os
+import time
 
-def initialize_tasks_csv(project_id: int) -> None:
+def compute_diff(target_data: Dict, candidate_data: Optional[Dict], field_map: Dict[str, str]) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Counts the mapped fields where the Source value disagrees with the Target,
+    compared as text like the validation card highlights them.
+    Returns (None, None) while the candidate is not known yet.
+    """
+    if candidate_data is None:
+        return None, None
+
+    fields = []
+    for t_col, s_col in field_map.items():
+        s_val = candidate_data.get(s_col)
+        if s_val is not None and str(s_val) != str(target_data.get(t_col)):
+            fields.append(t_col)
+
+    return len(fields), ("|" + "|".join(fields) + "|") if fields else ""
+
+
+def apply_candidate(task: ReconciliationTask, candidate_data: Optional[Dict], field_map: Dict[str, str]) -> None:
+    """
+    Sets the candidate of a task and keeps its diff columns in sync.
+    """
+    task.candidate_data = candidate_data
+    task.diff_count, task.diff_fields = compute_diff(task.target_data, candidate_data, field_map)
+
+
+def register_task_keys(session: Session, keys: List[str]) -> None:
+    """
+    Registers the codec key dictionary for task payloads with exactly these
+    keys (see app.codec) and stores it with the session's next commit.
+    """
+    if not keys:
+        return
+    dict_id = register_dictionary(keys)
+    session.merge(CodecDictionary(id=dict_id, key_list=json.dumps(keys)))
+
+
+def candidate_from_raw(client: SireneClient, raw: Dict[str, Any], mapping: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flattens a raw Sirene document into candidate data. With the "projection"
+    option only the mapped Source fields and the identifiers are kept.
+    """
+    flat = client.flatten_json(raw)
+    if mapping.get("projection"):
+        return client.project_fields(flat, mapping.get("field_map", {}).values())
+    return flat
+
+
+async def fetch_candidate(client: SireneClient, siret: str, mapping: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Fetches one establishment, keeps the raw document in the side store and
+    returns its candidate data. Returns None if not found.
+    Raises RateLimitExceeded if HTTP 429 is encountered, SireneError if the lookup failed.
+    """
+    raw = await client.fetch_siret(siret)
+    if raw is None:
+        return None
+    save_raw_response(siret, raw)
+    return candidate_from_raw(client, raw, mapping)
+
+
+def store_candidate(project_id: int, siret: str, candidate: Optional[Dict[str, Any]], field_map: Dict[str, str],
+                    task_ids: Iterable[int] = ()) -> int:
+    """
+    Applies a fetched candidate ({} when not found) to the given tasks and to
+    every other task of the project still waiting on the same SIRET.
+    Returns the number of tasks updated.
+    """
+    waiting = and_(ReconciliationTask.task_key == siret, ReconciliationTask.key_issue == None, or_(
+        ReconciliationTask.candidate_data == None,
+        cast(ReconciliationTask.candidate_data, String) == 'null'
+    ))
+    with Session(engine) as session:
+        tasks = session.exec(select(ReconciliationTask).where(
+            ReconciliationTask.project_id == project_id,
+            or_(ReconciliationTask.id.in_(list(task_ids)), waiting)
+        )).all()
+        for task in tasks:
+            apply_candidate(task, candidate or {}, field_map)
+            session.add(task)
+        # Off the dead-letter list once a lookup got an answer
+        failure = session.get(SireneFailure, (project_id, siret))
+        if failure:
+            session.delete(failure)
+        session.commit()
+    return len(tasks)
+
+
+def record_failure(project_id: int, siret: str, error: str) -> None:
+    """
+    Puts a SIRET whose lookup failed on the project's dead-letter list. Its
+    tasks keep no candidate, so they are told apart from "not found" ({}).
+    """
+    with Session(engine) as session:
+        failure = session.get(SireneFailure, (project_id, siret))
+        if failure:
+            failure.attempts += 1
+            failure.error = error
+            failure.failed_at = utc_now()
+        else:
+            failure = SireneFailure(project_id=project_id, siret=siret, error=error)
+        session.add(failure)
+        session.commit()
+
+
+def list_failures(project_id: int) -> List[SireneFailure]:
+    with Session(engine) as session:
+        return session.exec(select(SireneFailure).where(SireneFailure.project_id == project_id)
+                            .order_by(SireneFailure.failed_at.desc())).all()
+
+
+def reproject_candidates(project_id: int, batch_size: int = 1000) -> int:
+    """
+    Rebuilds the candidate data of an API project from the stored raw
+    responses, e.g. after its mapping changed. Never calls the API.
+    """
+    client = SireneClient()
+    updated = 0
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            return 0
+        mapping = project.mapping_config
+        target_key_col = mapping.get("join_key", {}).get("target")
+        field_map = mapping.get("field_map", {})
+
+        last_id = 0
+        while True:
+            statement = select(ReconciliationTask).where(
+                ReconciliationTask.project_id == project_id,
+                ReconciliationTask.id > last_id
+            ).order_by(ReconciliationTask.id).limit(batch_size)
+            tasks = session.exec(statement).all()
+            if not tasks:
+                break
+            last_id = tasks[-1].id
+
+            keys = {t.id: api_key_of(t, target_key_col) for t in tasks}
+            raws = load_raw_responses([k for k in set(keys.values()) if k])
+            for task in tasks:
+                raw = raws.get(keys.get(task.id))
+                if raw is not None:
+                    apply_candidate(task, candidate_from_raw(client, raw, mapping), field_map)
+                    session.add(task)
+                    updated += 1
+            session.commit()
+
+    logger.info(f"Re-projected {updated} candidates of Project {project_id} from stored responses")
+    return updated
+
+
+# Tasks built and flushed to SQLite at a time, so initialization memory does not grow with the input
+INIT_BATCH_SIZE = 10000
+
+def record_init_metrics(project_id: int, mode: str, rows: int, seconds: float) -> None:
+    TASK_INIT_ROWS.inc(rows, project=project_id, mode=mode)
+    TASK_INIT_SECONDS.observe(seconds, project=project_id, mode=mode)
+    TASK_INIT_RATE.set(rows / seconds if seconds else 0, project=project_id, mode=mode)
+
+
+def task_key_of(target_data: Dict, key_column: Optional[str]) -> Optional[str]:
+    value = target_data.get(key_column) if key_column else None
+    return None if value is None else str(value)
+
+
+def api_key_of(task: ReconciliationTask, key_column: Optional[str]) -> Optional[str]:
+    """
+    The SIRET to send to the API for a task: the normalized one stored at
+    initialization, or the raw Target value for tasks created before it was.
+    None for tasks flagged with a key_issue.
+    """
+    if task.key_issue:
+        return None
+    return task.task_key or task_key_of(task.target_data, key_column)
+
+
+def key_issue_counts(project_id: int) -> Dict[str, int]:
+    """
+    Tasks flagged with each key_issue, e.g. {"checksum": 12, "format": 3}.
+    """
+    with Session(engine) as session:
+        return dict(session.exec(select(ReconciliationTask.key_issue, func.count()).where(
+            ReconciliationTask.project_id == project_id, ReconciliationTask.key_issue != None
+        ).group_by(ReconciliationTask.key_issue)).all())
+
+
+def _flush_batch(session: Session, tasks: List[ReconciliationTask]) -> None:
+    # One transaction for the whole initialization, but flushed tasks leave the identity map
+    session.add_all(tasks)
+    session.flush()
+    for task in tasks:
+        session.expunge(task)
+
+
+def initialize_tasks_csv(project_id: int) -> Optional[int]:
     """
     Initializes reconciliation tasks for a CSV-to-CSV project.
     Performs a Left Join in DuckDB and populates SQLite.
+    Returns the number of tasks created, None on failure.
     """
     with Session(engine) as session:
         project = session.get(Project, project_id)
         if not project:
             logger.error(f"Project {project_id} not found.")
-            return
+            return None
 
         target_table = project.target_table_name
         source_table = project.source_table_name
@@ -28,10 +229,13 @@ def initialize_tasks_csv(project_id: int) -> None:
         join_key = mapping.get("join_key", {})
         target_key = join_key.get("target")
         source_key = join_key.get("source")
+        field_map = mapping.get("field_map", {})
 
         if not target_key or not source_key:
             logger.error("Invalid join configuration.")
-            return
+            return None
+
+        start = time.perf_counter()
 
         # Perform Join in DuckDB
         query = f"""
@@ -44,81 +248,208 @@ def initialize_tasks_csv(project_id: int) -> None:
         """
 
         try:
-            results = duckdb_client.query_as_dict(query)
-
-            tasks = []
-            for row in results:
-                t_json = row.get("target_json")
-                s_json = row.get("source_json")
-
-                target_data = json.loads(t_json) if t_json else {}
-                candidate_data = json.loads(s_json) if s_json else None
-
-                task = ReconciliationTask(
-                    project_id=project.id,
-                    target_data=target_data,
-                    candidate_data=candidate_data,
-                    status="Pending"
-                )
-                tasks.append(task)
-
-            session.add_all(tasks)
+            register_task_keys(session, duckdb_client.get_columns(target_table))
+            register_task_keys(session, duckdb_client.get_columns(source_table))
+
+            created = 0
+            with duckdb_client.tables(target_table, source_table):
+                for results in duckdb_client.query_batches(query, batch_size=INIT_BATCH_SIZE):
+                    tasks = []
+                    for row in results:
+                        t_json = row.get("target_json")
+                        s_json = row.get("source_json")
+
+                        target_data = json.loads(t_json) if t_json else {}
+                        candidate_data = json.loads(s_json) if s_json else None
+
+                        task = ReconciliationTask(
+                            project_id=project.id,
+                            task_key=task_key_of(target_data, target_key),
+                            target_data=target_data,
+                            status="Pending"
+                        )
+                        apply_candidate(task, candidate_data, field_map)
+                        tasks.append(task)
+
+                    _flush_batch(session, tasks)
+                    created += len(tasks)
 
             project.status = "Processing"
             session.add(project)
             session.commit()
 
-            logger.info(f"Initialized {len(tasks)} tasks for Project {project_id}")
+            record_init_metrics(project_id, "CSV", created, time.perf_counter() - start)
+            logger.info(f"Initialized {created} tasks for Project {project_id}")
+            return created
 
         except Exception as e:
             logger.error(f"Failed to initialize CSV tasks: {e}")
+            return None
+
+
+def preview_join(project_id: int, mapping: Dict[str, Any], sample_size: int = 10000, exact: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Dry-run of the CSV join configured in `mapping`, without writing any task.
+    Runs over a reservoir sample of the Target (or the full table when `exact`)
+    and only returns aggregates: match rate, duplicate-candidate rate and the
+    disagreement rate of each mapped field.
+    """
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            logger.error(f"Project {project_id} not found.")
+            return None
+        target_table = project.target_table_name
+        source_table = project.source_table_name
+
+    join_key = mapping.get("join_key", {})
+    target_key = join_key.get("target")
+    source_key = join_key.get("source")
+    field_map = mapping.get("field_map", {})
+
+    if not target_key or not source_key or not source_table:
+        logger.error("Invalid join configuration.")
+        return None
+
+    sample_clause = "" if exact else f"USING SAMPLE reservoir({int(sample_size)} ROWS) REPEATABLE (42)"
+
+    # One FILTER aggregate per mapped field, compared as text like the validation card does
+    diff_columns = []
+    for i, (t_col, s_col) in enumerate(field_map.items()):
+        diff_columns.append(
+            f"""count(*) FILTER (WHERE s."{source_key}" IS NOT NULL
+                AND CAST(t."{t_col}" AS VARCHAR) IS DISTINCT FROM CAST(s."{s_col}" AS VARCHAR)) AS diff_{i}"""
+        )
+    diff_select = "".join(f",\n            {c}" for c in diff_columns)
+
+    query = f"""
+    WITH t AS (
+        SELECT * FROM {target_table} {sample_clause}
+    ),
+    candidates AS (
+        SELECT "{source_key}" AS k, count(*) AS n
+        FROM {source_table}
+        GROUP BY 1
+    ),
+    rows AS (
+        SELECT
+            count(*) AS target_rows,
+            count(c.k) AS matched_rows,
+            count(*) FILTER (WHERE c.n > 1) AS duplicate_rows
+        FROM t
+        LEFT JOIN candidates c ON t."{target_key}" = c.k
+    ),
+    pairs AS (
+        SELECT
+            count(s."{source_key}") AS matched_pairs{diff_select}
+        FROM t
+        LEFT JOIN {source_table} s
+        ON t."{target_key}" = s."{source_key}"
+    )
+    SELECT * FROM rows, pairs
+    """
+
+    with duckdb_client.tables(target_table, source_table):
+        row = duckdb_client.query_as_dict(query)[0]
+
+    target_rows = int(row["target_rows"])
+    matched_rows = int(row["matched_rows"])
+    matched_pairs = int(row["matched_pairs"])
+
+    field_disagreement = {}
+    for i, t_col in enumerate(field_map):
+        diff = int(row[f"diff_{i}"])
+        field_disagreement[t_col] = diff / matched_pairs if matched_pairs else 0.0
 
+    return {
+        "exact": exact,
+        "target_rows": target_rows,
+        "matched_rows": matched_rows,
+        "match_rate": matched_rows / target_rows if target_rows else 0.0,
+        "duplicate_rows": int(row["duplicate_rows"]),
+        "duplicate_rate": int(row["duplicate_rows"]) / matched_rows if matched_rows else 0.0,
+        "field_disagreement": field_disagreement,
+    }
 
-def initialize_tasks_api_pre(project_id: int) -> None:
+
+def initialize_tasks_api_pre(project_id: int) -> Optional[int]:
     """
     Initializes tasks for API mode.
     Loads Target rows into SQLite with candidate_data = None.
+    Returns the number of tasks created, None on failure.
     """
     with Session(engine) as session:
         project = session.get(Project, project_id)
         if not project:
-            return
+            return None
 
         target_table = project.target_table_name
-
-        # Select all from target
-        query = f"SELECT to_json(t) as target_json FROM {target_table} t"
+        start = time.perf_counter()
+        mapping = project.mapping_config
+        target_key = mapping.get("join_key", {}).get("target")
+
+        if target_key and mapping.get("siret_check", True):
+            # SIRETs are normalized and checked in DuckDB; invalid ones are flagged, never fetched
+            query = f"""
+                WITH k AS (SELECT to_json(t) AS target_json, {normalized_sql(f't."{target_key}"')} AS siret FROM {target_table} t)
+                SELECT target_json, siret, {issue_sql("siret")} AS key_issue FROM k
+            """
+        else:
+            query = f"SELECT to_json(t) as target_json FROM {target_table} t"
 
         try:
-            results = duckdb_client.query_as_dict(query)
-            tasks = []
-            for row in results:
-                t_json = row.get("target_json")
-                target_data = json.loads(t_json) if t_json else {}
-
-                task = ReconciliationTask(
-                    project_id=project.id,
-                    target_data=target_data,
-                    candidate_data=None, # To be filled by worker
-                    status="Pending"
-                )
-                tasks.append(task)
-
-            session.add_all(tasks)
+            register_task_keys(session, duckdb_client.get_columns(target_table))
+            if mapping.get("projection"):
+                # Projected candidates usually carry every mapped field
+                fields = [*SireneClient.KEY_FIELDS, *mapping.get("field_map", {}).values()]
+                register_task_keys(session, list(dict.fromkeys(fields)))
+
+            created = 0
+            with duckdb_client.tables(target_table):
+                for results in duckdb_client.query_batches(query, batch_size=INIT_BATCH_SIZE):
+                    tasks = []
+                    for row in results:
+                        t_json = row.get("target_json")
+                        target_data = json.loads(t_json) if t_json else {}
+
+                        task = ReconciliationTask(
+                            project_id=project.id,
+                            task_key=row.get("siret") or task_key_of(target_data, target_key),
+                            key_issue=row.get("key_issue"),
+                            target_data=target_data,
+                            candidate_data=None, # To be filled by worker
+                            status="Pending"
+                        )
+                        tasks.append(task)
+
+                    _flush_batch(session, tasks)
+                    created += len(tasks)
+
             project.status = "Processing"
             session.add(project)
             session.commit()
-            logger.info(f"Initialized {len(tasks)} API placeholder tasks.")
+            record_init_metrics(project_id, "API", created, time.perf_counter() - start)
+            logger.info(f"Initialized {created} API placeholder tasks.")
+            flagged = key_issue_counts(project_id)
+            if flagged:
+                logger.warning(f"{sum(flagged.values())} tasks have an invalid SIRET and will not be fetched: {flagged}")
+            return created
 
         except Exception as e:
             logger.error(f"Failed to initialize API tasks: {e}")
+            return None
 
-async def run_api_worker(project_id: int, token: Optional[str] = None) -> None:
+# Tries per SIRET while the API answers 429
+RATE_LIMIT_ATTEMPTS = 3
+
+async def run_api_worker(project_id: int, token: Optional[str] = None, only_failed: bool = False) -> None:
     """
     Background worker to fetch API data for pending tasks.
+    With only_failed, retries just the SIRETs on the dead-letter list.
     """
     logger.info(f"Starting API Worker for Project {project_id}")
-    client = SireneClient(token)
+    client = SireneClient(token, priority="background")
+    started = utc_now()
 
     with Session(engine) as session:
         project = session.get(Project, project_id)
@@ -127,48 +458,159 @@ async def run_api_worker(project_id: int, token: Optional[str] = None) -> None:
 
         mapping = project.mapping_config
         target_key_col = mapping.get("join_key", {}).get("target")
+        field_map = mapping.get("field_map", {})
 
         # Select tasks that have no candidate data.
         # Handle both NULL (new behavior) and "null" string (legacy behavior).
         statement = select(ReconciliationTask).where(
             ReconciliationTask.project_id == project_id,
+            ReconciliationTask.key_issue == None,
             or_(
                 ReconciliationTask.candidate_data == None,
                 cast(ReconciliationTask.candidate_data, String) == 'null'
             )
         )
         tasks = session.exec(statement).all()
-        logger.info(f"Found {len(tasks)} tasks to process via API.")
+        failed = {f.siret for f in session.exec(select(SireneFailure).where(SireneFailure.project_id == project_id))}
+
+    # Rows repeating an establishment share one fetch, fanned out to all of them
+    by_siret: Dict[str, List[int]] = {}
+    for task in tasks:
+        siret = api_key_of(task, target_key_col)
+        if siret and (siret in failed or not only_failed):
+            by_siret.setdefault(siret, []).append(task.id)
+    logger.info(f"Found {len(tasks)} tasks to process via API, {len(by_siret)} unique SIRETs.")
+
+    # Requests are paced by the process-wide quota governor (see app.sirene), which also
+    # holds them back after a 429, so a rate-limited SIRET is simply asked again
+    for siret, task_ids in by_siret.items():
+        logger.info(f"Fetching SIRET: {siret}")
+        for attempt in range(1, RATE_LIMIT_ATTEMPTS + 1):
+            try:
+                result = await fetch_candidate(client, siret, mapping)
+                store_candidate(project_id, siret, result, field_map, task_ids)
+                break
+            except RateLimitExceeded as e:
+                logger.warning(f"Worker rate limited on {siret} (attempt {attempt}), Retry-After {e.retry_after}s")
+            except SireneError as e:
+                record_failure(project_id, siret, str(e))
+                break
+            except Exception as e:
+                logger.error(f"Worker error for {siret}: {e}")
+                record_failure(project_id, siret, f"{type(e).__name__}: {e}")
+                break
+        else:
+            record_failure(project_id, siret, f"Rate limited {RATE_LIMIT_ATTEMPTS} times")
 
-    chunk_size = 10
-    total = len(tasks)
+    if not only_failed:
+        # The first full enrichment is the baseline of incremental re-syncs
+        with Session(engine) as session:
+            project = session.get(Project, project_id)
+            if project and project.last_sync_at is None:
+                project.last_sync_at = started
+                session.add(project)
+                session.commit()
 
-    for i in range(0, total, chunk_size):
-        chunk = tasks[i:i+chunk_size]
+    logger.info("API Worker Finished.")
 
-        for task in chunk:
-            target_val = task.target_data.get(target_key_col)
 
-            if target_val:
-                logger.info(f"Fetching SIRET: {target_val}")
-                try:
-                    result = await client.get_by_siret(str(target_val))
+# SIRETs per multi-criteria query of a re-sync
+RESYNC_BATCH_SIZE = 100
 
-                    with Session(engine) as session:
-                        t_update = session.get(ReconciliationTask, task.id)
-                        if t_update:
-                            t_update.candidate_data = result if result else {}
-                            session.add(t_update)
-                            session.commit()
-                except RateLimitExceeded as e:
-                    logger.warning(f"Worker rate limited. Sleeping for {e.retry_after}s")
-                    await asyncio.sleep(e.retry_after)
-                except Exception as e:
-                    logger.error(f"Worker error for {target_val}: {e}")
+# INSEE timestamps are Paris local time and land after the fact; the overlap
+# only re-reads documents that have not changed, which reopens nothing
+RESYNC_OVERLAP = timedelta(days=1)
 
-                await asyncio.sleep(0.2)
+def _apply_resynced(project_id: int, siret: str, candidate: Dict[str, Any], field_map: Dict[str, str]) -> Tuple[int, int]:
+    """
+    Stores a re-synced candidate on the project's tasks for this SIRET and
+    reopens the decided ones whose mapped Source fields changed.
+    Returns (tasks updated, tasks reopened).
+    """
+    updated = reopened = 0
+    with Session(engine) as session:
+        tasks = session.exec(select(ReconciliationTask).where(
+            ReconciliationTask.project_id == project_id,
+            ReconciliationTask.task_key == siret,
+            ReconciliationTask.key_issue == None
+        )).all()
+        for task in tasks:
+            if task.candidate_data == candidate:
+                continue
+            old = task.candidate_data or {}
+            if task.status != "Pending" and any(old.get(f) != candidate.get(f) for f in field_map.values()):
+                task.status = "Pending"
+                task.decision = None
+                task.final_data = None
+                task.decided_at = None
+                reopened += 1
+            apply_candidate(task, candidate, field_map)
+            session.add(task)
+            updated += 1
+        session.commit()
+    return updated, reopened
+
+
+async def resync_project(project_id: int, token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Brings the candidates of an API project up to date with Sirene. Only the
+    establishments updated since the last sync are fetched, by batched
+    multi-criteria queries, and only the decided tasks whose mapped fields
+    changed are reopened, so the cost follows the rate of change.
+    """
+    from app.review import backfill_task_keys
+    started = utc_now()
+    client = SireneClient(token, priority="background")
 
-    logger.info("API Worker Finished.")
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project or project.mode != "API":
+            raise ValueError(f"Project {project_id} is not an API project")
+        mapping = project.mapping_config
+        since = (project.last_sync_at or project.created_date) - RESYNC_OVERLAP
+    backfill_task_keys(project_id)
+
+    with Session(engine) as session:
+        sirets = list(session.exec(select(ReconciliationTask.task_key).distinct().where(
+            ReconciliationTask.project_id == project_id,
+            ReconciliationTask.key_issue == None,
+            ReconciliationTask.task_key != None,
+            ReconciliationTask.candidate_data != None
+        )).all())
+
+    report = {"since": since, "sirets": len(sirets), "queries": 0, "changed": 0, "updated": 0, "reopened": 0}
+    for i in range(0, len(sirets), RESYNC_BATCH_SIZE):
+        batch = sirets[i:i + RESYNC_BATCH_SIZE]
+        for attempt in range(1, RATE_LIMIT_ATTEMPTS + 1):
+            try:
+                docs = await client.search_changed(batch, since)
+                break
+            except RateLimitExceeded as e:
+                # A failure leaves last_sync_at alone, so the next re-sync covers this window again
+                if attempt == RATE_LIMIT_ATTEMPTS:
+                    raise
+                logger.warning(f"Re-sync rate limited (attempt {attempt}), Retry-After {e.retry_after}s")
+        report["queries"] += 1
+        for raw in docs:
+            siret = raw.get("siret")
+            if siret not in batch:
+                continue
+            save_raw_response(siret, raw)
+            updated, reopened = _apply_resynced(project_id, siret, candidate_from_raw(client, raw, mapping), mapping.get("field_map", {}))
+            report["changed"] += 1
+            report["updated"] += updated
+            report["reopened"] += reopened
+
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        project.last_sync_at = started
+        if report["reopened"] and project.status == "Completed":
+            project.status = "Validation"
+        session.add(project)
+        session.commit()
+
+    logger.info(f"Re-synced Project {project_id}: {report}")
+    return report
 
 async def verify_api_connectivity():
     """
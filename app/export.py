@@ -1,69 +1,127 @@
 from nicegui import app
 from app.db import engine
+from app.maintenance import rehydrate_project
 from app.models import Project, ReconciliationTask
+from app.review import backfill_task_keys
 from sqlmodel import Session, select
-from fastapi import Response
+from sqlalchemy import text, bindparam, DateTime
+from app.metrics import EXPORT_SECONDS, EXPORT_ROWS
+from app.profiling import profiled
+from fastapi import Request, Response
+from typing import List, Optional, TextIO
+from datetime import datetime
 import csv
 import io
+import time
 
-@app.get('/export/{project_id}')
-def export_project(project_id: int):
-    with Session(engine) as session:
-        project = session.get(Project, project_id)
-        if not project:
-            return Response("Project not found", status_code=404)
-
-        # Fetch all tasks (Resolved)
-        # Ideally we export all, or just resolved? Usually "The Result".
-        # Let's export all, with status.
-        tasks = session.exec(select(ReconciliationTask).where(ReconciliationTask.project_id == project_id)).all()
-
-        if not tasks:
-            return Response("No data to export", status_code=404)
-
-        # Determine Columns from the first task's target data (or final data)
-        # We need the original structure.
-        # Use target_data keys from first task.
-        first_task = tasks[0]
-        field_names = list(first_task.target_data.keys())
+EXPORT_BATCH_SIZE = 5000
 
-        # Add recon status
-        field_names.append("_recon_status")
+DELTA_COLUMNS = ["task_id", "key", "field", "old", "new", "decision", "decided_at"]
 
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=field_names)
-        writer.writeheader()
+# One row per field whose final value differs from the Target value, straight
+# from SQLite: the JSON of each resolved task is decoded once and walked by json_each
+DELTA_QUERY = """
+    WITH d AS MATERIALIZED (
+        SELECT id, task_key, decision, decided_at, rl_json(target_data) AS t, rl_json(final_data) AS f
+        FROM reconciliationtask
+        WHERE project_id = :project_id AND status = 'Resolved' AND final_data IS NOT NULL
+        AND (:since IS NULL OR decided_at >= :since)
+    )
+    SELECT d.id, d.task_key, j.key, json_extract(d.t, j.fullkey), j.value, d.decision, d.decided_at
+    FROM d, json_each(d.f) AS j
+    WHERE j.value IS NOT json_extract(d.t, j.fullkey)
+    ORDER BY d.id
+"""
 
-        for task in tasks:
-            # Determine row data
-            row_data = {}
-            if task.final_data:
-                row_data = task.final_data.copy()
+def export_status(task: ReconciliationTask) -> str:
+    # e.g. "Modified" if Final != Target, or based on Decision
+    status_val = "Pending"
+    if task.status == 'Resolved':
+        if task.decision == 'Keep Target':
+            status_val = "Original"
+        elif task.decision == 'Accept Source':
+            status_val = "Modified"
+        elif task.decision == 'Manual Edit':
+            status_val = "Modified"
+        elif task.decision in ('User Confirmed', 'Rule Applied'):
+            if task.final_data == task.target_data:
+                status_val = "Original"
             else:
-                row_data = task.target_data.copy()
+                status_val = "Modified"
+    return status_val
 
-            # Add Status
-            # e.g. "Modified" if Final != Target, or based on Decision
-            status_val = "Pending"
-            if task.status == 'Resolved':
-                if task.decision == 'Keep Target':
-                    status_val = "Original"
-                elif task.decision == 'Accept Source':
-                    status_val = "Modified"
-                elif task.decision == 'Manual Edit':
-                    status_val = "Modified"
-                elif task.decision == 'User Confirmed':
-                    if task.final_data == task.target_data:
-                        status_val = "Original"
-                    else:
-                        status_val = "Modified"
+def write_export(project_id: int, output: TextIO) -> int:
+    """
+    Writes every task of a project as CSV rows to `output` and returns the row count.
+    Tasks are streamed from SQLite, so exports larger than memory work from the CLI.
+    """
+    with Session(engine) as session:
+        statement = (select(ReconciliationTask)
+                     .where(ReconciliationTask.project_id == project_id)
+                     .order_by(ReconciliationTask.id)
+                     .execution_options(yield_per=EXPORT_BATCH_SIZE))
+        writer = None
+        field_names: List[str] = []
+        rows = 0
+        for task in session.exec(statement):
+            if writer is None:
+                # Determine Columns from the first task's target data (the original structure)
+                field_names = list(task.target_data.keys()) + ["_recon_status"]
+                writer = csv.DictWriter(output, fieldnames=field_names)
+                writer.writeheader()
 
-            row_data["_recon_status"] = status_val
+            row_data = (task.final_data or task.target_data).copy()
+            row_data["_recon_status"] = export_status(task)
 
             # Ensure only relevant fields are written
             # (In case final_data has extra fields?)
-            clean_row = {k: v for k, v in row_data.items() if k in field_names}
+            writer.writerow({k: v for k, v in row_data.items() if k in field_names})
+            rows += 1
+        return rows
+
+def write_delta_export(project_id: int, output: TextIO, since: Optional[datetime] = None) -> int:
+    """
+    Writes only the changed fields of resolved tasks as CSV rows
+    (task_id, key, field, old, new, decision, decided_at), optionally only
+    those decided since `since`. Returns the row count.
+    """
+    backfill_task_keys(project_id)
+    writer = csv.writer(output)
+    writer.writerow(DELTA_COLUMNS)
+    rows = 0
+    statement = text(DELTA_QUERY).bindparams(bindparam("since", type_=DateTime()))
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(statement, {"project_id": project_id, "since": since})
+        for row in result:
+            writer.writerow(row)
+            rows += 1
+    return rows
 
-            writer.writerow(clean_row)
+@app.get('/export/{project_id}')
+@profiled('export')
+def export_project(project_id: int, request: Request = None, mode: str = "full", since: Optional[datetime] = None):
+    """
+    mode=full: every row with its reconciliation status; mode=delta: one row per
+    changed field, optionally only decisions made since `since` (ISO timestamp).
+    """
+    if mode not in ("full", "delta"):
+        return Response("mode must be full or delta", status_code=400)
+    # Archived projects come back from Parquet when reopened. A sync route:
+    # FastAPI runs it in its thread pool, off the event loop
+    rehydrate_project(project_id)
+    start = time.perf_counter()
+    with Session(engine) as session:
+        if not session.get(Project, project_id):
+            return Response("Project not found", status_code=404)
+
+    output = io.StringIO()
+    if mode == "delta":
+        rows = write_delta_export(project_id, output, since)
+    else:
+        rows = write_export(project_id, output)
+        if not rows:
+            return Response("No data to export", status_code=404)
 
-        return Response(output.getvalue(), media_type="text/csv")
+    EXPORT_SECONDS.observe(time.perf_counter() - start, project=project_id)
+    EXPORT_ROWS.inc(rows, project=project_id)
+    return Response(output.getvalue(), media_type="text/csv")
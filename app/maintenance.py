@@ -0,0 +1,289 @@
+from sqlmodel import Session, select, delete
+from sqlalchemy import text
+from app.models import Project, ReconciliationTask, CodecDictionary, SireneFailure
+from app.db import engine
+from app.duckdb_client import duckdb_client, DUCKDB_FILE
+from app.codec import load_dictionary
+from loguru import logger
+from typing import Dict, Any, Optional
+from pathlib import Path
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+# Parquet archives of completed projects, one directory per project
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "data/archive"))
+
+# Rows moved per statement when archiving and rehydrating
+ARCHIVE_BATCH_SIZE = 5000
+
+# Free pages given back after an archive or purge; the "Compact SQLite" action frees the rest
+AFTER_DELETE_VACUUM_PAGES = 4096
+
+# One rehydration at a time per project
+_rehydrate_locks: Dict[int, threading.Lock] = {}
+_rehydrate_guard = threading.Lock()
+
+# Task columns kept in the archive; JSON columns are stored as JSON text
+TASK_COLUMNS = {
+    "id": "BIGINT",
+    "status": "VARCHAR",
+    "decision": "VARCHAR",
+    "target_json": "VARCHAR",
+    "candidate_json": "VARCHAR",
+    "final_json": "VARCHAR",
+    "diff_count": "INTEGER",
+    "diff_fields": "VARCHAR",
+    "decided_at": "VARCHAR",
+    "task_key": "VARCHAR",
+    "key_issue": "VARCHAR",
+}
+
+
+def _file_size(*paths: Path) -> int:
+    return sum(p.stat().st_size for p in paths if p.exists())
+
+
+def _sqlite_file() -> Path:
+    return Path(engine.url.database)
+
+
+def _duckdb_size(path: Path) -> int:
+    return _file_size(path, path.with_name(path.name + ".wal"))
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) if path.exists() else 0
+
+
+def storage_report() -> Dict[str, Any]:
+    """
+    Disk usage of the metadata database, the DuckDB files and the archives,
+    with a per-project breakdown. Task bytes are the stored (compressed) sizes
+    of the task JSON columns, without index overhead.
+    """
+    with Session(engine) as session:
+        projects = session.exec(select(Project).order_by(Project.id)).all()
+        task_usage = {
+            row[0]: (row[1], row[2])
+            for row in session.connection().execute(text("""
+                SELECT project_id, count(*),
+                       coalesce(sum(length(target_data) + coalesce(length(candidate_data), 0)
+                                    + coalesce(length(final_data), 0)), 0)
+                FROM reconciliationtask GROUP BY project_id
+            """))
+        }
+        page_size = session.connection().exec_driver_sql("PRAGMA page_size").scalar()
+        free_pages = session.connection().exec_driver_sql("PRAGMA freelist_count").scalar()
+
+    rows = []
+    for project in projects:
+        tasks, task_bytes = task_usage.get(project.id, (0, 0))
+        catalog = duckdb_client._catalog(project.target_table_name)
+        rows.append({
+            "id": project.id,
+            "name": project.name,
+            "status": project.status,
+            "archived": project.archive_path is not None,
+            "tasks": tasks,
+            "task_bytes": task_bytes,
+            # Legacy projects share the main DuckDB file and are not broken down
+            "duckdb_bytes": _duckdb_size(duckdb_client.project_db_path(catalog)) if catalog else None,
+            "archive_bytes": _dir_size(Path(project.archive_path)) if project.archive_path else 0,
+        })
+
+    return {
+        "sqlite_bytes": _file_size(_sqlite_file()),
+        "sqlite_free_bytes": page_size * free_pages,
+        "duckdb_bytes": _duckdb_size(DUCKDB_FILE),
+        "projects": rows,
+    }
+
+
+def compact_sqlite(max_pages: Optional[int] = None) -> int:
+    """
+    Gives free pages of the metadata database back to the file system without
+    blocking readers for long: PRAGMA incremental_vacuum frees up to `max_pages`
+    (all when None). A database created before incremental vacuum was enabled
+    is converted once with a full VACUUM, by an unbounded call only. Returns bytes freed.
+    """
+    before = _file_size(_sqlite_file())
+    with engine.connect() as conn:
+        # PRAGMA incremental_vacuum only runs one step per execute(); executescript runs it to the end
+        raw = conn.connection.dbapi_connection
+        if raw.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if max_pages is not None:
+                logger.info("The metadata database needs a full compaction before pages can be freed incrementally, skipped")
+                return 0
+            logger.info("Converting the metadata database to incremental vacuum (full VACUUM)")
+            raw.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+        else:
+            pages = "" if max_pages is None else f"({int(max_pages)})"
+            raw.executescript(f"PRAGMA incremental_vacuum{pages};")
+
+    freed = before - _file_size(_sqlite_file())
+    logger.info(f"Compacted the metadata database, {freed} bytes freed")
+    return freed
+
+
+def compact_duckdb(rewrite: bool = False) -> int:
+    """
+    Checkpoints the main DuckDB file and every project database. With
+    `rewrite`, project databases are also copied to fresh files, which
+    reclaims the space of dropped tables. Returns bytes saved by rewrites.
+    """
+    duckdb_client.checkpoint()
+    saved = 0
+    for catalog in duckdb_client.project_catalogs():
+        if rewrite:
+            saved += duckdb_client.rewrite_project_database(catalog)
+        else:
+            duckdb_client.checkpoint(catalog)
+    return saved
+
+
+def archive_project(project_id: int) -> Path:
+    """
+    Moves a completed project's tasks and DuckDB tables to Parquet files under
+    ARCHIVE_DIR, then deletes them from the hot databases. The project stays
+    listed; rehydrate_project brings the data back when it is opened again.
+    """
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"Project {project_id} not found")
+        if project.status != "Completed":
+            raise ValueError(f"Only Completed projects can be archived (Project {project_id} is {project.status})")
+        if project.archive_path:
+            return Path(project.archive_path)
+
+        archive = ARCHIVE_DIR / f"proj_{project_id}"
+        archive.mkdir(parents=True, exist_ok=True)
+
+        # Tasks go through an NDJSON spool file, read back by DuckDB as typed columns
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson", dir=archive, delete=False, encoding="utf-8") as spool:
+            last_id = 0
+            while True:
+                rows = session.connection().execute(text("""
+                    SELECT id, status, decision, rl_json(target_data), rl_json(candidate_data),
+                           rl_json(final_data), diff_count, diff_fields, decided_at, task_key, key_issue
+                    FROM reconciliationtask
+                    WHERE project_id = :project_id AND id > :last_id
+                    ORDER BY id LIMIT :limit
+                """), {"project_id": project_id, "last_id": last_id, "limit": ARCHIVE_BATCH_SIZE}).all()
+                if not rows:
+                    break
+                for row in rows:
+                    spool.write(json.dumps(dict(zip(TASK_COLUMNS, row)), ensure_ascii=False) + "\n")
+                last_id = rows[-1][0]
+
+        spool_path = Path(spool.name)
+        columns = ", ".join(f"'{name}': '{type_}'" for name, type_ in TASK_COLUMNS.items())
+        duckdb_client.query(
+            f"COPY (SELECT * FROM read_json('{spool_path.as_posix()}', format='newline_delimited', columns={{{columns}}})) "
+            f"TO '{(archive / 'tasks.parquet').as_posix()}' (FORMAT parquet, COMPRESSION zstd)"
+        )
+        spool_path.unlink()
+
+        tables = {"target": project.target_table_name, "source": project.source_table_name}
+        for role, table in tables.items():
+            if table:
+                with duckdb_client.tables(table):
+                    duckdb_client.query(f"COPY {table} TO '{(archive / f'{role}.parquet').as_posix()}' (FORMAT parquet, COMPRESSION zstd)")
+
+        # Record the archive before dropping the hot copies: a failed commit leaves the
+        # project fully hot, and a crash after it is repaired by rehydrate_project
+        session.exec(delete(ReconciliationTask).where(ReconciliationTask.project_id == project_id))
+        project.archive_path = archive.as_posix()
+        session.add(project)
+        session.commit()
+        duckdb_client.drop_project_tables(*tables.values())
+
+    compact_sqlite(max_pages=AFTER_DELETE_VACUUM_PAGES)
+    logger.info(f"Archived Project {project_id} to {archive}")
+    return archive
+
+
+def _rehydrate_lock(project_id: int) -> threading.Lock:
+    with _rehydrate_guard:
+        return _rehydrate_locks.setdefault(project_id, threading.Lock())
+
+
+def rehydrate_project(project_id: int) -> bool:
+    """
+    Restores an archived project's tables and tasks (with their ids) from its
+    Parquet archive. Cheap no-op for projects that are not archived, so pages
+    call it (off the event loop) when a project is opened. Returns True if data
+    was restored.
+    """
+    # Two pages opening the same archived project: the second waits, then finds it restored
+    with _rehydrate_lock(project_id):
+        return _rehydrate(project_id)
+
+
+def _rehydrate(project_id: int) -> bool:
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project or not project.archive_path:
+            return False
+        archive = Path(project.archive_path)
+
+        tables = {"target": project.target_table_name, "source": project.source_table_name}
+        for role, table in tables.items():
+            parquet = archive / f"{role}.parquet"
+            if table and parquet.exists():
+                with duckdb_client.tables(table):
+                    duckdb_client.query(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM read_parquet('{parquet.as_posix()}')")
+
+        # Re-encode with the project's key dictionaries
+        for row in session.exec(select(CodecDictionary)).all():
+            load_dictionary(row.id, json.loads(row.key_list))
+
+        insert = text("""
+            INSERT INTO reconciliationtask (id, project_id, status, decision, target_data, candidate_data,
+                                            final_data, diff_count, diff_fields, decided_at, task_key, key_issue)
+            VALUES (:id, :project_id, :status, :decision, rl_pack(:target_json), rl_pack(:candidate_json),
+                    rl_pack(:final_json), :diff_count, :diff_fields, :decided_at, :task_key, :key_issue)
+        """)
+        with duckdb_client.conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM read_parquet('{(archive / 'tasks.parquet').as_posix()}') ORDER BY id")
+            names = [d[0] for d in cursor.description]
+            restored = 0
+            while True:
+                rows = cursor.fetchmany(ARCHIVE_BATCH_SIZE)
+                if not rows:
+                    break
+                # Archives written before a column existed restore it as NULL
+                session.connection().execute(insert, [{**dict.fromkeys(TASK_COLUMNS), **dict(zip(names, r)), "project_id": project_id}
+                                                      for r in rows])
+                restored += len(rows)
+
+        project.archive_path = None
+        session.add(project)
+        session.commit()
+
+    shutil.rmtree(archive, ignore_errors=True)
+    logger.info(f"Rehydrated {restored} tasks of Project {project_id} from {archive}")
+    return True
+
+
+def purge_project(project_id: int) -> None:
+    """
+    Deletes a project with its tasks, DuckDB data and archive, then frees the
+    SQLite pages it used.
+    """
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            return
+        duckdb_client.drop_project_tables(project.target_table_name, project.source_table_name)
+        if project.archive_path:
+            shutil.rmtree(project.archive_path, ignore_errors=True)
+        session.exec(delete(ReconciliationTask).where(ReconciliationTask.project_id == project_id))
+        session.exec(delete(SireneFailure).where(SireneFailure.project_id == project_id))
+        session.delete(project)
+        session.commit()
+
+    compact_sqlite(max_pages=AFTER_DELETE_VACUUM_PAGES)
@@ -0,0 +1,203 @@
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Optional, Iterator, Sequence
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, from a fast SQLite lookup to a slow CSV ingest
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    """
+    Base of the in-process metrics. Values are kept per label values and
+    rendered in the Prometheus text exposition format by the registry.
+    """
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _format_labels(self, key: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def values(self) -> Dict[LabelValues, float]:
+        """
+        Current value of every label set, keyed by label values in labelnames order.
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._format_labels(k)} {v}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket (non-cumulative, last = +Inf), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def summary(self, **labels) -> Dict[str, float]:
+        """
+        Count, mean and bucket-interpolated p50/p95 of one label set, for the diagnostics page.
+        """
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            if not entry:
+                return {"count": 0}
+            counts, total = list(entry[0]), entry[1][0]
+        count = sum(counts)
+        return {
+            "count": count,
+            "mean": total / count,
+            "p50": self._quantile(counts, 0.5),
+            "p95": self._quantile(counts, 0.95),
+        }
+
+    def _quantile(self, counts: List[int], q: float) -> float:
+        rank = q * sum(counts)
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': repr(float(bound))})} {cumulative}")
+                cumulative += counts[-1]
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {cumulative}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {total[0]}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- Hot-path metrics ---
+
+INGEST_ROWS = registry.register(Counter("reconlab_ingest_rows_total", "Rows ingested from CSV files", ["table"]))
+INGEST_BYTES = registry.register(Counter("reconlab_ingest_bytes_total", "Bytes of CSV files ingested", ["table"]))
+INGEST_SECONDS = registry.register(Histogram("reconlab_ingest_seconds", "Duration of CSV ingests", ["table"]))
+
+TASK_INIT_ROWS = registry.register(Counter("reconlab_task_init_rows_total", "Tasks created by initialize_tasks_*", ["project", "mode"]))
+TASK_INIT_SECONDS = registry.register(Histogram("reconlab_task_init_seconds", "Duration of initialize_tasks_*", ["project", "mode"]))
+TASK_INIT_RATE = registry.register(Gauge("reconlab_task_init_rows_per_second", "Throughput of the last task initialization", ["project", "mode"]))
+
+SIRENE_SECONDS = registry.register(Histogram("reconlab_sirene_request_seconds", "Latency of Sirene API requests", ["endpoint"]))
+SIRENE_RESPONSES = registry.register(Counter("reconlab_sirene_responses_total", "Sirene API responses by status code (error = no response)", ["endpoint", "status"]))
+SIRENE_RATE_LIMITED = registry.register(Counter("reconlab_sirene_rate_limited_total", "Sirene API 429 responses"))
+SIRENE_RETRY_AFTER = registry.register(Counter("reconlab_sirene_retry_after_seconds_total", "Retry-After seconds requested by the Sirene API"))
+SIRENE_COALESCED = registry.register(Counter("reconlab_sirene_coalesced_total", "Sirene lookups served by a request already in flight"))
+SIRENE_QUEUE_DEPTH = registry.register(Gauge("reconlab_sirene_queue_depth", "Sirene requests waiting for the quota governor", ["priority"]))
+SIRENE_QUEUE_SECONDS = registry.register(Histogram("reconlab_sirene_queue_seconds", "Time Sirene requests waited for the quota governor", ["priority"]))
+SIRENE_RETRIES = registry.register(Counter("reconlab_sirene_retries_total", "Sirene lookups retried after a timeout, network error or 5xx"))
+SIRENE_CIRCUIT_OPEN = registry.register(Gauge("reconlab_sirene_circuit_open", "1 while the Sirene circuit breaker holds lookups back"))
+
+NEXT_TASK_SECONDS = registry.register(Histogram("reconlab_next_task_seconds", "Latency of claiming the next tasks to review", ["project"]))
+DECISION_SECONDS = registry.register(Histogram("reconlab_decision_seconds", "Latency of recording a review decision", ["project"]))
+DECISIONS = registry.register(Counter("reconlab_decisions_total", "Review decisions recorded", ["project", "status"]))
+EXPORT_SECONDS = registry.register(Histogram("reconlab_export_seconds", "Duration of CSV exports", ["project"]))
+EXPORT_ROWS = registry.register(Counter("reconlab_export_rows_total", "Rows written by CSV exports", ["project"]))
+SEARCH_SECONDS = registry.register(Histogram("reconlab_search_seconds", "Latency of task searches", ["project"]))
+CARD_RENDER_SECONDS = registry.register(Histogram("reconlab_card_render_seconds", "Time to build a validation card", ["project", "mode"]))
+CARD_PAYLOAD_BYTES = registry.register(Histogram("reconlab_card_payload_bytes", "Size of the elements a validation card sends to the browser, measured in profiled requests", ["project", "mode"],
+                                                 buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304)))
+
+STARTUP_SECONDS = registry.register(Gauge("reconlab_startup_seconds", "Seconds from the start of main.py to each startup phase", ["phase"]))
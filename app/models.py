@@ -1,7 +1,8 @@
 from typing import Optional, List, Dict
 from datetime import datetime, timezone
 from sqlmodel import SQLModel, Field
-from sqlalchemy import JSON, Column
+from sqlalchemy import JSON, Column, Index
+from app.codec import CompactJSON
 
 def utc_now():
     return datetime.now(timezone.utc)
@@ -21,15 +22,38 @@ class Project(SQLModel, table=True):
     # Structure: {"join_key": {"target": "col", "source": "col"}, "field_map": {"target_col": "source_field"}}
     mapping_config: Dict = Field(default={}, sa_column=Column(JSON(none_as_null=True)))
 
+    # Set while the project's tasks and tables are archived to Parquet (see app.maintenance)
+    archive_path: Optional[str] = None
+
+    # API projects: when candidates were last brought up to date with Sirene (see engine.resync_project)
+    last_sync_at: Optional[datetime] = None
+
 class ReconciliationTask(SQLModel, table=True):
+    __table_args__ = (
+        # Serves the review grid: filter by status, sort by diff count, seek by id
+        Index("ix_task_project_status_diff", "project_id", "status", "diff_count", "id"),
+        # Serves lease claims and the next-task query: a project's pending tasks in id order,
+        # the lease conditions checked on the rows read
+        Index("ix_task_project_status_id", "project_id", "status", "id"),
+        # Serves decisions addressed by Target join key (bulk decisions API)
+        Index("ix_task_project_key", "project_id", "task_key"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     project_id: int = Field(index=True)
 
-    # Store original row data from Target (JSON)
-    target_data: Dict = Field(default={}, sa_column=Column(JSON(none_as_null=True)))
+    # Target join key value as text, so external tools can address a task without its id.
+    # API projects store the normalized SIRET (see app.siret)
+    task_key: Optional[str] = None
+
+    # Why the key is never sent to the Sirene API: "missing", "format" or "checksum"
+    key_issue: Optional[str] = None
 
-    # Store potential match data from Source (JSON)
-    candidate_data: Optional[Dict] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
+    # Store original row data from Target (compact JSON, see app.codec)
+    target_data: Dict = Field(default={}, sa_column=Column(CompactJSON))
+
+    # Store potential match data from Source (compact JSON)
+    candidate_data: Optional[Dict] = Field(default=None, sa_column=Column(CompactJSON))
 
     # Validation Status
     status: str = Field(default="Pending") # Pending, Resolved, Skipped
@@ -38,4 +62,40 @@ class ReconciliationTask(SQLModel, table=True):
     decision: Optional[str] = None # "Keep Target", "Accept Source", "Manual Edit"
 
     # If decision is Manual Edit or Accept Source, store the final values here
-    final_data: Optional[Dict] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
+    final_data: Optional[Dict] = Field(default=None, sa_column=Column(CompactJSON))
+
+    # When the last decision was recorded, by a reviewer, a rule or the decisions API
+    decided_at: Optional[datetime] = None
+
+    # Number of mapped fields where Source disagrees with Target (None until the candidate is known)
+    diff_count: Optional[int] = None
+
+    # Those fields as "|field_a|field_b|", for filtering the review grid by field
+    diff_fields: Optional[str] = None
+
+    # Review lease: the session currently holding this task, until when
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+class SireneResponse(SQLModel, table=True):
+    # Raw Sirene establishment documents, shared by all projects, so candidates
+    # can be rebuilt for a new mapping without calling the API again
+    siret: str = Field(primary_key=True)
+    fetched_at: datetime = Field(default_factory=utc_now)
+
+    # zlib-compressed JSON of the "etablissement" document
+    payload: bytes
+
+class SireneFailure(SQLModel, table=True):
+    # Dead-letter list: SIRETs of a project whose lookup failed (not "not found").
+    # Their tasks keep candidate_data NULL until a retry succeeds.
+    project_id: int = Field(primary_key=True)
+    siret: str = Field(primary_key=True)
+    error: str
+    attempts: int = 1  # Failed lookups, each already retried with backoff
+    failed_at: datetime = Field(default_factory=utc_now)
+
+class CodecDictionary(SQLModel, table=True):
+    # Key dictionaries of the task JSON codec, so any process can decode
+    id: int = Field(primary_key=True)
+    key_list: str  # JSON list of the keys
@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+from loguru import logger
+import cProfile
+import functools
+import inspect
+import os
+import re
+import sys
+import threading
+
+# PROFILE=1 profiles every wrapped call, PROFILE=request only requests carrying ?profile=1.
+# Unset, profiled() returns the function untouched.
+PROFILE_MODE = os.getenv("PROFILE", "").lower()
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "data/profiles"))
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002"))
+
+# cProfile can only run once at a time; overlapping calls run unprofiled
+_active = threading.Lock()
+
+# Leaf frames of threads waiting for work, left out of the sampled stacks
+_IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+
+class _Sampler(threading.Thread):
+    """
+    Samples the Python stacks of every busy thread, so the work an async handler
+    sends to asyncio.to_thread shows up in the collapsed stacks too.
+    """
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        names = {}
+        while not self._done.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident or (Path(frame.f_code.co_filename).name, frame.f_code.co_name) in _IDLE_FRAMES:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({Path(frame.f_code.co_filename).name}:{frame.f_code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def _write(name: str, profiler: cProfile.Profile, sampler: _Sampler) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{datetime.now():%Y%m%d-%H%M%S-%f}_{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}"
+    profiler.dump_stats(stem.with_suffix(".pstats"))
+    # One "frame;frame;frame count" line per stack, as read by flamegraph.pl and speedscope
+    with stem.with_suffix(".collapsed").open("w", encoding="utf-8") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return stem
+
+
+@contextmanager
+def profile(name: str) -> Iterator[None]:
+    """
+    Profiles the block with cProfile (calling thread) and the stack sampler (all threads),
+    then writes <PROFILE_DIR>/<timestamp>_<name>.pstats and .collapsed.
+    """
+    if not _active.acquire(blocking=False):
+        logger.debug(f"Profiler busy, {name} runs unprofiled")
+        yield
+        return
+    profiler = cProfile.Profile()
+    sampler = _Sampler(SAMPLE_INTERVAL)
+    try:
+        sampler.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            sampler.stop()
+        stem = _write(name, profiler, sampler)
+        logger.info(f"Profile of {name} written to {stem}.pstats / .collapsed")
+    finally:
+        _active.release()
+
+
+def _requested(kwargs: Dict) -> bool:
+    """
+    Whether the current request asked for a profile: a FastAPI route's `request`
+    argument, or the page URL of the NiceGUI client running the handler.
+    """
+    if PROFILE_MODE == "1":
+        return True
+    request = kwargs.get("request")
+    if request is None:
+        from nicegui import context
+        try:
+            request = context.client.request
+        except (RuntimeError, ValueError):
+            return False
+    return request.query_params.get("profile") == "1"
+
+
+def profiling_requested() -> bool:
+    """
+    Whether the code running now is profiled, the check profiled() makes: always
+    with PROFILE=1, only for requests carrying ?profile=1 with PROFILE=request.
+    For extra measurements too costly to take on every call.
+    """
+    return PROFILE_MODE in ("1", "request") and _requested({})
+
+
+def profiled(name: Optional[str] = None) -> Callable:
+    """
+    Decorator for page builders, event handlers and routes, sync or async.
+    """
+    def decorator(func: Callable) -> Callable:
+        if PROFILE_MODE not in ("1", "request"):
+            return func
+        label = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _requested(kwargs):
+                    return await func(*args, **kwargs)
+                with profile(label):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _requested(kwargs):
+                return func(*args, **kwargs)
+            with profile(label):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
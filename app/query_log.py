@@ -0,0 +1,171 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from loguru import logger
+from typing import Dict, Any, List, Optional, Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import os
+import re
+import threading
+import time
+
+# Opt-in: statements slower than SLOW_QUERY_MS are logged with their plan
+settings: Dict[str, Any] = {
+    "enabled": bool(os.getenv("SLOW_QUERY_MS")),
+    "threshold_ms": float(os.getenv("SLOW_QUERY_MS") or 200),
+    "explain": os.getenv("SLOW_QUERY_EXPLAIN", "1") != "0",
+}
+
+QUERY_LOG_FILE = Path(os.getenv("QUERY_LOG_FILE", "logs/slow_queries.jsonl"))
+MAX_LOG_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+# Longest statement and parameter text kept per entry
+MAX_TEXT = 4000
+
+# DuckDB's EXPLAIN ANALYZE runs the statement again, so only read-only ones are profiled
+_READ_ONLY = re.compile(r"^\s*(\(?\s*SELECT|WITH\b(?!.*\b(INSERT|UPDATE|DELETE)\b)|VALUES|DESCRIBE|SHOW)", re.IGNORECASE | re.DOTALL)
+
+_lock = threading.Lock()
+
+
+def configure(enabled: Optional[bool] = None, threshold_ms: Optional[float] = None, explain: Optional[bool] = None) -> None:
+    if enabled is not None:
+        settings["enabled"] = enabled
+    if threshold_ms is not None:
+        settings["threshold_ms"] = float(threshold_ms)
+    if explain is not None:
+        settings["explain"] = explain
+
+
+def _truncate(text: str) -> str:
+    return text if len(text) <= MAX_TEXT else text[:MAX_TEXT] + f"... ({len(text)} chars)"
+
+
+def _rotate() -> None:
+    for i in range(BACKUP_COUNT - 1, 0, -1):
+        older = QUERY_LOG_FILE.with_name(f"{QUERY_LOG_FILE.name}.{i}")
+        if older.exists():
+            older.replace(QUERY_LOG_FILE.with_name(f"{QUERY_LOG_FILE.name}.{i + 1}"))
+    QUERY_LOG_FILE.replace(QUERY_LOG_FILE.with_name(f"{QUERY_LOG_FILE.name}.1"))
+
+
+def record(source: str, statement: str, params: Any, elapsed: float, plan: Any = None, plan_error: Optional[str] = None,
+           error: Optional[str] = None) -> None:
+    """
+    Appends one slow statement to the JSONL log, rotating it at MAX_LOG_BYTES.
+    `error` is set for a statement that failed.
+    """
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "source": source,
+        "ms": round(elapsed * 1000, 2),
+        "statement": _truncate(" ".join(statement.split())),
+        "params": _truncate(repr(params)) if params else None,
+        "plan": plan,
+        "plan_error": plan_error,
+        "error": error,
+    }
+    logger.warning(f"Slow {source} query ({entry['ms']} ms): {entry['statement'][:200]}")
+    line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        QUERY_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        if QUERY_LOG_FILE.exists() and QUERY_LOG_FILE.stat().st_size + len(line) > MAX_LOG_BYTES:
+            _rotate()
+        with QUERY_LOG_FILE.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def is_slow(elapsed: float) -> bool:
+    return settings["enabled"] and elapsed * 1000 >= settings["threshold_ms"]
+
+
+def read_entries(limit: int = 200) -> List[Dict[str, Any]]:
+    """
+    Newest entries first, across the current file and its backups.
+    """
+    entries: List[Dict[str, Any]] = []
+    files = [QUERY_LOG_FILE] + [QUERY_LOG_FILE.with_name(f"{QUERY_LOG_FILE.name}.{i}") for i in range(1, BACKUP_COUNT + 1)]
+    for path in files:
+        if not path.exists():
+            continue
+        lines = path.read_text(encoding="utf-8").splitlines()
+        for line in reversed(lines):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(entries) >= limit:
+                return entries
+    return entries
+
+
+def clear() -> None:
+    with _lock:
+        for path in [QUERY_LOG_FILE] + [QUERY_LOG_FILE.with_name(f"{QUERY_LOG_FILE.name}.{i}") for i in range(1, BACKUP_COUNT + 1)]:
+            path.unlink(missing_ok=True)
+
+
+# --- DuckDB ---
+
+def log_duckdb(cursor, query: str, params: Optional[Sequence[Any]], elapsed: float) -> None:
+    """
+    Called by DuckDBClient after a statement; profiles slow read-only ones
+    with EXPLAIN (ANALYZE, FORMAT JSON) on the same cursor.
+    """
+    if not is_slow(elapsed):
+        return
+    plan, plan_error = None, None
+    if settings["explain"] and _READ_ONLY.match(query):
+        try:
+            rows = cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", params or None).fetchall()
+            plan = json.loads(rows[0][1])
+        except Exception as e:
+            plan_error = str(e)
+    record("duckdb", query, params, elapsed, plan, plan_error)
+
+
+# --- SQLite (every SQLAlchemy engine) ---
+
+# The start time is kept on the statement's execution context, so a statement that
+# raises takes its start time with it instead of leaving it to the next one
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if settings["enabled"] and context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _elapsed(context) -> Optional[float]:
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return None
+    del context._query_start
+    return time.perf_counter() - start
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = _elapsed(context)
+    if elapsed is None or not is_slow(elapsed):
+        return
+    plan, plan_error = None, None
+    # EXPLAIN QUERY PLAN never runs the statement, so any single statement can be explained
+    if settings["explain"] and not executemany and conn.dialect.name == "sqlite":
+        try:
+            rows = conn.connection.dbapi_connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+            plan = [{"id": r[0], "parent": r[1], "detail": r[3]} for r in rows]
+        except Exception as e:
+            plan_error = str(e)
+    record("sqlite", statement, None if executemany else parameters, elapsed, plan, plan_error)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:
+    context = exception_context.execution_context
+    elapsed = _elapsed(context) if context is not None else None
+    # A slow statement that failed (e.g. waiting on a lock) is worth a look too
+    if elapsed is not None and is_slow(elapsed):
+        record("sqlite", exception_context.statement or "", exception_context.parameters, elapsed,
+               error=str(exception_context.original_exception))
@@ -0,0 +1,46 @@
+from sqlmodel import Session, select
+from app.models import SireneResponse, utc_now
+from app.db import engine
+from typing import Dict, Any, List, Optional
+import json
+import zlib
+
+# SQLite caps the number of bound parameters per statement
+LOOKUP_CHUNK_SIZE = 500
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_payload(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob))
+
+
+def save_raw_response(siret: str, payload: Dict[str, Any]) -> None:
+    """
+    Stores (or refreshes) the raw document of one establishment.
+    """
+    with Session(engine) as session:
+        session.merge(SireneResponse(siret=siret, fetched_at=utc_now(), payload=encode_payload(payload)))
+        session.commit()
+
+
+def load_raw_response(siret: str) -> Optional[Dict[str, Any]]:
+    with Session(engine) as session:
+        row = session.get(SireneResponse, siret)
+        return decode_payload(row.payload) if row else None
+
+
+def load_raw_responses(sirets: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Raw documents of every stored SIRET among `sirets`, keyed by SIRET.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    with Session(engine) as session:
+        for i in range(0, len(sirets), LOOKUP_CHUNK_SIZE):
+            chunk = sirets[i:i + LOOKUP_CHUNK_SIZE]
+            rows = session.exec(select(SireneResponse).where(SireneResponse.siret.in_(chunk))).all()
+            for row in rows:
+                found[row.siret] = decode_payload(row.payload)
+    return found
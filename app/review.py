@@ -0,0 +1,528 @@
+from sqlmodel import Session, select, func
+from sqlalchemy import text, or_, and_, update, bindparam, DateTime
+from app.models import Project, ReconciliationTask, utc_now
+from app.codec import CompactJSON
+from app.db import engine
+from app.engine import compute_diff
+from app.metrics import NEXT_TASK_SECONDS, DECISION_SECONDS, DECISIONS
+from loguru import logger
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+from datetime import timedelta
+import time
+
+# SQLite caps the number of bound parameters per statement
+ID_CHUNK_SIZE = 500
+
+# How long a reviewer keeps claimed tasks without a heartbeat
+LEASE_SECONDS = 300
+
+# Decisions accepted from external tools, see apply_decisions
+API_DECISIONS = ("Keep Target", "Accept Source", "Manual Edit", "User Confirmed")
+API_STATUSES = ("Resolved", "Skipped")
+
+
+def json_path(key: str) -> str:
+    """
+    JSON path addressing a top-level key, quoted so flattened Sirene
+    keys like "adresseEtablissement.codePostalEtablissement" stay one key.
+    """
+    return '$."' + key.replace('"', '\\"') + '"'
+
+
+def _filters(project_id: int, status: Optional[str], min_diffs: Optional[int], max_diffs: Optional[int], field: Optional[str]) -> List[Any]:
+    clauses = [ReconciliationTask.project_id == project_id]
+    if status:
+        clauses.append(ReconciliationTask.status == status)
+    if min_diffs is not None:
+        clauses.append(ReconciliationTask.diff_count >= min_diffs)
+    if max_diffs is not None:
+        clauses.append(ReconciliationTask.diff_count <= max_diffs)
+    if field:
+        # Escaped: "_" and "%" are common in column names and must not act as wildcards
+        clauses.append(ReconciliationTask.diff_fields.contains(f"|{field}|", autoescape=True))
+    return clauses
+
+
+def count_tasks(project_id: int, status: Optional[str] = None, min_diffs: Optional[int] = None,
+                max_diffs: Optional[int] = None, field: Optional[str] = None) -> int:
+    with Session(engine) as session:
+        statement = select(func.count(ReconciliationTask.id)).where(*_filters(project_id, status, min_diffs, max_diffs, field))
+        return session.exec(statement).one()
+
+
+def query_tasks(project_id: int, status: Optional[str] = None, min_diffs: Optional[int] = None,
+                max_diffs: Optional[int] = None, field: Optional[str] = None, sort: str = "id",
+                after: Optional[Tuple[Optional[int], int]] = None, limit: int = 200) -> List[ReconciliationTask]:
+    """
+    Returns one page of tasks for the review grid.
+    Pages are seeked with `after` = (diff_count, id) of the last row already loaded,
+    so deep pages cost the same as the first one.
+    """
+    clauses = _filters(project_id, status, min_diffs, max_diffs, field)
+
+    if sort == "diff_count":
+        # Most differences first, unknown diff counts last. Both keys descend, so
+        # SQLite walks ix_task_project_status_diff backwards instead of sorting
+        diff = ReconciliationTask.diff_count
+        if after is not None:
+            last_diff, last_id = after
+            if last_diff is None:
+                clauses.append(and_(diff == None, ReconciliationTask.id < last_id))
+            else:
+                clauses.append(or_(
+                    diff < last_diff,
+                    and_(diff == last_diff, ReconciliationTask.id < last_id),
+                    diff == None
+                ))
+        order = [diff.desc().nulls_last(), ReconciliationTask.id.desc()]
+    else:
+        if after is not None:
+            clauses.append(ReconciliationTask.id > after[1])
+        order = [ReconciliationTask.id]
+
+    with Session(engine) as session:
+        statement = select(ReconciliationTask).where(*clauses).order_by(*order).limit(limit)
+        return list(session.exec(statement).all())
+
+
+def backfill_diffs(project_id: int, batch_size: int = 5000) -> int:
+    """
+    Computes diff columns for tasks created before they existed.
+    """
+    updated = 0
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            return 0
+        field_map = project.mapping_config.get("field_map", {})
+
+        last_id = 0
+        while True:
+            statement = select(ReconciliationTask).where(
+                ReconciliationTask.project_id == project_id,
+                ReconciliationTask.diff_count == None,
+                ReconciliationTask.candidate_data != None,
+                ReconciliationTask.id > last_id
+            ).order_by(ReconciliationTask.id).limit(batch_size)
+            tasks = session.exec(statement).all()
+            if not tasks:
+                break
+            for task in tasks:
+                task.diff_count, task.diff_fields = compute_diff(task.target_data, task.candidate_data, field_map)
+                session.add(task)
+                if task.diff_count is not None:
+                    updated += 1
+            last_id = tasks[-1].id
+            session.commit()
+
+    if updated:
+        logger.info(f"Backfilled diff counts for {updated} tasks of Project {project_id}")
+    return updated
+
+
+def complete_if_done(session: Session, project_id: int) -> bool:
+    """
+    Marks a project under review Completed once none of its tasks is Pending,
+    which makes it archivable (see app.maintenance). Runs in the session that
+    resolved the tasks, so both land in the same commit.
+    """
+    pending = session.exec(select(ReconciliationTask.id).where(
+        ReconciliationTask.project_id == project_id,
+        ReconciliationTask.status == "Pending"
+    ).limit(1)).first()
+    if pending is not None:
+        return False
+    project = session.get(Project, project_id)
+    if not project or project.status not in ("Processing", "Validation"):
+        return False
+    project.status = "Completed"
+    session.add(project)
+    logger.info(f"Project {project_id} has no pending task left, marked Completed")
+    return True
+
+
+def bulk_decide(project_id: int, task_ids: List[int], decision: str) -> int:
+    """
+    Resolves many tasks with one set-based UPDATE per chunk of ids.
+    "Keep Target" copies target_data; "Accept Source" overlays every mapped
+    Source value that is not null, like the card's "Keep All B" button.
+    Tasks under a live lease of another reviewer are left alone.
+    """
+    if decision not in ("Keep Target", "Accept Source"):
+        raise ValueError(f"Unsupported bulk decision: {decision}")
+
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            return 0
+        field_map = project.mapping_config.get("field_map", {})
+
+        params: Dict[str, Any] = {"project_id": project_id, "decision": decision, "now": utc_now()}
+        # Keep Target copies the stored blob as is; Accept Source edits the
+        # decoded JSON (app.codec), decoded once per row in a materialized CTE
+        final_expr = "target_data"
+        decoded = ""
+        if decision == "Accept Source":
+            decoded = ", rl_json(target_data) AS t_json, rl_json(candidate_data) AS c_json"
+            expr = "d.t_json"
+            for i, (t_col, s_col) in enumerate(field_map.items()):
+                params[f"t{i}"] = json_path(t_col)
+                params[f"s{i}"] = json_path(s_col)
+                expr = (
+                    f"json_set({expr}, :t{i}, "
+                    f"coalesce(json_extract(d.c_json, :s{i}), json_extract(d.t_json, :t{i})))"
+                )
+            final_expr = f"rl_pack({expr})"
+
+        updated = 0
+        for i in range(0, len(task_ids), ID_CHUNK_SIZE):
+            chunk = task_ids[i:i + ID_CHUNK_SIZE]
+            id_params = {f"id{j}": task_id for j, task_id in enumerate(chunk)}
+            id_list = ", ".join(f":id{j}" for j in range(len(chunk)))
+            statement = text(f"""
+                WITH d AS MATERIALIZED (
+                    SELECT id AS task_id{decoded}
+                    FROM reconciliationtask
+                    WHERE project_id = :project_id AND id IN ({id_list})
+                    AND (lease_expires_at IS NULL OR lease_expires_at < :now)
+                )
+                UPDATE reconciliationtask
+                SET status = 'Resolved', decision = :decision, final_data = {final_expr},
+                    decided_at = :now, lease_owner = NULL, lease_expires_at = NULL
+                FROM d WHERE reconciliationtask.id = d.task_id
+            """).bindparams(bindparam("now", type_=DateTime()))
+            session.connection().execute(statement, {**params, **id_params})
+            # rowcount is not reported for statements starting with WITH
+            updated += session.connection().execute(text("SELECT changes()")).scalar()
+        if updated:
+            complete_if_done(session, project_id)
+        session.commit()
+
+    logger.info(f"Bulk '{decision}' applied to {updated} tasks of Project {project_id}")
+    return updated
+
+
+def source_overlay(target_data: Dict, candidate_data: Optional[Dict], field_map: Dict[str, str]) -> Dict:
+    """
+    Target values with every non-null mapped Source value laid over them.
+    Python counterpart of the "Accept Source" expression in bulk_decide.
+    """
+    final_data = dict(target_data)
+    if candidate_data:
+        for t_col, s_col in field_map.items():
+            s_val = candidate_data.get(s_col)
+            if s_val is not None:
+                final_data[t_col] = s_val
+    return final_data
+
+
+def card_rows(target_data: Dict, candidate_data: Optional[Dict], final_data: Optional[Dict],
+              field_map: Dict[str, str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    The fields of a compact validation card, split in two: those the reviewer has to look at
+    (the Source disagrees with the Target, or a rule pre-filled another golden value) and
+    the identical or unmapped rest, which the card only renders on demand.
+    """
+    needs_review, rest = [], []
+    for key, target_val in target_data.items():
+        source_field = field_map.get(key)
+        source_val = candidate_data.get(source_field) if source_field and candidate_data else None
+        golden_val = final_data.get(key, target_val) if final_data else target_val
+        differs = source_val is not None and str(source_val) != str(target_val)
+        row = {"key": key, "target": target_val, "source": source_val, "golden": str(golden_val), "differs": differs}
+        (needs_review if differs or str(golden_val) != str(target_val) else rest).append(row)
+    return needs_review, rest
+
+
+def typed_golden(golden: Dict[str, str], target_data: Dict, candidate_data: Optional[Dict],
+                 final_data: Optional[Dict], field_map: Dict[str, str]) -> Dict[str, Any]:
+    """
+    The final data of a validation card, whose inputs hold text: a value that reads like
+    the Target, Source or pre-filled one gets that value back with its type (1, not "1";
+    None, not "None"), so an unedited confirmation equals the Target. Typed-in values stay text.
+    """
+    typed = {}
+    for key, text_val in golden.items():
+        source_field = field_map.get(key)
+        originals = [target_data.get(key),
+                     candidate_data.get(source_field) if source_field and candidate_data else None,
+                     final_data.get(key) if final_data else None]
+        typed[key] = next((v for v in originals if str(v) == text_val), text_val)
+    return typed
+
+
+def claim_tasks(project_id: int, owner: str, limit: int, exclude_ids: Iterable[int] = (),
+                ttl_seconds: int = LEASE_SECONDS) -> List[ReconciliationTask]:
+    """
+    Atomically leases up to `limit` pending tasks to `owner` with a single
+    UPDATE ... RETURNING, so concurrent reviewers never get the same task.
+    Unleased and expired tasks are claimable, as are the owner's own leases
+    (e.g. after a page reload) unless listed in `exclude_ids`.
+    """
+    now = utc_now()
+    candidates = select(ReconciliationTask.id).where(
+        ReconciliationTask.project_id == project_id,
+        ReconciliationTask.status == "Pending",
+        or_(
+            ReconciliationTask.lease_expires_at == None,
+            ReconciliationTask.lease_expires_at < now,
+            ReconciliationTask.lease_owner == owner
+        ),
+        ReconciliationTask.id.not_in(list(exclude_ids))
+    ).order_by(ReconciliationTask.id).limit(limit)
+
+    statement = update(ReconciliationTask).where(
+        ReconciliationTask.id.in_(candidates.scalar_subquery())
+    ).values(
+        lease_owner=owner,
+        lease_expires_at=now + timedelta(seconds=ttl_seconds)
+    ).returning(ReconciliationTask)
+
+    # Returned tasks are used after the session closes
+    with NEXT_TASK_SECONDS.time(project=project_id), Session(engine, expire_on_commit=False) as session:
+        tasks = list(session.execute(statement).scalars().all())
+        session.commit()
+    return sorted(tasks, key=lambda t: t.id)
+
+
+def claim_task(project_id: int, task_id: int, owner: str, ttl_seconds: int = LEASE_SECONDS) -> Optional[ReconciliationTask]:
+    """
+    Leases one task the reviewer picked (search result, shared link) like claim_tasks
+    would. Decided tasks are returned without a lease, to be reviewed again. None when
+    the task is not in the project or is pending under another reviewer's lease.
+    """
+    now = utc_now()
+    statement = update(ReconciliationTask).where(
+        ReconciliationTask.id == task_id,
+        ReconciliationTask.project_id == project_id,
+        ReconciliationTask.status == "Pending",
+        or_(
+            ReconciliationTask.lease_expires_at == None,
+            ReconciliationTask.lease_expires_at < now,
+            ReconciliationTask.lease_owner == owner
+        )
+    ).values(
+        lease_owner=owner,
+        lease_expires_at=now + timedelta(seconds=ttl_seconds)
+    ).returning(ReconciliationTask)
+
+    with Session(engine, expire_on_commit=False) as session:
+        task = session.execute(statement).scalars().first()
+        session.commit()
+        if task is None:
+            task = session.get(ReconciliationTask, task_id)
+            if task is None or task.project_id != project_id or task.status == "Pending":
+                return None
+    return task
+
+
+def renew_leases(owner: str, ttl_seconds: int = LEASE_SECONDS) -> int:
+    """
+    Heartbeat: extends every pending lease held by `owner`.
+    """
+    statement = update(ReconciliationTask).where(
+        ReconciliationTask.lease_owner == owner,
+        ReconciliationTask.status == "Pending"
+    ).values(lease_expires_at=utc_now() + timedelta(seconds=ttl_seconds))
+
+    with Session(engine) as session:
+        result = session.execute(statement)
+        session.commit()
+        return result.rowcount
+
+
+def release_leases(owner: str) -> int:
+    """
+    Gives back the pending tasks held by `owner`, e.g. when its page is closed.
+    """
+    statement = update(ReconciliationTask).where(
+        ReconciliationTask.lease_owner == owner,
+        ReconciliationTask.status == "Pending"
+    ).values(lease_owner=None, lease_expires_at=None)
+
+    with Session(engine) as session:
+        result = session.execute(statement)
+        session.commit()
+        return result.rowcount
+
+
+def record_decision(task_id: int, decision: Optional[str], final_data: Optional[Dict], status: str = "Resolved",
+                    owner: Optional[str] = None) -> bool:
+    """
+    Persists one reviewer decision and clears its lease. Returns False when the
+    task no longer exists or, if `owner` is given, was claimed by another reviewer.
+    """
+    start = time.perf_counter()
+    now = utc_now()
+    clauses = [ReconciliationTask.id == task_id]
+    if owner:
+        # Checked in the UPDATE itself, so a claim made meanwhile can never be overwritten
+        clauses.append(or_(
+            ReconciliationTask.lease_owner == None,
+            ReconciliationTask.lease_owner == owner,
+            ReconciliationTask.lease_expires_at < now
+        ))
+    statement = update(ReconciliationTask).where(*clauses).values(
+        decision=decision,
+        status=status,
+        final_data=final_data,
+        decided_at=now,
+        lease_owner=None,
+        lease_expires_at=None
+    ).returning(ReconciliationTask.project_id)
+
+    with Session(engine) as session:
+        project_id = session.execute(statement).scalar()
+        if project_id is not None and status != "Pending":
+            complete_if_done(session, project_id)
+        session.commit()
+    if project_id is None:
+        if owner:
+            logger.warning(f"Task {task_id} is gone or leased to another reviewer, decision dropped")
+        return False
+    DECISION_SECONDS.observe(time.perf_counter() - start, project=project_id)
+    DECISIONS.inc(project=project_id, status=status)
+    return True
+
+
+def backfill_task_keys(project_id: int) -> int:
+    """
+    Fills task_key for tasks created before it existed, or restored from an archive.
+    """
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        key_column = project.mapping_config.get("join_key", {}).get("target") if project else None
+        if not key_column:
+            return 0
+        missing = session.exec(select(ReconciliationTask.id).where(
+            ReconciliationTask.project_id == project_id, ReconciliationTask.task_key == None).limit(1)).first()
+        if missing is None:
+            return 0
+        session.connection().execute(text("""
+            UPDATE reconciliationtask
+            SET task_key = CAST(json_extract(rl_json(target_data), :path) AS TEXT)
+            WHERE project_id = :project_id AND task_key IS NULL
+        """), {"project_id": project_id, "path": json_path(key_column)})
+        updated = session.connection().execute(text("SELECT changes()")).scalar()
+        session.commit()
+
+    logger.info(f"Backfilled task keys for {updated} tasks of Project {project_id}")
+    return updated
+
+
+def _check_decision(entry: Any) -> Optional[str]:
+    if not isinstance(entry, dict):
+        return "expected a JSON object"
+    if ("task_id" in entry) == ("key" in entry):
+        return "give exactly one of task_id and key"
+    if "task_id" in entry and (not isinstance(entry["task_id"], int) or isinstance(entry["task_id"], bool)):
+        return "task_id must be an integer"
+    if entry.get("decision") not in API_DECISIONS:
+        return f"decision must be one of {', '.join(API_DECISIONS)}"
+    if entry.get("status", "Resolved") not in API_STATUSES:
+        return f"status must be one of {', '.join(API_STATUSES)}"
+    final_data = entry.get("final_data")
+    if final_data is not None and not isinstance(final_data, dict):
+        return "final_data must be an object"
+    if final_data is None and entry["decision"] in ("Manual Edit", "User Confirmed"):
+        return f"final_data is required for '{entry['decision']}'"
+    return None
+
+
+def apply_decisions(project_id: int, entries: List[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+    """
+    Records a batch of externally made decisions in one transaction and returns
+    one result per (line number, parsed entry). An entry addresses its task by
+    task_id or by Target join key value ("key"), and its final_data may hold only
+    the fields it changes: it is laid over the Target row, whose columns it must
+    use. Without final_data, "Keep Target" keeps the Target row and "Accept Source"
+    takes every non-null mapped Source value. Tasks leased by a reviewer are refused.
+    """
+    start = time.perf_counter()
+    results: Dict[int, Dict[str, Any]] = {}
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for line, entry in entries:
+        error = _check_decision(entry)
+        if error:
+            results[line] = {"line": line, "error": error}
+        else:
+            valid.append((line, entry))
+
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"Project {project_id} not found")
+        field_map = project.mapping_config.get("field_map", {})
+
+        # Resolve join keys to task ids; a key shared by several Target rows is ambiguous
+        keys = list({str(entry["key"]) for _, entry in valid if "key" in entry})
+        ids_by_key: Dict[str, List[int]] = {}
+        for i in range(0, len(keys), ID_CHUNK_SIZE):
+            rows = session.exec(select(ReconciliationTask.task_key, ReconciliationTask.id).where(
+                ReconciliationTask.project_id == project_id,
+                ReconciliationTask.task_key.in_(keys[i:i + ID_CHUNK_SIZE])))
+            for key, task_id in rows:
+                ids_by_key.setdefault(key, []).append(task_id)
+
+        targets: List[Tuple[int, Dict[str, Any], Optional[int]]] = []
+        for line, entry in valid:
+            if "task_id" in entry:
+                targets.append((line, entry, entry["task_id"]))
+                continue
+            ids = ids_by_key.get(str(entry["key"]), [])
+            if len(ids) != 1:
+                results[line] = {"line": line, "error": f"key matches {len(ids)} tasks" + (", use task_id" if ids else "")}
+            else:
+                targets.append((line, entry, ids[0]))
+
+        now = utc_now()
+        leased = and_(ReconciliationTask.lease_expires_at != None, ReconciliationTask.lease_expires_at >= now)
+        task_ids = list({task_id for _, _, task_id in targets})
+        tasks: Dict[int, Tuple[ReconciliationTask, bool]] = {}
+        for i in range(0, len(task_ids), ID_CHUNK_SIZE):
+            rows = session.exec(select(ReconciliationTask, leased).where(
+                ReconciliationTask.project_id == project_id,
+                ReconciliationTask.id.in_(task_ids[i:i + ID_CHUNK_SIZE])))
+            for task, is_leased in rows:
+                tasks[task.id] = (task, bool(is_leased))
+
+        updates = []
+        for line, entry, task_id in targets:
+            task, is_leased = tasks.get(task_id, (None, False))
+            if task is None:
+                results[line] = {"line": line, "error": f"task {task_id} not found in project {project_id}"}
+                continue
+            if is_leased:
+                results[line] = {"line": line, "task_id": task_id, "error": "task is open in a reviewer's card"}
+                continue
+            final_data = entry.get("final_data")
+            unknown = set(final_data or {}) - set(task.target_data)
+            if unknown:
+                results[line] = {"line": line, "task_id": task_id, "error": f"unknown fields: {', '.join(sorted(unknown))}"}
+                continue
+            if final_data is not None:
+                final_data = {**task.target_data, **final_data}
+            elif entry["decision"] == "Accept Source":
+                final_data = source_overlay(task.target_data, task.candidate_data, field_map)
+            else:
+                final_data = dict(task.target_data)
+            status = entry.get("status", "Resolved")
+            updates.append({"id": task_id, "status": status, "decision": entry["decision"], "final_data": final_data, "now": now})
+            results[line] = {"line": line, "task_id": task_id, "status": status}
+
+        if updates:
+            session.connection().execute(text("""
+                UPDATE reconciliationtask
+                SET status = :status, decision = :decision, final_data = :final_data,
+                    decided_at = :now, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = :id
+            """).bindparams(bindparam("final_data", type_=CompactJSON()), bindparam("now", type_=DateTime())), updates)
+            complete_if_done(session, project_id)
+        session.commit()
+
+    for status in API_STATUSES:
+        recorded = sum(1 for u in updates if u["status"] == status)
+        if recorded:
+            DECISIONS.inc(recorded, project=project_id, status=status)
+    logger.info(f"Recorded {len(updates)} of {len(entries)} API decisions for Project {project_id} in {time.perf_counter() - start:.2f} s")
+    return [results[line] for line, _ in entries]
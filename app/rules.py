@@ -0,0 +1,146 @@
+from sqlmodel import Session
+from sqlalchemy import text, bindparam, DateTime
+from app.models import Project, utc_now
+from app.db import engine
+from app.review import json_path, complete_if_done
+from loguru import logger
+from typing import Dict, Any, List, Tuple
+
+# Conditions on the Source value (s) and Target value (t) of one mapped field
+CONDITIONS = {
+    "source_not_null": "{s} IS NOT NULL",
+    "source_differs": "{s} IS NOT NULL AND CAST({s} AS TEXT) IS NOT CAST({t} AS TEXT)",
+    "target_empty": "{s} IS NOT NULL AND ({t} IS NULL OR CAST({t} AS TEXT) = '')",
+}
+
+ACTIONS = ["take_source", "keep_target"]
+
+RULE_DECISION = "Rule Applied"
+
+
+def validate_rules(rules: List[Dict[str, Any]], field_map: Dict[str, str]) -> None:
+    """
+    Raises ValueError on the first rule that cannot be compiled.
+    Rules look like {"field": "postcode", "when": "source_differs", "action": "take_source"}.
+    """
+    for i, rule in enumerate(rules, start=1):
+        field = rule.get("field")
+        if field not in field_map:
+            raise ValueError(f"Rule {i}: field '{field}' is not mapped to a Source field")
+        if rule.get("action") not in ACTIONS:
+            raise ValueError(f"Rule {i}: unknown action '{rule.get('action')}'")
+        if rule.get("action") == "take_source" and rule.get("when") not in CONDITIONS:
+            raise ValueError(f"Rule {i}: unknown condition '{rule.get('when')}'")
+
+
+def compile_rules(rules: List[Dict[str, Any]], field_map: Dict[str, str]) -> Tuple[List[str], str, Dict[str, Any]]:
+    """
+    Turns the rules into SQL over one decoded task row, exposing the JSON
+    text of target_data as t_json and of candidate_data as c_json.
+    Returns one match predicate per rule, the final_data JSON expression and its
+    bound parameters. A "keep_target" rule pins its field: "take_source" rules
+    listed after it never fire, and its own predicate counts the tasks it protects.
+    """
+    validate_rules(rules, field_map)
+
+    params: Dict[str, Any] = {}
+    predicates: List[str] = []
+    # Field -> conditions of the take_source rules that may overwrite it
+    overwrites: Dict[str, List[str]] = {}
+    pinned = set()
+
+    for i, rule in enumerate(rules):
+        field = rule["field"]
+        params[f"rt{i}"] = json_path(field)
+        params[f"rs{i}"] = json_path(field_map[field])
+        t = f"json_extract(t_json, :rt{i})"
+        s = f"json_extract(c_json, :rs{i})"
+
+        if rule["action"] == "keep_target":
+            pinned.add(field)
+            predicates.append(f"({CONDITIONS['source_differs'].format(s=s, t=t)})")
+        elif field in pinned:
+            predicates.append("0")
+        else:
+            condition = f"({CONDITIONS[rule['when']].format(s=s, t=t)})"
+            predicates.append(condition)
+            overwrites.setdefault(field, []).append(condition)
+
+    # All take_source rules of a field write the same Source value, so one CASE per field
+    final_expr = "t_json"
+    for field, conditions in overwrites.items():
+        i = next(i for i, r in enumerate(rules) if r["field"] == field)
+        final_expr = (
+            f"json_set({final_expr}, :rt{i}, CASE WHEN {' OR '.join(conditions)} "
+            f"THEN json_extract(c_json, :rs{i}) ELSE json_extract(t_json, :rt{i}) END)"
+        )
+
+    return predicates, final_expr, params
+
+
+# Pending tasks of the project that no reviewer currently holds, decoded once
+# per row (app.codec) before the rule expressions read them
+DECODED_PENDING = """
+    WITH d AS MATERIALIZED (
+        SELECT id AS task_id, rl_json(target_data) AS t_json, rl_json(candidate_data) AS c_json
+        FROM reconciliationtask
+        WHERE project_id = :project_id AND status = 'Pending'
+        AND (lease_expires_at IS NULL OR lease_expires_at < :now)
+    )
+"""
+
+
+def apply_rules(project_id: int, rules: List[Dict[str, Any]], dry_run: bool = True, resolve: bool = True) -> Dict[str, Any]:
+    """
+    Runs the decision rules over every pending task of a project as set-based SQL.
+    The dry run only counts, per rule, the tasks it would change. Otherwise the
+    tasks where at least one "take_source" rule fires get their final_data and
+    the "Rule Applied" decision, and are resolved unless `resolve` is False.
+    """
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"Project {project_id} not found")
+        field_map = project.mapping_config.get("field_map", {})
+
+        predicates, final_expr, params = compile_rules(rules, field_map)
+        take_source = [p for p, r in zip(predicates, rules) if r["action"] == "take_source" and p != "0"]
+        any_match = " OR ".join(take_source) if take_source else "0"
+
+        params.update(project_id=project_id, now=utc_now())
+        now_param = bindparam("now", type_=DateTime())
+
+        counts = ", ".join(f"coalesce(sum(CASE WHEN {p} THEN 1 ELSE 0 END), 0)" for p in predicates + [any_match])
+        row = session.connection().execute(
+            text(f"{DECODED_PENDING} SELECT count(*), {counts} FROM d").bindparams(now_param),
+            params
+        ).one()
+
+        report = {
+            "pending": row[0],
+            "per_rule": list(row[1:-1]),
+            "matched": row[-1],
+            "applied": 0,
+        }
+        if dry_run or not take_source:
+            return report
+
+        status_sql = ", status = 'Resolved'" if resolve else ""
+        session.connection().execute(
+            text(f"""
+                {DECODED_PENDING}
+                UPDATE reconciliationtask
+                SET final_data = rl_pack({final_expr}), decision = :decision{status_sql},
+                    decided_at = :now, lease_owner = NULL, lease_expires_at = NULL
+                FROM d WHERE reconciliationtask.id = d.task_id AND ({any_match})
+            """).bindparams(now_param),
+            {**params, "decision": RULE_DECISION}
+        )
+        # rowcount is not reported for statements starting with WITH
+        report["applied"] = session.connection().execute(text("SELECT changes()")).scalar()
+        if resolve and report["applied"]:
+            complete_if_done(session, project_id)
+        session.commit()
+
+    logger.info(f"Applied {len(rules)} rules to {report['applied']} tasks of Project {project_id}")
+    return report
@@ -0,0 +1,67 @@
+"""
+Finding tasks without paging through them: by task id ("#123"), by exact
+Target join key, or by full-text search over the Target and Source values,
+served by the task_search FTS5 index (see app.db.create_search_index).
+"""
+from sqlmodel import Session, select
+from sqlalchemy import text
+from app.db import engine
+from app.models import ReconciliationTask
+from app.metrics import SEARCH_SECONDS
+from app.siret import normalize_siret
+from typing import List, Optional
+import re
+
+SEARCH_LIMIT = 20
+
+TASK_ID = re.compile(r"#(\d+)")
+
+
+def match_expression(project_id: int, query: str) -> Optional[str]:
+    """
+    FTS5 query for the terms of `query` within one project, all required. A term
+    is a whitespace-separated chunk, matched as a phrase ("c0-123" finds the words
+    c0 and 123 side by side); one ending in * matches as a prefix. Terms are quoted,
+    so nothing else of the user input reaches the FTS5 query syntax.
+    """
+    terms = [t for t in query.split() if re.search(r"\w", t)]
+    if not terms:
+        return None
+    phrases = " ".join('"' + t.rstrip("*").replace('"', '""') + '"' + ("*" if t.endswith("*") else "") for t in terms)
+    return f'project:"{project_id}" AND body:({phrases})'
+
+
+def search_tasks(project_id: int, query: str, limit: int = SEARCH_LIMIT) -> List[ReconciliationTask]:
+    """
+    Tasks of the project matching `query`, exact matches first: the task id,
+    then the join key (a SIRET with or without separators), then full-text
+    matches in task order.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    with SEARCH_SECONDS.time(project=project_id), Session(engine) as session:
+        ids: List[int] = []
+        id_match = TASK_ID.fullmatch(query)
+        if id_match:
+            ids.append(int(id_match.group(1)))
+
+        keys = {query, normalize_siret(query)}
+        ids += session.exec(select(ReconciliationTask.id).where(
+            ReconciliationTask.project_id == project_id,
+            ReconciliationTask.task_key.in_(keys)
+        ).order_by(ReconciliationTask.id).limit(limit)).all()
+
+        expression = match_expression(project_id, query)
+        if expression and len(ids) < limit:
+            ids += session.execute(text(
+                "SELECT rowid FROM task_search WHERE task_search MATCH :expression ORDER BY rowid LIMIT :limit"
+            ), {"expression": expression, "limit": limit}).scalars().all()
+
+        ids = list(dict.fromkeys(ids))[:limit]
+        tasks = session.exec(select(ReconciliationTask).where(
+            ReconciliationTask.project_id == project_id,
+            ReconciliationTask.id.in_(ids)
+        )).all()
+    order = {task_id: i for i, task_id in enumerate(ids)}
+    return sorted(tasks, key=lambda t: order[t.id])
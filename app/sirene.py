@@ -1,7 +1,16 @@
 import httpx
-from typing import Dict, Any, List, Optional
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Any, List, Optional, Iterable, Tuple
 from loguru import logger
 import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from app.metrics import (SIRENE_SECONDS, SIRENE_RESPONSES, SIRENE_RATE_LIMITED, SIRENE_RETRY_AFTER, SIRENE_COALESCED,
+                         SIRENE_QUEUE_DEPTH, SIRENE_QUEUE_SECONDS, SIRENE_RETRIES, SIRENE_CIRCUIT_OPEN)
 
 class RateLimitExceeded(Exception):
     """
@@ -11,11 +20,164 @@ class RateLimitExceeded(Exception):
         self.retry_after = retry_after
         super().__init__(f"Rate limit exceeded. Retry after {retry_after} seconds.")
 
+class SireneError(Exception):
+    """
+    A lookup that failed, as opposed to a SIRET the API does not know (None).
+    Transient failures (timeouts, network errors, 5xx) were already retried.
+    """
+    def __init__(self, message: str, transient: bool = True):
+        self.transient = transient
+        super().__init__(message)
+
+# Transient failures: attempts per lookup, with exponential backoff and full jitter
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` transient failures in a row, from any client: then
+    background lookups wait `cooldown` seconds and interactive ones fail fast.
+    After the cooldown lookups go again; one more failure reopens it at once,
+    one success closes it.
+    """
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+
+    def remaining(self) -> float:
+        """
+        Seconds until lookups may go again, 0 while closed.
+        """
+        return max(0.0, self.open_until - time.monotonic())
+
+    def success(self) -> None:
+        if self.failures >= self.threshold:
+            logger.info("Sirene API is back, circuit closed")
+        self.failures = 0
+        SIRENE_CIRCUIT_OPEN.set(0)
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.open_until = time.monotonic() + self.cooldown
+            SIRENE_CIRCUIT_OPEN.set(1)
+            logger.error(f"Sirene API failing ({self.failures} errors in a row), circuit open for {self.cooldown:.0f}s")
+
+# Requests of a reviewer waiting on a card go ahead of background enrichment
+PRIORITIES = {"interactive": 0, "background": 1}
+
+
+class QuotaGovernor:
+    """
+    Paces the Sirene requests of the whole process to the API quota: at most
+    `limit` requests in any sliding `window` seconds (0 = unlimited), and none
+    at all until a Retry-After received by any client has elapsed. Waiting
+    requests are served by priority, then in arrival order.
+    """
+    def __init__(self, limit: int, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self._sent: Deque[float] = deque()
+        self._paused_until = 0.0
+        self._queue: List[list] = []  # Heap of [priority, arrival, wake-up future]
+        self._arrivals = itertools.count()
+
+    def _delay(self, now: float) -> float:
+        while self._sent and now - self._sent[0] >= self.window:
+            self._sent.popleft()
+        delay = self._paused_until - now
+        if self.limit and len(self._sent) >= self.limit:
+            delay = max(delay, self._sent[0] + self.window - now)
+        return delay
+
+    def _wake_head(self) -> None:
+        if self._queue and not self._queue[0][2].done():
+            self._queue[0][2].set_result(None)
+
+    def depth(self) -> Dict[str, int]:
+        """
+        Requests waiting, per priority class.
+        """
+        return {name: sum(1 for entry in self._queue if entry[0] == rank) for name, rank in PRIORITIES.items()}
+
+    def _report(self) -> None:
+        for name, waiting in self.depth().items():
+            SIRENE_QUEUE_DEPTH.set(waiting, priority=name)
+
+    async def acquire(self, priority: str = "background") -> None:
+        """
+        Waits for a request slot. Only the head of the queue watches the clock,
+        the others sleep until the request ahead of them has gone.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        entry = [PRIORITIES[priority], next(self._arrivals), loop.create_future()]
+        heapq.heappush(self._queue, entry)
+        self._report()
+        try:
+            while True:
+                delay = None
+                if self._queue[0] is entry:
+                    delay = self._delay(time.monotonic())
+                    if delay <= 0:
+                        break
+                entry[2] = loop.create_future()
+                try:
+                    await asyncio.wait_for(entry[2], delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._wake_head()
+            self._report()
+            raise
+        heapq.heappop(self._queue)
+        self._sent.append(time.monotonic())
+        self._wake_head()
+        self._report()
+        SIRENE_QUEUE_SECONDS.observe(time.monotonic() - start, priority=priority)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds every request back for `seconds`, after a 429 with Retry-After.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._wake_head()
+
+
+# One governor and one breaker for every client of the process. INSEE's default plan allows
+# 30 requests per minute; SIRENE_QUOTA_PER_MINUTE=0 disables the pacing.
+governor = QuotaGovernor(int(os.getenv("SIRENE_QUOTA_PER_MINUTE", "30")))
+breaker = CircuitBreaker()
+
+
+# SIRET lookups in flight in this process, by (base URL, SIRET), shared by every client
+_in_flight: Dict[Tuple[str, str], "asyncio.Future"] = {}
+
+
+def _forget(key: Tuple[str, str], future: "asyncio.Future") -> None:
+    if _in_flight.get(key) is future:
+        del _in_flight[key]
+    if not future.cancelled():
+        future.exception()  # Retrieved, even when every waiter went away
+
 class SireneClient:
     BASE_URL = "https://api.insee.fr/api-sirene/3.11"
 
-    def __init__(self, api_key: Optional[str] = None):
+    # Always kept when a candidate is projected on the mapped fields
+    KEY_FIELDS = ["siret", "siren"]
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, priority: str = "background"):
         self.api_key = api_key
+        # Queue class of this client's requests in the process-wide quota governor
+        self.priority = priority
+        # SIRENE_BASE_URL points every client at another server, e.g. benchmarks/mock_sirene.py
+        self.base_url = (base_url or os.getenv("SIRENE_BASE_URL") or self.BASE_URL).rstrip("/")
         self.headers = {
             "X-INSEE-Api-Key-Integration": api_key,
             "Accept": "application/json"
@@ -38,10 +200,10 @@ class SireneClient:
         """
         Checks connectivity to the SIRENE API using the /informations endpoint.
         """
-        url = f"{self.BASE_URL}/informations"
+        url = f"{self.base_url}/informations"
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=self.headers, timeout=5.0)
+                response = await self._get(client, "informations", url, timeout=5.0)
                 if response.status_code == 200:
                     return True
                 logger.error(f"API Connection Check Failed: {response.status_code} {response.text}")
@@ -50,44 +212,141 @@ class SireneClient:
             logger.error(f"API Connection Check Exception: {e}")
             return False
 
+    async def _get(self, client: httpx.AsyncClient, endpoint: str, url: str, timeout: float,
+                   params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """
+        GET through the quota governor, with latency and status code metrics
+        (status "error" when no response came back).
+        """
+        await governor.acquire(self.priority)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await client.get(url, headers=self.headers, timeout=timeout, params=params)
+            status = str(response.status_code)
+            if status == "429":
+                governor.pause(self._retry_after(response))
+            return response
+        finally:
+            SIRENE_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            SIRENE_RESPONSES.inc(endpoint=endpoint, status=status)
+            if status == "429":
+                SIRENE_RATE_LIMITED.inc()
+
+    @staticmethod
+    def _retry_after(response: httpx.Response, default: int = 60) -> int:
+        try:
+            return int(response.headers.get("Retry-After", default))
+        except ValueError:
+            return default
+
+    def project_fields(self, flat: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+        """
+        Keeps only the given flattened fields, plus the identifiers.
+        """
+        keep = [*self.KEY_FIELDS, *fields]
+        return {k: flat[k] for k in keep if k in flat}
+
     async def get_by_siret(self, siret: str) -> Optional[Dict[str, Any]]:
         """
         Fetches establishment data by SIRET. Returns a flattened dictionary.
         Raises RateLimitExceeded if HTTP 429 is encountered.
         """
-        url = f"{self.BASE_URL}/siret/{siret}"
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=self.headers, timeout=10.0)
+        raw = await self.fetch_siret(siret)
+        return self.flatten_json(raw) if raw is not None else None
 
+    async def fetch_siret(self, siret: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetches the raw (nested) establishment document by SIRET.
+        Concurrent calls for the same SIRET (worker, validation pages) share
+        one request and its outcome.
+        Returns None if the API does not know the SIRET.
+        Raises RateLimitExceeded if HTTP 429 is encountered, SireneError if the lookup failed.
+        """
+        key = (self.base_url, siret)
+        future = _in_flight.get(key)
+        if future is not None and future.get_loop() is asyncio.get_running_loop():
+            SIRENE_COALESCED.inc()
+        else:
+            future = asyncio.ensure_future(self._fetch_siret(siret))
+            _in_flight[key] = future
+            future.add_done_callback(lambda f: _forget(key, f))
+        # A waiter that is cancelled (page closed) leaves the request running for the others
+        return await asyncio.shield(future)
+
+    async def _wait_for_breaker(self) -> None:
+        wait = breaker.remaining()
+        if not wait:
+            return
+        if self.priority == "interactive":
+            raise SireneError(f"Sirene API unavailable, lookups paused for {wait:.0f}s")
+        logger.warning(f"Sirene API unavailable, waiting {wait:.0f}s")
+        await asyncio.sleep(wait)
+
+    async def _request(self, endpoint: str, url: str, what: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        GET returning the JSON body, or None on 404 (nothing found). Transient
+        failures are retried with backoff; raises RateLimitExceeded or SireneError.
+        """
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            await self._wait_for_breaker()
+            try:
+                async with httpx.AsyncClient() as client:
+                    response = await self._get(client, endpoint, url, timeout=10.0, params=params)
+            except httpx.HTTPError as e:
+                # Timeouts and connection errors
+                error = f"{type(e).__name__}: {e}"
+            else:
                 if response.status_code == 200:
-                    data = response.json()
-                    # The API returns wrapper like {"etablissement": {...}, "header": ...}
-                    # We are interested in "etablissement"
-                    if "etablissement" in data:
-                        return self.flatten_json(data["etablissement"])
-                    return self.flatten_json(data) # Fallback
+                    breaker.success()
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        raise SireneError(f"Invalid JSON response: {e}", transient=False)
                 elif response.status_code == 404:
-                    logger.warning(f"SIRET {siret} not found. {response.text}")
+                    breaker.success()
                     return None
                 elif response.status_code == 429:
                     logger.warning("Rate limit exceeded.")
-                    # Try to parse Retry-After header, default to 60s
-                    retry_after = 60
-                    if "Retry-After" in response.headers:
-                        try:
-                            retry_after = int(response.headers["Retry-After"])
-                        except ValueError:
-                            pass
+                    retry_after = self._retry_after(response)
+                    SIRENE_RETRY_AFTER.inc(retry_after)
                     raise RateLimitExceeded(retry_after)
-                else:
-                    logger.error(f"API Error {response.status_code}: {response.text}")
-                    return None
-        except RateLimitExceeded:
-            raise
-        except Exception as e:
-            logger.error(f"Request failed: {e}")
+                elif response.status_code < 500:
+                    raise SireneError(f"HTTP {response.status_code}: {response.text[:200]}", transient=False)
+                error = f"HTTP {response.status_code}"
+
+            breaker.failure()
+            if attempt < RETRY_ATTEMPTS:
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                logger.warning(f"{what}: {error}, retry {attempt} in {delay:.1f}s")
+                SIRENE_RETRIES.inc()
+                await asyncio.sleep(delay)
+
+        logger.error(f"{what}: {error} after {RETRY_ATTEMPTS} attempts")
+        raise SireneError(f"{error} after {RETRY_ATTEMPTS} attempts")
+
+    async def _fetch_siret(self, siret: str) -> Optional[Dict[str, Any]]:
+        data = await self._request("siret", f"{self.base_url}/siret/{siret}", f"SIRET {siret}")
+        if data is None:
+            logger.warning(f"SIRET {siret} not found.")
             return None
+        # The API returns wrapper like {"etablissement": {...}, "header": ...}
+        # We are interested in "etablissement"
+        if "etablissement" in data:
+            return data["etablissement"]
+        return data # Fallback
+
+    async def search_changed(self, sirets: List[str], since: datetime) -> List[Dict[str, Any]]:
+        """
+        The raw documents of the establishments among `sirets` that INSEE
+        updated since `since` (dateDernierTraitementEtablissement), in one
+        multi-criteria query. Unchanged ones cost nothing.
+        """
+        q = (f"dateDernierTraitementEtablissement:[{since:%Y-%m-%dT%H:%M:%S} TO *] AND "
+             f"({' OR '.join(f'siret:{siret}' for siret in sirets)})")
+        data = await self._request("search", f"{self.base_url}/siret", f"Search of {len(sirets)} SIRETs",
+                                   params={"q": q, "nombre": len(sirets)})
+        return data.get("etablissements", []) if data else []
 
     def get_common_fields(self) -> List[str]:
         """
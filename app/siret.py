@@ -0,0 +1,85 @@
+"""
+SIRET normalization and checksum validation, as DuckDB expressions so a whole
+Target column is checked in one vectorized pass before any Sirene API call.
+
+A SIRET is 14 digits: the 9-digit SIREN of the company followed by a 5-digit
+NIC. Both the SIREN and the full SIRET pass the Luhn checksum, except the
+establishments of La Poste (SIREN 356000000), whose SIRET digits sum to a
+multiple of 5 instead.
+"""
+from app.duckdb_client import duckdb_client
+from typing import Dict
+import re
+
+SIRET_LENGTH = 14
+SIREN_LENGTH = 9
+LA_POSTE_SIREN = "356000000"
+
+# Why a Target key is never sent to the API, stored on the task as key_issue
+KEY_ISSUES = {
+    "missing": "No SIRET",
+    "format": "Not a 14-digit SIRET",
+    "checksum": "Invalid SIRET checksum",
+}
+
+
+def normalized_sql(column: str) -> str:
+    """
+    The SIRET in a column, as text: separators (spaces, dots, dashes, slashes)
+    stripped, and leading zeros restored when the column was read as a number
+    or the value lost them on the way (10 to 13 digits left).
+    """
+    digits = f"regexp_replace(trim(CAST({column} AS VARCHAR)), '[\\s.\\-/]', '', 'g')"
+    return f"""CASE
+        WHEN regexp_full_match({digits}, '[0-9]{{1,13}}')
+             AND (typeof({column}) <> 'VARCHAR' OR length({digits}) >= 10)
+        THEN lpad({digits}, {SIRET_LENGTH}, '0')
+        ELSE NULLIF({digits}, '')
+    END"""
+
+
+def normalize_siret(value: str) -> str:
+    """
+    A SIRET as typed or pasted by a user, separators stripped as in normalized_sql.
+    """
+    return re.sub(r"[\s.\-/]", "", value)
+
+
+def _luhn_sql(value: str, length: int) -> str:
+    # Digits are numbered from the right; every second one is doubled, minus 9 above 9
+    digit = f"CAST(substr({value}, {length} - i, 1) AS INTEGER)"
+    return (f"list_sum(list_transform(range({length}), lambda i: CASE WHEN i % 2 = 1 "
+            f"THEN 2 * {digit} - CASE WHEN {digit} > 4 THEN 9 ELSE 0 END ELSE {digit} END)) % 10 = 0")
+
+
+def issue_sql(siret: str) -> str:
+    """
+    The key_issue of a normalized SIRET (see KEY_ISSUES), NULL when it is valid.
+    """
+    digit_sum = f"list_sum(list_transform(range(1, {SIRET_LENGTH + 1}), lambda i: CAST(substr({siret}, i, 1) AS INTEGER)))"
+    return f"""CASE
+        WHEN {siret} IS NULL THEN 'missing'
+        WHEN NOT regexp_full_match({siret}, '[0-9]{{{SIRET_LENGTH}}}') THEN 'format'
+        WHEN left({siret}, {SIREN_LENGTH}) = '{LA_POSTE_SIREN}' THEN
+            CASE WHEN {digit_sum} % 5 = 0 THEN NULL ELSE 'checksum' END
+        WHEN {_luhn_sql(siret, SIRET_LENGTH)} AND {_luhn_sql(f"left({siret}, {SIREN_LENGTH})", SIREN_LENGTH)} THEN NULL
+        ELSE 'checksum'
+    END"""
+
+
+def check_sirets(table: str, column: str) -> Dict[str, int]:
+    """
+    Counts the Target rows by key_issue, plus those valid only once normalized.
+    Nothing is written; the mapping page and the CLI show this before enrichment.
+    """
+    column_sql = f'"{column}"'
+    query = f"""
+        WITH k AS (SELECT CAST({column_sql} AS VARCHAR) AS raw, {normalized_sql(column_sql)} AS siret FROM {table})
+        SELECT count(*) AS total,
+               count(*) FILTER (WHERE issue IS NULL) AS valid,
+               count(*) FILTER (WHERE issue IS NULL AND raw IS DISTINCT FROM siret) AS normalized,
+               {", ".join(f"count(*) FILTER (WHERE issue = '{name}') AS {name}" for name in KEY_ISSUES)}
+        FROM (SELECT raw, siret, {issue_sql("siret")} AS issue FROM k)
+    """
+    with duckdb_client.tables(table):
+        return {k: int(v or 0) for k, v in duckdb_client.query_as_dict(query)[0].items()}
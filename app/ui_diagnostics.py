@@ -0,0 +1,122 @@
+from nicegui import ui, app, background_tasks
+from fastapi import Response
+from app.db import engine
+from app.models import Project
+from app import metrics, sirene
+from app.engine import list_failures, run_api_worker
+from sqlmodel import Session
+from typing import Dict, Any, List
+
+@app.get('/metrics')
+def metrics_endpoint():
+    """
+    Prometheus scrape target.
+    """
+    return Response(metrics.registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+def format_latency(summary: Dict[str, float]) -> str:
+    if not summary.get('count'):
+        return 'no data'
+    return (f"{summary['count']} calls · mean {summary['mean'] * 1000:.1f} ms · "
+            f"p50 {summary['p50'] * 1000:.1f} ms · p95 {summary['p95'] * 1000:.1f} ms")
+
+@ui.page('/diagnostics/{project_id}')
+def diagnostics_page(project_id: int) -> None:
+    """
+    The metrics of one project since the process started, plus the Sirene API client's.
+    """
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            ui.label('Project not found')
+            return
+
+    with ui.row().classes('w-full justify-between items-center mb-4'):
+        ui.label(f'Diagnostics: {project.name}').classes('text-2xl font-bold')
+        with ui.row():
+            ui.button('Card Review', on_click=lambda: ui.navigate.to(f'/validation/{project_id}')).props('icon=style outline')
+            ui.button('Raw metrics', on_click=lambda: ui.navigate.to('/metrics', new_tab=True)).props('icon=data_object outline')
+
+    ui.label('Counters reset when the application restarts.').classes('text-sm text-gray-500')
+
+    def rows() -> List[Dict[str, Any]]:
+        result = []
+        for role, table in (('Target', project.target_table_name), ('Source', project.source_table_name)):
+            if table:
+                ingest = metrics.INGEST_SECONDS.summary(table=table)
+                rows_in = int(metrics.INGEST_ROWS.value(table=table))
+                size = metrics.INGEST_BYTES.value(table=table)
+                result.append({'metric': f'{role} ingest',
+                               'value': f'{rows_in} rows · {size / 1024 / 1024:.1f} MB · {format_latency(ingest)}' if ingest['count'] else 'no data'})
+
+        rate = metrics.TASK_INIT_RATE.value(project=project_id, mode=project.mode)
+        created = int(metrics.TASK_INIT_ROWS.value(project=project_id, mode=project.mode))
+        result.append({'metric': 'Task initialization',
+                       'value': f'{created} tasks · last run {rate:.0f} rows/s' if created else 'no data'})
+
+        result.append({'metric': 'Next task query', 'value': format_latency(metrics.NEXT_TASK_SECONDS.summary(project=project_id))})
+        result.append({'metric': 'Decision submit', 'value': format_latency(metrics.DECISION_SECONDS.summary(project=project_id))})
+        for mode in ('compact', 'full'):
+            render = metrics.CARD_RENDER_SECONDS.summary(project=project_id, mode=mode)
+            if render['count']:
+                # The payload is only measured in profiled requests (PROFILE=1, or ?profile=1 with PROFILE=request)
+                payload = metrics.CARD_PAYLOAD_BYTES.summary(project=project_id, mode=mode)
+                result.append({'metric': f'Validation card ({mode})',
+                               'value': format_latency(render) + (f" · payload mean {payload['mean'] / 1024:.1f} KB, "
+                                                                  f"p95 {payload['p95'] / 1024:.1f} KB" if payload['count'] else '')})
+        result.append({'metric': 'Task search', 'value': format_latency(metrics.SEARCH_SECONDS.summary(project=project_id))})
+        result.append({'metric': 'Export', 'value': format_latency(metrics.EXPORT_SECONDS.summary(project=project_id))})
+
+        if project.mode == 'API':
+            statuses = {key[1]: int(v) for key, v in metrics.SIRENE_RESPONSES.values().items() if key[0] == 'siret'}
+            result.append({'metric': 'Sirene lookups', 'value': format_latency(metrics.SIRENE_SECONDS.summary(endpoint='siret'))})
+            result.append({'metric': 'Sirene status codes', 'value': ', '.join(f'{k}: {v}' for k, v in sorted(statuses.items())) or 'no data'})
+            result.append({'metric': 'Sirene rate limiting',
+                           'value': f'{int(metrics.SIRENE_RATE_LIMITED.value())} × 429 · '
+                                    f'{metrics.SIRENE_RETRY_AFTER.value():.0f} s of Retry-After'})
+            waits = ' · '.join(f"{name}: {depth} waiting, {format_latency(metrics.SIRENE_QUEUE_SECONDS.summary(priority=name))}"
+                               for name, depth in sirene.governor.depth().items())
+            result.append({'metric': 'Sirene quota queue', 'value': waits})
+            circuit = sirene.breaker.remaining()
+            result.append({'metric': 'Sirene circuit breaker',
+                           'value': (f'open, lookups paused for {circuit:.0f} s' if circuit else 'closed')
+                                    + f' · {int(metrics.SIRENE_RETRIES.value())} retries'})
+        return result
+
+    table = ui.table(columns=[
+        {'name': 'metric', 'label': 'Metric', 'field': 'metric', 'align': 'left'},
+        {'name': 'value', 'label': 'Value', 'field': 'value', 'align': 'left'},
+    ], rows=rows(), row_key='metric').classes('w-full')
+
+    failures_table = None
+    if project.mode == 'API':
+        # Dead-letter list: failed lookups, kept apart from SIRETs the API does not know
+        with ui.row().classes('w-full justify-between items-center mt-4'):
+            failures_label = ui.label('').classes('text-xl')
+            retry_btn = ui.button('Retry failed lookups', icon='replay')
+        failures_table = ui.table(columns=[
+            {'name': 'siret', 'label': 'SIRET', 'field': 'siret', 'align': 'left'},
+            {'name': 'error', 'label': 'Error', 'field': 'error', 'align': 'left'},
+            {'name': 'attempts', 'label': 'Attempts', 'field': 'attempts'},
+            {'name': 'failed_at', 'label': 'Last failure', 'field': 'failed_at', 'align': 'left'},
+        ], rows=[], row_key='siret', pagination=20).classes('w-full')
+
+        def retry_failed() -> None:
+            # Outlives the page; the table refreshes as lookups succeed
+            background_tasks.create(run_api_worker(project_id, project.mapping_config.get('api_token'), only_failed=True),
+                                    name=f'retry_failed_lookups_{project_id}')
+            ui.notify('Retrying failed lookups in the background')
+
+        retry_btn.on_click(retry_failed)
+
+    def refresh() -> None:
+        table.rows = rows()
+        table.update()
+        if failures_table is not None:
+            failures = list_failures(project_id)
+            failures_label.set_text(f'Failed lookups: {len(failures)}')
+            failures_table.rows = [{**f.model_dump(), 'failed_at': f'{f.failed_at:%Y-%m-%d %H:%M:%S}'} for f in failures]
+            failures_table.update()
+
+    refresh()
+    ui.timer(5, refresh)
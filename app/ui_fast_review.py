@@ -0,0 +1,206 @@
+from nicegui import ui, background_tasks, context
+from nicegui.events import KeyEventArguments
+from app.db import engine
+from app.maintenance import rehydrate_project
+from app.models import Project, ReconciliationTask
+from app.review import claim_tasks, renew_leases, release_leases, record_decision, source_overlay, LEASE_SECONDS
+from sqlmodel import Session
+from app.profiling import profiled
+from loguru import logger
+from typing import Dict, Any, Optional, Deque, Set
+from collections import deque
+import asyncio
+
+@ui.page('/fast-review/{project_id}')
+@profiled('fast_review_page')
+async def fast_review_page(project_id: int, buffer_size: int = 20) -> None:
+    """
+    Keyboard-driven review. Cards are served from an in-memory buffer of
+    pending tasks and decisions are written in the background, so a keystroke
+    only costs a redraw. A failed write puts the task back in front of the buffer.
+    Buffered tasks are leased to this page so other reviewers never get them.
+    """
+    # Archived projects come back from Parquet when reopened
+    await asyncio.to_thread(rehydrate_project, project_id)
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            ui.label('Project not found')
+            return
+
+    field_map: Dict[str, str] = project.mapping_config.get('field_map', {})
+    target_key = project.mapping_config.get('join_key', {}).get('target')
+
+    owner = context.client.id
+    buffer: Deque[ReconciliationTask] = deque()
+    failed_ids: Set[int] = set()
+    in_flight_ids: Set[int] = set()
+    state: Dict[str, Any] = {
+        'current': None,
+        'choices': {},      # target column -> 'A' or 'B' for the current card
+        'exhausted': False,
+        'refilling': False,
+        'saved': 0,
+    }
+
+    # Header
+    with ui.row().classes('w-full justify-between items-center mb-4'):
+        ui.label(f'Fast Review: {project.name}').classes('text-2xl font-bold')
+        ui.button('Card Review', on_click=lambda: ui.navigate.to(f'/validation/{project_id}')).props('icon=style outline')
+
+    ui.label('A: keep Target · B: accept Source · Enter: confirm Golden · S: skip · click a value to pick it').classes('text-sm text-gray-500')
+    status_label = ui.label('').classes('text-sm')
+    card_container = ui.column().classes('w-full')
+
+    def update_status() -> None:
+        saving = f" · {len(in_flight_ids)} saving" if in_flight_ids else ''
+        status_label.set_text(f"{state['saved']} saved this session · {len(buffer)} buffered{saving}")
+
+    def golden() -> Dict[str, Any]:
+        task: ReconciliationTask = state['current']
+        final_data = dict(task.target_data)
+        candidate = task.candidate_data or {}
+        for t_col, choice in state['choices'].items():
+            s_val = candidate.get(field_map[t_col])
+            if choice == 'B' and s_val is not None:
+                final_data[t_col] = s_val
+        return final_data
+
+    def choose(t_col: str, choice: str) -> None:
+        state['choices'][t_col] = choice
+        render()
+
+    def render() -> None:
+        card_container.clear()
+        task: Optional[ReconciliationTask] = state['current']
+
+        with card_container:
+            if task is None:
+                if state['exhausted'] and not in_flight_ids:
+                    ui.label('No task left to review (others may still be held by other reviewers).').classes('text-xl text-green-500')
+                else:
+                    ui.label('Loading...').classes('text-blue-500 animate-pulse')
+                return
+
+            with ui.card().classes('w-full'):
+                with ui.row().classes('items-center'):
+                    ui.label(f'Task ID: {task.id}').classes('text-xs text-gray-400')
+                    if task.id in failed_ids:
+                        ui.label('Previous save failed, decide again').classes('text-xs text-red-500')
+                if target_key:
+                    ui.label(f'{target_key}: {task.target_data.get(target_key)}').classes('font-semibold')
+
+                candidate = task.candidate_data or {}
+                final_data = golden()
+                with ui.grid(columns=4).classes('w-full gap-2 items-center'):
+                    ui.label('Field').classes('font-bold border-b')
+                    ui.label('Target (A)').classes('font-bold border-b')
+                    ui.label('Source (B)').classes('font-bold border-b')
+                    ui.label('Golden (C)').classes('font-bold border-b')
+
+                    for t_col, s_col in field_map.items():
+                        t_val = task.target_data.get(t_col)
+                        s_val = candidate.get(s_col)
+                        chosen = state['choices'].get(t_col, 'A')
+                        diff_class = 'text-orange-600 font-medium' if s_val is not None and str(s_val) != str(t_val) else ''
+
+                        ui.label(t_col).classes('text-sm font-semibold')
+                        ui.label(str(t_val)).classes('cursor-pointer p-1 rounded' + (' bg-blue-100' if chosen == 'A' else '')) \
+                            .on('click', lambda k=t_col: choose(k, 'A'))
+                        lbl = ui.label('-' if s_val is None else str(s_val)).classes(f'cursor-pointer p-1 rounded {diff_class}' + (' bg-blue-100' if chosen == 'B' else ''))
+                        if s_val is not None:
+                            lbl.on('click', lambda k=t_col: choose(k, 'B'))
+                        ui.label(str(final_data.get(t_col)))
+
+    async def refill() -> None:
+        if state['refilling'] or state['exhausted']:
+            return
+        state['refilling'] = True
+        try:
+            held = {t.id for t in buffer} | in_flight_ids
+            if state['current'] is not None:
+                held.add(state['current'].id)
+            tasks = await asyncio.to_thread(claim_tasks, project_id, owner, buffer_size, held)
+            if len(tasks) < buffer_size:
+                state['exhausted'] = True
+            buffer.extend(tasks)
+        except Exception as e:
+            logger.error(f"Fast review refill failed: {e}")
+        finally:
+            state['refilling'] = False
+
+        if state['current'] is None:
+            advance()
+        else:
+            update_status()
+
+    def advance() -> None:
+        state['current'] = buffer.popleft() if buffer else None
+        state['choices'] = {}
+        render()
+        update_status()
+        if len(buffer) < max(1, buffer_size // 2):
+            background_tasks.create(refill(), name=f'fast_review_refill_{project_id}')
+
+    @profiled('fast_review_persist')
+    async def persist(task: ReconciliationTask, decision: Optional[str], final_data: Optional[Dict], status: str) -> None:
+        try:
+            if await asyncio.to_thread(record_decision, task.id, decision, final_data, status, owner):
+                failed_ids.discard(task.id)
+                state['saved'] += 1
+            else:
+                with card_container:
+                    ui.notify(f'Task {task.id} was taken over by another reviewer, decision dropped', type='warning')
+        except Exception as e:
+            logger.error(f"Fast review save failed for task {task.id}: {e}")
+            # Roll back: the task is shown again right after the current card
+            failed_ids.add(task.id)
+            buffer.appendleft(task)
+            with card_container:
+                ui.notify(f'Saving task {task.id} failed, it was put back in the queue', type='negative')
+        finally:
+            in_flight_ids.discard(task.id)
+
+        if state['current'] is None:
+            advance()
+        else:
+            update_status()
+
+    def decide(decision: Optional[str], final_data: Optional[Dict], status: str = 'Resolved') -> None:
+        task = state['current']
+        in_flight_ids.add(task.id)
+        background_tasks.create(persist(task, decision, final_data, status), name=f'fast_review_save_{task.id}')
+        advance()
+
+    def handle_key(e: KeyEventArguments) -> None:
+        if not e.action.keydown or e.action.repeat or state['current'] is None:
+            return
+        task: ReconciliationTask = state['current']
+        key = e.key.name.lower()
+
+        if key == 'a':
+            decide('Keep Target', dict(task.target_data))
+        elif key == 'b':
+            decide('Accept Source', source_overlay(task.target_data, task.candidate_data, field_map))
+        elif key == 'enter':
+            decide('User Confirmed', golden())
+        elif key == 's':
+            decide(None, None, status='Skipped')
+
+    ui.keyboard(on_key=handle_key)
+
+    async def heartbeat() -> None:
+        await asyncio.to_thread(renew_leases, owner)
+        # Leases of other reviewers may have expired since the last refill
+        if state['exhausted'] and len(buffer) < max(1, buffer_size // 2):
+            state['exhausted'] = False
+            await refill()
+
+    async def release() -> None:
+        await asyncio.to_thread(release_leases, owner)
+
+    context.client.on_delete(release)
+
+    render()
+    ui.timer(0.1, refill, once=True)
+    ui.timer(LEASE_SECONDS / 3, heartbeat)
@@ -0,0 +1,83 @@
+from nicegui import ui
+from app.maintenance import storage_report, compact_sqlite, compact_duckdb, archive_project
+from loguru import logger
+from typing import Optional
+import asyncio
+
+def format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return 'shared'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+@ui.page('/maintenance')
+def maintenance_page() -> None:
+    """
+    Storage usage per project, online compaction and archival of Completed projects.
+    """
+    with ui.row().classes('w-full justify-between items-center mb-4'):
+        ui.label('Storage Maintenance').classes('text-2xl font-bold')
+        with ui.row():
+            ui.button('Slow Queries', on_click=lambda: ui.navigate.to('/query-log')).props('icon=speed outline')
+            ui.button('Projects', on_click=lambda: ui.navigate.to('/')).props('icon=home outline')
+
+    totals_label = ui.label('').classes('text-sm')
+
+    columns = [
+        {'name': 'id', 'label': 'ID', 'field': 'id', 'align': 'left'},
+        {'name': 'name', 'label': 'Name', 'field': 'name', 'align': 'left'},
+        {'name': 'status', 'label': 'Status', 'field': 'status', 'align': 'left'},
+        {'name': 'tasks', 'label': 'Tasks', 'field': 'tasks'},
+        {'name': 'task_bytes', 'label': 'Task data', 'field': 'task_bytes'},
+        {'name': 'duckdb_bytes', 'label': 'DuckDB file', 'field': 'duckdb_bytes'},
+        {'name': 'archive_bytes', 'label': 'Archive', 'field': 'archive_bytes'},
+        {'name': 'actions', 'label': 'Actions', 'field': 'actions'},
+    ]
+    table = ui.table(columns=columns, rows=[], row_key='id').classes('w-full')
+    table.add_slot('body-cell-actions', r'''
+        <q-td key="actions" :props="props">
+            <q-btn v-if="props.row.can_archive" icon="inventory_2" label="Archive" color="primary" flat dense
+                   @click="$parent.$emit('archive', props.row)" />
+            <span v-if="props.row.archived" class="text-gray-500">Archived</span>
+        </q-td>
+    ''')
+
+    def refresh() -> None:
+        report = storage_report()
+        totals_label.set_text(
+            f"Metadata database: {format_bytes(report['sqlite_bytes'])} "
+            f"({format_bytes(report['sqlite_free_bytes'])} free) · "
+            f"Main DuckDB file: {format_bytes(report['duckdb_bytes'])}"
+        )
+        table.rows = [{
+            **row,
+            'task_bytes': format_bytes(row['task_bytes']),
+            'duckdb_bytes': format_bytes(row['duckdb_bytes']),
+            'archive_bytes': format_bytes(row['archive_bytes']),
+            'can_archive': row['status'] == 'Completed' and not row['archived'],
+        } for row in report['projects']]
+        table.update()
+
+    async def run(label: str, func, *args) -> None:
+        try:
+            result = await asyncio.to_thread(func, *args)
+        except Exception as e:
+            logger.error(f"{label} failed: {e}")
+            ui.notify(f'{label} failed: {e}', type='negative')
+            return
+        ui.notify(f'{label} done' + (f': {format_bytes(result)} freed' if isinstance(result, int) else ''), type='positive')
+        refresh()
+
+    async def handle_archive(e) -> None:
+        await run(f"Archiving project {e.args['id']}", archive_project, e.args['id'])
+
+    table.on('archive', handle_archive)
+
+    with ui.row().classes('mt-4'):
+        ui.button('Compact SQLite', on_click=lambda: run('SQLite compaction', compact_sqlite)).props('icon=compress')
+        ui.button('Checkpoint DuckDB', on_click=lambda: run('DuckDB checkpoint', compact_duckdb)).props('icon=save outline')
+        ui.button('Rewrite project files', on_click=lambda: run('DuckDB rewrite', compact_duckdb, True)).props('icon=cleaning_services outline')
+
+    refresh()
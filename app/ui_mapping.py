@@ -1,16 +1,22 @@
 from nicegui import ui
 from app.db import engine
-from app.models import Project
+from app.maintenance import rehydrate_project
+from app.models import Project, ReconciliationTask
 from app.duckdb_client import duckdb_client
 from app.sirene import SireneClient
-from app.engine import initialize_tasks_csv, initialize_tasks_api_pre
-from sqlmodel import Session
+from app.siret import KEY_ISSUES, check_sirets
+from app.engine import initialize_tasks_csv, initialize_tasks_api_pre, preview_join, reproject_candidates
+from sqlmodel import Session, select
+from app.profiling import profiled
 from loguru import logger
 from typing import List, Dict, Optional, Any
 import asyncio
 
 @ui.page('/mapping/{project_id}')
-def mapping_page(project_id: int) -> None:
+@profiled('mapping_page')
+async def mapping_page(project_id: int) -> None:
+    # Archived projects come back from Parquet when reopened
+    await asyncio.to_thread(rehydrate_project, project_id)
     with Session(engine) as session:
         project = session.get(Project, project_id)
         if not project:
@@ -79,20 +85,19 @@ def mapping_page(project_id: int) -> None:
 
         ui.button('Add Field Mapping', on_click=add_mapping_row).classes('mt-2')
 
+        projection_switch = None
+        siret_switch = None
+        if project.mode == 'API':
+            # Raw responses are kept in a side store, so the mapping can change without refetching
+            projection_switch = ui.switch('Store only mapped fields in tasks', value=project.mapping_config.get('projection', True))
+            siret_switch = ui.switch('Normalize SIRETs and never send invalid ones to the API',
+                                     value=project.mapping_config.get('siret_check', True))
+
     def update_selection(key: str, value: Any) -> None:
         selections[key] = value
 
-    async def finish_setup() -> None:
-        # Validate
-        if not selections['join_target']:
-            ui.notify('Please select a Target Join Key', type='warning')
-            return
-        if project.mode == 'CSV' and not selections['join_source']:
-            ui.notify('Please select a Source Join Key', type='warning')
-            return
-
-        # Build Config
-        mapping_config = project.mapping_config or {}
+    def build_mapping_config() -> Dict[str, Any]:
+        mapping_config = dict(project.mapping_config or {})
 
         if project.mode == 'CSV':
             mapping_config['join_key'] = {
@@ -112,6 +117,105 @@ def mapping_page(project_id: int) -> None:
             if t and s:
                 field_map[t] = s
         mapping_config['field_map'] = field_map
+        if projection_switch is not None:
+            mapping_config['projection'] = projection_switch.value
+        if siret_switch is not None:
+            mapping_config['siret_check'] = siret_switch.value
+        return mapping_config
+
+    def validate_selections() -> bool:
+        if not selections['join_target']:
+            ui.notify('Please select a Target Join Key', type='warning')
+            return False
+        if project.mode == 'CSV' and not selections['join_source']:
+            ui.notify('Please select a Source Join Key', type='warning')
+            return False
+        return True
+
+    # Step 3: Dry-run preview (CSV only, the API source cannot be joined offline)
+    if project.mode == 'CSV':
+        with ui.card().classes('w-full mb-4'):
+            ui.label('Step 3: Preview Match Rate').classes('text-xl')
+            ui.label('Runs the join on a sample of the Target without creating any task.').classes('text-gray-500 text-sm')
+
+            with ui.row().classes('items-center'):
+                sample_input = ui.number('Sample Size', value=10000, min=100, step=1000).classes('w-40')
+                exact_switch = ui.switch('Exact counts (full table)', value=False)
+                preview_btn = ui.button('Preview', icon='query_stats')
+
+            preview_container = ui.column().classes('w-full')
+
+        async def run_preview() -> None:
+            if not validate_selections():
+                return
+            preview_btn.disable()
+            preview_container.clear()
+            try:
+                result = await asyncio.to_thread(
+                    preview_join,
+                    project_id,
+                    build_mapping_config(),
+                    int(sample_input.value or 10000),
+                    exact_switch.value
+                )
+            except Exception as e:
+                ui.notify(f'Preview failed: {e}', type='negative')
+                return
+            finally:
+                preview_btn.enable()
+
+            if not result:
+                ui.notify('Preview failed: invalid join configuration', type='negative')
+                return
+
+            scope = 'all' if result['exact'] else 'a sample of'
+            with preview_container:
+                ui.label(f"Joined {scope} {result['target_rows']} Target rows").classes('text-sm text-gray-500')
+                ui.label(f"Match rate: {result['match_rate']:.1%} ({result['matched_rows']} rows)")
+                ui.label(f"Duplicate candidates: {result['duplicate_rate']:.1%} of matched rows ({result['duplicate_rows']} rows)")
+                for field, rate in result['field_disagreement'].items():
+                    ui.label(f"{field}: {rate:.1%} disagree").classes('text-sm')
+
+        preview_btn.on_click(run_preview)
+
+    # Step 3 (API): SIRET check, counted in DuckDB before any request is spent
+    if project.mode == 'API':
+        with ui.card().classes('w-full mb-4'):
+            ui.label('Step 3: Check SIRETs').classes('text-xl')
+            ui.label('Normalizes the Target key column and validates its checksums, without calling the API.').classes('text-gray-500 text-sm')
+            check_btn = ui.button('Check', icon='fact_check')
+            check_container = ui.column().classes('w-full')
+
+        async def run_check() -> None:
+            if not validate_selections():
+                return
+            check_btn.disable()
+            check_container.clear()
+            try:
+                counts = await asyncio.to_thread(check_sirets, project.target_table_name, selections['join_target'])
+            except Exception as e:
+                ui.notify(f'SIRET check failed: {e}', type='negative')
+                return
+            finally:
+                check_btn.enable()
+
+            with check_container:
+                ui.label(f"{counts['valid']} of {counts['total']} rows have a valid SIRET"
+                         f" ({counts['normalized']} after normalization)")
+                for issue, label in KEY_ISSUES.items():
+                    if counts[issue]:
+                        ui.label(f"{label}: {counts[issue]} rows").classes('text-sm text-orange-500')
+
+        check_btn.on_click(run_check)
+
+    @profiled('finish_setup')
+    async def finish_setup() -> None:
+        # Validate
+        if not validate_selections():
+            return
+
+        # Build Config
+        mapping_config = build_mapping_config()
 
         # Save to DB
         with Session(engine) as session:
@@ -125,8 +229,14 @@ def mapping_page(project_id: int) -> None:
         # Trigger Engine (Async to avoid blocking UI)
         ui.notify('Processing data... Please wait.', type='info', timeout=None)
 
+        with Session(engine) as session:
+            has_tasks = session.exec(select(ReconciliationTask.id).where(ReconciliationTask.project_id == project_id).limit(1)).first() is not None
+
         if project.mode == 'CSV':
             await asyncio.to_thread(initialize_tasks_csv, project_id)
+        elif has_tasks:
+            # Re-mapping an API project: rebuild candidates from the stored responses
+            await asyncio.to_thread(reproject_candidates, project_id)
         else:
             await asyncio.to_thread(initialize_tasks_api_pre, project_id)
 
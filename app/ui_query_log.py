@@ -0,0 +1,46 @@
+from nicegui import ui
+from app import query_log
+import json
+
+@ui.page('/query-log')
+def query_log_page(limit: int = 100) -> None:
+    """
+    Slow statements of DuckDB and SQLite with their captured plans.
+    Settings changed here last until the application restarts.
+    """
+    with ui.row().classes('w-full justify-between items-center mb-4'):
+        ui.label('Slow Queries').classes('text-2xl font-bold')
+        ui.button('Storage', on_click=lambda: ui.navigate.to('/maintenance')).props('icon=storage outline')
+
+    with ui.row().classes('items-center gap-4'):
+        ui.switch('Log slow queries', value=query_log.settings['enabled'],
+                  on_change=lambda e: query_log.configure(enabled=e.value))
+        ui.number('Threshold (ms)', value=query_log.settings['threshold_ms'], min=1,
+                  on_change=lambda e: e.value and query_log.configure(threshold_ms=e.value)).classes('w-36')
+        ui.switch('Capture plans', value=query_log.settings['explain'],
+                  on_change=lambda e: query_log.configure(explain=e.value))
+        ui.button('Refresh', on_click=lambda: render()).props('icon=refresh outline')
+        ui.button('Clear', on_click=lambda: (query_log.clear(), render())).props('icon=delete outline color=negative')
+
+    ui.label(f'Log file: {query_log.QUERY_LOG_FILE}').classes('text-xs text-gray-500')
+    container = ui.column().classes('w-full')
+
+    def render() -> None:
+        container.clear()
+        entries = query_log.read_entries(limit)
+        with container:
+            if not entries:
+                ui.label('No slow query logged.').classes('text-gray-500')
+                return
+            for entry in entries:
+                title = f"{entry['ms']:.0f} ms · {entry['source']} · {entry['statement'][:120]}"
+                with ui.expansion(title, caption=entry['ts']).classes('w-full border rounded'):
+                    ui.code(entry['statement'], language='sql').classes('w-full')
+                    if entry.get('params'):
+                        ui.label(f"Parameters: {entry['params']}").classes('text-xs font-mono')
+                    if entry.get('plan') is not None:
+                        ui.code(json.dumps(entry['plan'], indent=2), language='json').classes('w-full')
+                    elif entry.get('plan_error'):
+                        ui.label(f"Plan capture failed: {entry['plan_error']}").classes('text-xs text-red-500')
+
+    render()
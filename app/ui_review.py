@@ -0,0 +1,262 @@
+from nicegui import ui
+from app.db import engine
+from app.maintenance import rehydrate_project
+from app.models import Project, ReconciliationTask
+from app.review import count_tasks, query_tasks, backfill_diffs, bulk_decide
+from app.rules import apply_rules, validate_rules
+from sqlmodel import Session
+from app.profiling import profiled
+from loguru import logger
+from typing import Dict, Any, Optional, List
+import asyncio
+
+PAGE_SIZE = 200
+# Pages kept in the grid; those scrolled far past are dropped and fetched again on the way back
+WINDOW_PAGES = 5
+
+@ui.page('/review/{project_id}')
+@profiled('review_page')
+async def review_page(project_id: int) -> None:
+    # Archived projects come back from Parquet when reopened
+    await asyncio.to_thread(rehydrate_project, project_id)
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        if not project:
+            ui.label('Project not found')
+            return
+
+    field_map: Dict[str, str] = project.mapping_config.get('field_map', {})
+    target_key = project.mapping_config.get('join_key', {}).get('target')
+
+    # Header
+    with ui.row().classes('w-full justify-between items-center mb-4'):
+        ui.label(f'Grid Review: {project.name}').classes('text-2xl font-bold')
+        ui.button('Card Review', on_click=lambda: ui.navigate.to(f'/validation/{project_id}')).props('icon=style outline')
+
+    # Filters
+    filters: Dict[str, Any] = {'status': 'Pending', 'min_diffs': None, 'max_diffs': None, 'field': None, 'sort': 'id'}
+    # The grid holds a window of pages: starts[k] is the seek position page k is fetched
+    # from (see query_tasks), first the window's first page, sizes the row counts of its pages
+    paging: Dict[str, Any] = {'starts': [None], 'first': 0, 'sizes': [], 'exhausted': False, 'loading': False}
+
+    with ui.row().classes('items-end gap-4'):
+        ui.select({'': 'All', 'Pending': 'Pending', 'Resolved': 'Resolved', 'Skipped': 'Skipped'}, value='Pending', label='Status',
+                  on_change=lambda e: filters.update(status=e.value or None)).classes('w-32')
+        ui.number('Min diffs', min=0, on_change=lambda e: filters.update(min_diffs=None if e.value is None else int(e.value))).classes('w-24')
+        ui.number('Max diffs', min=0, on_change=lambda e: filters.update(max_diffs=None if e.value is None else int(e.value))).classes('w-24')
+        ui.select({'': 'Any', **{f: f for f in field_map}}, value='', label='Differs on',
+                  on_change=lambda e: filters.update(field=e.value or None)).classes('w-48')
+        ui.select({'id': 'Task ID', 'diff_count': 'Most differences'}, value='id', label='Sort',
+                  on_change=lambda e: filters.update(sort=e.value)).classes('w-40')
+        ui.button('Apply', on_click=lambda: reload()).props('icon=filter_alt')
+
+    count_label = ui.label('Loading...').classes('text-sm text-gray-500')
+
+    # Table
+    columns = [
+        {'name': 'id', 'label': 'ID', 'field': 'id', 'align': 'left'},
+        {'name': 'status', 'label': 'Status', 'field': 'status', 'align': 'left'},
+        {'name': 'decision', 'label': 'Decision', 'field': 'decision', 'align': 'left'},
+        {'name': 'diff_count', 'label': 'Diffs', 'field': 'diff_count'},
+        {'name': 'key', 'label': target_key or 'Key', 'field': 'key', 'align': 'left'},
+    ]
+    # Field names may contain dots, which Quasar would treat as paths
+    for i, t_col in enumerate(field_map):
+        columns.append({'name': f'f{i}', 'label': t_col, 'field': f'f{i}', 'align': 'left'})
+
+    table = ui.table(columns=columns, rows=[], row_key='id', selection='multiple', pagination=0) \
+        .props('virtual-scroll hide-bottom dense') \
+        .classes('w-full') \
+        .style('height: 60vh')
+
+    def to_row(task: ReconciliationTask) -> Dict[str, Any]:
+        row = {
+            'id': task.id,
+            'status': task.status,
+            'decision': task.decision or '',
+            'diff_count': '?' if task.diff_count is None else task.diff_count,
+            'key': str(task.target_data.get(target_key, '')) if target_key else '',
+        }
+        candidate = task.candidate_data or {}
+        for i, (t_col, s_col) in enumerate(field_map.items()):
+            t_val = task.target_data.get(t_col)
+            s_val = candidate.get(s_col)
+            if s_val is not None and str(s_val) != str(t_val):
+                row[f'f{i}'] = f'{t_val} → {s_val}'
+            else:
+                row[f'f{i}'] = str(t_val)
+        return row
+
+    async def fetch_page(page: int) -> List[ReconciliationTask]:
+        tasks = await asyncio.to_thread(
+            query_tasks, project_id,
+            filters['status'], filters['min_diffs'], filters['max_diffs'], filters['field'], filters['sort'],
+            paging['starts'][page], PAGE_SIZE
+        )
+        if tasks and page + 1 == len(paging['starts']):
+            paging['starts'].append((tasks[-1].diff_count, tasks[-1].id))
+        return tasks
+
+    async def load_more(top: int = 0) -> None:
+        if paging['loading'] or paging['exhausted']:
+            return
+        paging['loading'] = True
+        try:
+            tasks = await fetch_page(paging['first'] + len(paging['sizes']))
+            if len(tasks) < PAGE_SIZE:
+                paging['exhausted'] = True
+            if not tasks:
+                return
+            rows = table.rows + [to_row(t) for t in tasks]
+            paging['sizes'].append(len(tasks))
+            dropped = 0
+            if len(paging['sizes']) > WINDOW_PAGES:
+                dropped = paging['sizes'].pop(0)
+                paging['first'] += 1
+            # Each update sends the whole table, so it never holds more than the window
+            table.rows[:] = rows[dropped:]
+            table.update()
+            if dropped:
+                table.run_method('scrollTo', max(top - dropped, 0), 'start-force')
+        finally:
+            paging['loading'] = False
+
+    async def load_previous() -> None:
+        if paging['loading'] or paging['first'] == 0:
+            return
+        paging['loading'] = True
+        try:
+            paging['first'] -= 1
+            shown = {row['id'] for row in table.rows}
+            # Tasks decided since the page was first read shift its end into the next page
+            rows = [to_row(t) for t in await fetch_page(paging['first']) if t.id not in shown]
+            paging['sizes'].insert(0, len(rows))
+            rows += table.rows
+            if len(paging['sizes']) > WINDOW_PAGES:
+                rows = rows[:len(rows) - paging['sizes'].pop()]
+                paging['exhausted'] = False
+            table.rows[:] = rows
+            table.update()
+            table.run_method('scrollTo', paging['sizes'][0], 'start-force')
+        finally:
+            paging['loading'] = False
+
+    async def reload() -> None:
+        paging.update(starts=[None], first=0, sizes=[], exhausted=False)
+        table.rows.clear()
+        table.selected.clear()
+        table.update()
+        total = await asyncio.to_thread(
+            count_tasks, project_id, filters['status'], filters['min_diffs'], filters['max_diffs'], filters['field']
+        )
+        count_label.set_text(f'{total} matching tasks')
+        await load_more()
+
+    async def on_scroll(e) -> None:
+        # Fetch the next page when the viewport reaches the last loaded rows, the
+        # previous one when it reaches the first rows of a window that has dropped some
+        if e.args.get('to', 0) >= len(table.rows) - 1:
+            await load_more(e.args.get('from', 0))
+        elif e.args.get('from', 0) == 0 and e.args.get('direction') == 'decrease':
+            await load_previous()
+
+    table.on('virtual-scroll', on_scroll)
+
+    # Bulk Actions
+    @profiled('apply_bulk')
+    async def apply_bulk(decision: str) -> None:
+        task_ids = [row['id'] for row in table.selected]
+        if not task_ids:
+            ui.notify('No task selected', type='warning')
+            return
+        updated = await asyncio.to_thread(bulk_decide, project_id, task_ids, decision)
+        ui.notify(f'{decision}: {updated} tasks resolved', type='positive')
+        await reload()
+
+    with ui.row().classes('mt-4'):
+        ui.button('Accept Source for selected', on_click=lambda: apply_bulk('Accept Source')).classes('bg-green-500 text-white')
+        ui.button('Keep Target for selected', on_click=lambda: apply_bulk('Keep Target'))
+
+    # Decision Rules, stored in mapping_config["rules"]
+    rules: List[Dict[str, Any]] = list(project.mapping_config.get('rules', []))
+    action_labels = {'take_source': 'Take Source', 'keep_target': 'Never overwrite Target'}
+    condition_labels = {'source_differs': 'Source differs', 'source_not_null': 'Source not null', 'target_empty': 'Target empty'}
+
+    with ui.card().classes('w-full mt-4'):
+        ui.label('Decision Rules').classes('text-xl')
+        ui.label('Applied in order to every pending task not held by a reviewer, as one SQL update.').classes('text-gray-500 text-sm')
+
+        rules_container = ui.column().classes('w-full')
+
+        with ui.row().classes('items-end'):
+            rule_field = ui.select(list(field_map), label='Field').classes('w-48')
+            rule_action = ui.select(action_labels, value='take_source', label='Action').classes('w-56')
+            rule_when = ui.select(condition_labels, value='source_differs', label='When').classes('w-40') \
+                .bind_visibility_from(rule_action, 'value', value='take_source')
+            ui.button('Add Rule', on_click=lambda: add_rule()).props('icon=add outline')
+
+        resolve_switch = ui.switch('Resolve matched tasks', value=True)
+        with ui.row():
+            ui.button('Dry Run', on_click=lambda: run_rules(dry_run=True)).props('icon=query_stats outline')
+            ui.button('Apply Rules', on_click=lambda: run_rules(dry_run=False)).classes('bg-green-500 text-white')
+
+        rules_report = ui.column()
+
+    def render_rules() -> None:
+        rules_container.clear()
+        with rules_container:
+            if not rules:
+                ui.label('No rule defined.').classes('text-sm text-gray-500')
+            for i, rule in enumerate(rules):
+                with ui.row().classes('items-center'):
+                    when = f" when {condition_labels[rule['when']].lower()}" if rule['action'] == 'take_source' else ''
+                    ui.label(f"{i + 1}. {rule['field']}: {action_labels[rule['action']]}{when}")
+                    ui.button(icon='delete', on_click=lambda i=i: remove_rule(i)).props('flat dense color=negative')
+
+    def save_rules() -> None:
+        with Session(engine) as session:
+            p = session.get(Project, project_id)
+            p.mapping_config = {**p.mapping_config, 'rules': rules}
+            session.add(p)
+            session.commit()
+        render_rules()
+
+    def add_rule() -> None:
+        rule = {'field': rule_field.value, 'action': rule_action.value}
+        if rule['action'] == 'take_source':
+            rule['when'] = rule_when.value
+        try:
+            validate_rules([rule], field_map)
+        except ValueError as e:
+            ui.notify(str(e), type='warning')
+            return
+        rules.append(rule)
+        save_rules()
+
+    def remove_rule(index: int) -> None:
+        rules.pop(index)
+        save_rules()
+
+    async def run_rules(dry_run: bool) -> None:
+        if not rules:
+            ui.notify('No rule defined', type='warning')
+            return
+        report = await asyncio.to_thread(apply_rules, project_id, rules, dry_run, resolve_switch.value)
+
+        rules_report.clear()
+        with rules_report:
+            ui.label(f"{report['matched']} of {report['pending']} available pending tasks match").classes('font-semibold')
+            for i, count in enumerate(report['per_rule']):
+                ui.label(f"Rule {i + 1}: {count} tasks").classes('text-sm')
+        if not dry_run:
+            ui.notify(f"Rules applied to {report['applied']} tasks", type='positive')
+            await reload()
+
+    render_rules()
+
+    async def initial_load() -> None:
+        # Tasks created before diff columns existed
+        await asyncio.to_thread(backfill_diffs, project_id)
+        await reload()
+
+    ui.timer(0.1, initial_load, once=True)
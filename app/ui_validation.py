@@ -1,14 +1,33 @@
-from nicegui import ui
+from nicegui import ui, context
 from app.db import engine
+from app.maintenance import rehydrate_project
 from app.models import Project, ReconciliationTask
 from sqlmodel import Session, select
-from app.sirene import SireneClient, RateLimitExceeded
+from app.sirene import SireneClient, RateLimitExceeded, SireneError
+from app.engine import fetch_candidate, store_candidate, record_failure, resync_project, api_key_of, key_issue_counts
+from app.siret import KEY_ISSUES
+from app.search import search_tasks
+from app.review import claim_tasks, claim_task, renew_leases, release_leases, record_decision, card_rows, typed_golden, LEASE_SECONDS
+from app.metrics import CARD_RENDER_SECONDS, CARD_PAYLOAD_BYTES
 import asyncio
-from typing import Dict, Any, Optional, List
+import json
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from app.profiling import profiled, profiling_requested
 from loguru import logger
 
+CARD_COLUMNS = [
+    {'name': 'key', 'label': 'Field', 'field': 'key', 'align': 'left'},
+    {'name': 'target', 'label': 'Target (A)', 'field': 'target', 'align': 'left'},
+    {'name': 'source', 'label': 'Source (B)', 'field': 'source', 'align': 'left'},
+    {'name': 'golden', 'label': 'Golden (C)', 'field': 'golden', 'align': 'left'},
+]
+
 @ui.page('/validation/{project_id}')
-def validation_page(project_id: int) -> None:
+@profiled('validation_page')
+async def validation_page(project_id: int, task_id: Optional[int] = None) -> None:
+    # Archived projects come back from Parquet when reopened
+    await asyncio.to_thread(rehydrate_project, project_id)
     # Check Project
     with Session(engine) as session:
         project = session.get(Project, project_id)
@@ -19,7 +38,14 @@ def validation_page(project_id: int) -> None:
     # Header
     with ui.row().classes('w-full justify-between items-center mb-4'):
         ui.label(f'Validation: {project.name}').classes('text-2xl font-bold')
-        ui.button('Export CSV', on_click=lambda: ui.download(f'/export/{project_id}', filename=f'{project.name}_export.csv')).props('icon=download outline')
+        with ui.row():
+            ui.button('Fast Review', on_click=lambda: ui.navigate.to(f'/fast-review/{project_id}')).props('icon=keyboard outline')
+            ui.button('Grid Review', on_click=lambda: ui.navigate.to(f'/review/{project_id}')).props('icon=table_view outline')
+            ui.button('Diagnostics', on_click=lambda: ui.navigate.to(f'/diagnostics/{project_id}')).props('icon=monitor_heart outline')
+            ui.button('Export CSV', on_click=lambda: ui.download(f'/export/{project_id}', filename=f'{project.name}_export.csv')).props('icon=download outline')
+            ui.button('Export Changes', on_click=lambda: ui.download(f'/export/{project_id}?mode=delta', filename=f'{project.name}_changes.csv')).props('icon=difference outline')
+            if project.mode == 'API':
+                resync_btn = ui.button('Re-sync', on_click=lambda: resync()).props('icon=sync outline')
 
     # Progress Bar / Stats
     stats_label = ui.label('Loading stats...')
@@ -28,57 +54,123 @@ def validation_page(project_id: int) -> None:
     client = None
     if project.mode == 'API':
         token = project.mapping_config.get("api_token")
-        client = SireneClient(token)
+        # A reviewer is waiting on the card: ahead of background enrichment in the quota queue
+        client = SireneClient(token, priority="interactive")
+
+    async def resync() -> None:
+        resync_btn.disable()
+        try:
+            report = await resync_project(project_id, project.mapping_config.get("api_token"))
+        except Exception as e:
+            ui.notify(f'Re-sync failed: {e}', type='negative')
+            return
+        finally:
+            resync_btn.enable()
+        ui.notify(f"{report['changed']} of {report['sirets']} establishments changed since the last sync, "
+                  f"{report['reopened']} tasks reopened", type='positive')
+
+    # Search, exact key or full-text (see app.search); a result opens its card
+    with ui.row().classes('w-full items-center'):
+        search_input = ui.input(placeholder='Search values (word* for prefixes), join key or #task id').props('dense clearable').classes('w-96')
+        search_input.on('keydown.enter', lambda: search())
+        compact_switch = ui.switch('Compact card', value=True, on_change=lambda: toggle_compact()) \
+            .tooltip('Only fields that differ up front, the others on demand')
+    search_results = ui.column().classes('w-full')
 
     # Task Container (The Card)
     card_container = ui.column().classes('w-full')
+    shown: Dict[str, Optional[ReconciliationTask]] = {'task': None}
 
-    async def load_next_task() -> None:
-        card_container.clear()
+    # Each open page leases the task it shows, so concurrent reviewers never share one
+    owner = context.client.id
 
+    def refresh_stats() -> int:
         with Session(engine) as session:
-            # Fetch pending task
-            # Prioritize "Pending"
-            statement = select(ReconciliationTask).where(
-                ReconciliationTask.project_id == project_id,
-                ReconciliationTask.status == 'Pending'
-            ).limit(1)
-            task = session.exec(statement).first()
-
-            # Update Stats
             total = session.query(ReconciliationTask).filter(ReconciliationTask.project_id == project_id).count()
             pending = session.query(ReconciliationTask).filter(ReconciliationTask.project_id == project_id, ReconciliationTask.status == 'Pending').count()
-            stats_label.set_text(f"Progress: {total - pending}/{total} Validated")
+        flagged = sum(key_issue_counts(project_id).values())
+        stats_label.set_text(f"Progress: {total - pending}/{total} Validated"
+                             + (f" · {flagged} invalid SIRETs not sent to the API" if flagged else ""))
+        return pending
 
-            if not task:
-                with card_container:
-                    ui.label('All tasks completed!').classes('text-xl text-green-500')
-                    ui.button('Export Results', on_click=lambda: ui.download(f'/export/{project_id}', filename=f'{project.name}_export.csv'))
-                return
+    async def load_next_task() -> None:
+        card_container.clear()
+        shown['task'] = None
 
-        # Check and fetch API data if needed
+        # Claim the next pending task
+        claimed = await asyncio.to_thread(claim_tasks, project_id, owner, 1)
+        task = claimed[0] if claimed else None
+        pending = refresh_stats()
+
+        if not task and pending:
+            with card_container:
+                ui.label(f'The {pending} remaining tasks are held by other reviewers.').classes('text-xl text-orange-500')
+                ui.button('Retry', on_click=load_next_task)
+            return
+
+        if not task:
+            with card_container:
+                ui.label('All tasks completed!').classes('text-xl text-green-500')
+                ui.button('Export Results', on_click=lambda: ui.download(f'/export/{project_id}', filename=f'{project.name}_export.csv'))
+            return
+
+        await show_task(task)
+
+    async def open_task(picked_id: int) -> bool:
+        task = await asyncio.to_thread(claim_task, project_id, picked_id, owner)
+        if not task:
+            ui.notify(f'Task {picked_id} is not in this project or is held by another reviewer', type='warning')
+            return False
+        search_results.clear()
+        card_container.clear()
+        shown['task'] = None
+        refresh_stats()
+        await show_task(task)
+        return True
+
+    async def search() -> None:
+        search_results.clear()
+        if not (search_input.value or '').strip():
+            return
+        tasks = await asyncio.to_thread(search_tasks, project_id, search_input.value)
+        with search_results:
+            if not tasks:
+                ui.label('No matching task.').classes('text-sm text-gray-500')
+                return
+            with ui.list().props('dense bordered separator').classes('w-full'):
+                for found in tasks:
+                    with ui.item(on_click=lambda t=found: open_task(t.id)):
+                        with ui.item_section():
+                            ui.item_label(f"#{found.id} · {found.task_key or 'no key'} · {found.status}")
+                            ui.item_label(' · '.join(str(v) for v in list(found.target_data.values())[:4])).props('caption')
+
+    async def show_task(task: ReconciliationTask) -> None:
+        # Check and fetch API data if needed (never for keys flagged invalid at initialization)
         if project.mode == 'API' and not task.candidate_data:
-            target_key = project.mapping_config.get("join_key", {}).get("target")
-            siret = task.target_data.get(target_key)
+            siret = api_key_of(task, project.mapping_config.get("join_key", {}).get("target"))
             if siret and client:
                 with card_container:
                     ui.label(f'Fetching data for {siret}...').classes('text-blue-500 animate-pulse')
 
                 while True:
                     try:
-                        data = await client.get_by_siret(str(siret))
+                        data = await fetch_candidate(client, str(siret), project.mapping_config)
+                        # Other tasks of the project with the same SIRET get the candidate too
+                        store_candidate(project_id, str(siret), data, project.mapping_config.get('field_map', {}), [task.id])
                         with Session(engine) as session:
                             t = session.get(ReconciliationTask, task.id)
                             if t:
-                                t.candidate_data = data if data else {}
-                                session.add(t)
-                                session.commit()
                                 task.candidate_data = t.candidate_data # Sync local object
                         break
                     except RateLimitExceeded as e:
+                        # The quota governor holds the retry back until the window reopens
                         with card_container:
                             ui.label(f"Rate limit exceeded. Waiting {e.retry_after}s...").classes('text-orange-500')
-                        await asyncio.sleep(e.retry_after)
+                    except SireneError as e:
+                        # On the dead-letter list; the task keeps no candidate, unlike "not found"
+                        record_failure(project_id, str(siret), str(e))
+                        ui.notify(f"Sirene lookup failed: {e}", type='negative')
+                        break
                     except Exception as e:
                         ui.notify(f"Error fetching data: {e}", type='negative')
                         break
@@ -89,69 +181,144 @@ def validation_page(project_id: int) -> None:
         render_task_card(task)
 
     def render_task_card(task: ReconciliationTask) -> None:
+        shown['task'] = task
+        mode = 'compact' if compact_switch.value else 'full'
+        start = time.perf_counter()
         with card_container:
-            with ui.card().classes('w-full'):
+            with ui.card().classes('w-full') as card:
                 ui.label(f'Task ID: {task.id}').classes('text-xs text-gray-400')
+                if task.status != 'Pending':
+                    ui.label(f"Already {task.status} ({task.decision or 'no decision'}): saving replaces the decision").classes('text-blue-500')
+                if task.key_issue:
+                    ui.label(f"{KEY_ISSUES.get(task.key_issue, task.key_issue)}: no Sirene data fetched").classes('text-orange-500')
 
                 # Get Field Map
                 field_map = project.mapping_config.get('field_map', {})
 
-                # Container for Golden Inputs
+                # Golden values, initialized with the Target or with what a rule pre-filled;
+                # saved from here, whether or not the field has an input on the card
+                golden: Dict[str, str] = {
+                    key: str(task.final_data.get(key, target_val) if task.final_data else target_val)
+                    for key, target_val in task.target_data.items()
+                }
                 golden_inputs: Dict[str, ui.input] = {}
+                # Compact mode: the table showing each field and its row there
+                table_rows: Dict[str, Tuple[ui.table, Dict[str, Any]]] = {}
 
-                def set_val(key: str, val: Any) -> None:
+                def set_val(key: str, val: Any) -> Optional[ui.table]:
+                    # Returns the table to refresh, left to the caller so "Keep All" sends each table once
+                    golden[key] = str(val)
                     if key in golden_inputs:
-                        golden_inputs[key].value = str(val)
+                        golden_inputs[key].value = golden[key]
+                    elif key in table_rows:
+                        table, row = table_rows[key]
+                        row['golden'] = golden[key]
+                        return table
+                    return None
+
+                def pick(key: str, val: Any) -> None:
+                    table = set_val(key, val)
+                    if table:
+                        table.update()
+
+                def edit(key: str, val: Any) -> None:
+                    # Typed in a compact table: the browser already shows it
+                    golden[key] = str(val)
+                    table_rows[key][1]['golden'] = golden[key]
 
                 def apply_all(source: str) -> None:
+                    stale: Dict[int, ui.table] = {}
                     for key, target_val in task.target_data.items():
+                        table = None
                         if source == 'A':
-                            set_val(key, target_val)
+                            table = set_val(key, target_val)
                         elif source == 'B':
                             source_field = field_map.get(key)
                             if source_field and task.candidate_data:
                                 val = task.candidate_data.get(source_field)
                                 if val is not None:
-                                    set_val(key, val)
-
-                # Grid Layout (4 Columns)
-                with ui.grid(columns=4).classes('w-full gap-4 items-center'):
-                    # Headers
-                    ui.label('Field').classes('font-bold border-b')
-                    ui.label('Target (A)').classes('font-bold border-b')
-                    ui.label('Source (B)').classes('font-bold border-b')
-                    ui.label('Golden (C)').classes('font-bold border-b')
-
-                    # Iterate Target Keys
-                    for key, target_val in task.target_data.items():
-                        # 1. Field Name
-                        ui.label(key).classes('text-sm font-semibold')
-
-                        # 2. Target Value (A)
-                        t_val_str = str(target_val)
-                        ui.label(t_val_str).classes('cursor-pointer hover:text-blue-600 p-1 rounded hover:bg-gray-100').on('click', lambda k=key, v=target_val: set_val(k, v)).tooltip('Click to copy to Golden')
-
-                        # 3. Source Value (B)
-                        source_field = field_map.get(key)
-                        source_val = None
-                        bg_class = ""
+                                    table = set_val(key, val)
+                        if table:
+                            stale[table.id] = table
+                    for table in stale.values():
+                        table.update()
+
+                def field_table(rows: List[Dict[str, Any]]) -> None:
+                    # One element for all the rows, instead of four per field
+                    table = ui.table(columns=CARD_COLUMNS, rows=rows, row_key='key').classes('w-full').props('flat dense')
+                    table.add_slot('body-cell-target', r'''
+                        <q-td :props="props" class="cursor-pointer hover:text-blue-600"
+                              @click="$parent.$emit('pick', {key: props.row.key, value: props.row.target})">{{ props.row.target }}</q-td>
+                    ''')
+                    table.add_slot('body-cell-source', r'''
+                        <q-td :props="props" :class="props.row.differs ? 'text-orange-600 font-medium' : ''">
+                            <span v-if="props.row.source !== null" class="cursor-pointer hover:text-blue-600"
+                                  @click="$parent.$emit('pick', {key: props.row.key, value: props.row.source})">{{ props.row.source }}</span>
+                            <span v-else>-</span>
+                        </q-td>
+                    ''')
+                    table.add_slot('body-cell-golden', r'''
+                        <q-td :props="props">
+                            <q-input dense debounce="300" :model-value="props.row.golden"
+                                     @update:model-value="v => { props.row.golden = v; $parent.$emit('golden', {key: props.row.key, value: v}) }" />
+                        </q-td>
+                    ''')
+                    table.on('pick', lambda e: pick(e.args['key'], e.args['value']))
+                    table.on('golden', lambda e: edit(e.args['key'], e.args['value']))
+                    for row in table.rows:
+                        table_rows[row['key']] = (table, row)
+
+                if mode == 'compact':
+                    needs_review, rest = card_rows(task.target_data, task.candidate_data, task.final_data, field_map)
+                    if needs_review:
+                        field_table(needs_review)
+                    else:
+                        ui.label('No field differs from the Source.').classes('text-sm text-gray-500')
+                    if rest:
+                        def expand(e: Any) -> None:
+                            # Built on first open only; wide tables mostly have nothing to review in there
+                            if e.value and not more.default_slot.children:
+                                with more:
+                                    field_table(rest)
+
+                        more = ui.expansion(f'{len(rest)} identical or unmapped fields', on_value_change=expand).classes('w-full')
+                else:
+                    # Grid Layout (4 Columns)
+                    with ui.grid(columns=4).classes('w-full gap-4 items-center'):
+                        # Headers
+                        ui.label('Field').classes('font-bold border-b')
+                        ui.label('Target (A)').classes('font-bold border-b')
+                        ui.label('Source (B)').classes('font-bold border-b')
+                        ui.label('Golden (C)').classes('font-bold border-b')
+
+                        # Iterate Target Keys
+                        for key, target_val in task.target_data.items():
+                            # 1. Field Name
+                            ui.label(key).classes('text-sm font-semibold')
+
+                            # 2. Target Value (A)
+                            t_val_str = str(target_val)
+                            ui.label(t_val_str).classes('cursor-pointer hover:text-blue-600 p-1 rounded hover:bg-gray-100').on('click', lambda k=key, v=target_val: pick(k, v)).tooltip('Click to copy to Golden')
+
+                            # 3. Source Value (B)
+                            source_field = field_map.get(key)
+                            source_val = None
+                            bg_class = ""
 
-                        if source_field and task.candidate_data:
-                            source_val = task.candidate_data.get(source_field)
-                            # Highlight diff
-                            if str(source_val) != t_val_str:
-                                bg_class = "text-orange-600 font-medium"
+                            if source_field and task.candidate_data:
+                                source_val = task.candidate_data.get(source_field)
+                                # Highlight diff
+                                if str(source_val) != t_val_str:
+                                    bg_class = "text-orange-600 font-medium"
 
-                        s_val_str = str(source_val) if source_val is not None else "-"
+                            s_val_str = str(source_val) if source_val is not None else "-"
 
-                        lbl = ui.label(s_val_str).classes(f'cursor-pointer hover:text-blue-600 p-1 rounded hover:bg-gray-100 {bg_class}').tooltip('Click to copy to Golden')
-                        if source_val is not None:
-                            lbl.on('click', lambda k=key, v=source_val: set_val(k, v))
+                            lbl = ui.label(s_val_str).classes(f'cursor-pointer hover:text-blue-600 p-1 rounded hover:bg-gray-100 {bg_class}').tooltip('Click to copy to Golden')
+                            if source_val is not None:
+                                lbl.on('click', lambda k=key, v=source_val: pick(k, v))
 
-                        # 4. Golden Value (C)
-                        # Initialize with Target Value
-                        inp = ui.input(value=t_val_str).classes('w-full')
-                        golden_inputs[key] = inp
+                            # 4. Golden Value (C)
+                            golden_inputs[key] = ui.input(value=golden[key], on_change=lambda e, k=key: golden.__setitem__(k, e.value)).classes('w-full')
 
                 # Actions
                 ui.separator().classes('my-4')
@@ -160,23 +327,47 @@ def validation_page(project_id: int) -> None:
                         ui.button('Keep All A', on_click=lambda: apply_all('A')).classes('mr-2')
                         ui.button('Keep All B', on_click=lambda: apply_all('B'))
 
-                    ui.button('Confirm & Save', on_click=lambda: save_task(task.id, golden_inputs)).classes('bg-green-500 text-white')
+                    def save() -> Any:
+                        final_data = typed_golden(golden, task.target_data, task.candidate_data, task.final_data, field_map)
+                        return submit_decision(task.id, final_data)
+
+                    ui.button('Confirm & Save', on_click=save).classes('bg-green-500 text-white')
 
-    async def save_task(task_id: int, inputs: Dict[str, ui.input]) -> None:
-        final_data = {k: inp.value for k, inp in inputs.items()}
-        await submit_decision(task_id, final_data)
+        CARD_RENDER_SECONDS.observe(time.perf_counter() - start, project=project_id, mode=mode)
+        if profiling_requested():
+            # What the card's elements weigh in the update sent to the browser; serializing
+            # them again costs as much as the render, so only in profiled requests
+            elements = list(card.descendants(include_self=True))
+            payload = len(json.dumps([element._to_dict() for element in elements], default=str))
+            CARD_PAYLOAD_BYTES.observe(payload, project=project_id, mode=mode)
+            logger.debug(f"Task {task.id} card ({mode}): {len(task.target_data)} fields, {len(elements)} elements, {payload} bytes")
 
+    def toggle_compact() -> None:
+        if shown['task']:
+            card_container.clear()
+            render_task_card(shown['task'])
+
+    @profiled('submit_decision')
     async def submit_decision(task_id: int, final_data: Dict[str, Any]) -> None:
-        with Session(engine) as session:
-            t = session.get(ReconciliationTask, task_id)
-            if t:
-                t.decision = 'User Confirmed' # Generic decision label
-                t.status = 'Resolved'
-                t.final_data = final_data
-                session.add(t)
-                session.commit()
+        # Generic decision label
+        if not await asyncio.to_thread(record_decision, task_id, 'User Confirmed', final_data, 'Resolved', owner):
+            ui.notify('This task was taken over by another reviewer, decision dropped', type='warning')
 
         await load_next_task()
 
+    async def heartbeat() -> None:
+        await asyncio.to_thread(renew_leases, owner)
+
+    async def release() -> None:
+        await asyncio.to_thread(release_leases, owner)
+
+    context.client.on_delete(release)
+
+    async def first_task() -> None:
+        # A link to /validation/<project>?task_id=<id> opens that card
+        if task_id is None or not await open_task(task_id):
+            await load_next_task()
+
     # Initial Load
-    ui.timer(0.1, load_next_task, once=True)
+    ui.timer(0.1, first_task, once=True)
+    ui.timer(LEASE_SECONDS / 3, heartbeat)
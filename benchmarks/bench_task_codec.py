@@ -0,0 +1,100 @@
+"""
+Before/after benchmark of the task JSON codec: SQLite file size and row-load
+time for the same synthetic tasks stored as plain JSON and as CompactJSON.
+
+    python -m benchmarks.bench_task_codec --rows 100000
+"""
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, JSON, select, text
+from app.codec import CompactJSON, register_dictionary
+from benchmarks.common import environment, write_results
+from pathlib import Path
+from typing import Dict, Any, List
+import argparse
+import random
+import tempfile
+import time
+
+COLUMNS = [
+    "siret", "raison_sociale", "enseigne", "adresse_ligne_1", "adresse_ligne_2", "code_postal",
+    "commune", "pays", "telephone", "email", "date_creation", "effectif", "code_naf",
+    "libelle_naf", "forme_juridique", "capital_social", "dirigeant_nom", "dirigeant_prenom",
+]
+
+
+def make_tasks(rows: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(rows):
+        target = {c: f"{c[:4]}-{rng.randint(0, 10**6)}" for c in COLUMNS}
+        target["siret"] = f"{rng.randint(0, 10**14 - 1):014d}"
+        final = dict(target)
+        final["commune"] = f"commune-{rng.randint(0, 5000)}"
+        tasks.append({"id": i + 1, "target_data": target, "candidate_data": None, "final_data": final})
+    return tasks
+
+
+def run_variant(name: str, column_type, tasks: List[Dict[str, Any]], workdir: Path) -> Dict[str, Any]:
+    db_file = workdir / f"{name}.db"
+    engine = create_engine(f"sqlite:///{db_file}")
+    metadata = MetaData()
+    table = Table(
+        "reconciliationtask", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("target_data", column_type),
+        Column("candidate_data", column_type),
+        Column("final_data", column_type),
+    )
+    metadata.create_all(engine)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(table.insert(), tasks)
+    write_seconds = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        loaded = conn.execute(select(table)).all()
+    load_seconds = time.perf_counter() - start
+    engine.dispose()
+
+    assert len(loaded) == len(tasks)
+    return {
+        "scenario": name,
+        "rows": len(tasks),
+        "file_bytes": db_file.stat().st_size,
+        "write_seconds": round(write_seconds, 4),
+        "load_seconds": round(load_seconds, 4),
+        "load_rows_per_second": round(len(tasks) / load_seconds),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.rows)
+    register_dictionary(COLUMNS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            run_variant("json", JSON(none_as_null=True), tasks, Path(tmp)),
+            run_variant("compact", CompactJSON(), tasks, Path(tmp)),
+        ]
+
+    before, after = results
+    write_results({
+        "benchmark": "task_codec",
+        "environment": environment(),
+        "results": results,
+        "size_ratio": round(after["file_bytes"] / before["file_bytes"], 3),
+        "load_time_ratio": round(after["load_seconds"] / before["load_seconds"], 3),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Shared measurement and result format of the benchmarks.
+"""
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+def point_app_at(workdir: Path) -> None:
+    """
+    The app reads its database paths at import time: call this before importing
+    any app module so a run only touches throwaway files in `workdir`.
+    """
+    os.environ["SQLITE_FILE"] = str(workdir / "bench.db")
+    os.environ["DUCKDB_FILE"] = str(workdir / "bench.duckdb")
+    os.environ["DUCKDB_PROJECTS_DIR"] = str(workdir / "projects")
+    os.environ["ARCHIVE_DIR"] = str(workdir / "archive")
+
+
+def measure(name: str, func: Callable[[], Optional[Dict[str, Any]]], trace_memory: bool = True) -> Dict[str, Any]:
+    """
+    Runs one scenario and returns its wall time and memory use, merged with
+    the metrics `func` returns. Peak Python heap comes from tracemalloc
+    (allocations made by DuckDB or SQLite are not included); the process
+    peak RSS covers those but never decreases between scenarios.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        metrics = func() or {}
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    result = {
+        "scenario": name,
+        "seconds": round(seconds, 4),
+        "peak_python_bytes": peak,
+        "max_rss_bytes": max_rss_bytes(),
+    }
+    result.update(metrics)
+    return result
+
+
+def max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """
+    p50/p95/max of per-operation latencies, in milliseconds.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    import duckdb
+    import sqlite3
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "duckdb": duckdb.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "git_commit": commit or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def write_results(summary: Dict[str, Any], output: Optional[str]) -> None:
+    """
+    Prints the results and, with `output`, writes them as JSON for benchmarks.compare.
+    """
+    text = json.dumps(summary, indent=2, default=str)
+    print(text)
+    if output:
+        Path(output).write_text(text)
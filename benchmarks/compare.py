@@ -0,0 +1,61 @@
+"""
+Compares two benchmark result files scenario by scenario.
+
+    python -m benchmarks.compare before.json after.json [--threshold 1.1]
+
+Exits with status 1 when a scenario got slower than the threshold ratio.
+"""
+from pathlib import Path
+from typing import Dict, Any
+import argparse
+import json
+import sys
+
+# Lower is better for these metrics
+METRICS = ["seconds", "peak_python_bytes", "max_rss_bytes", "p50_ms", "p95_ms", "file_bytes", "load_seconds"]
+
+
+def _by_scenario(summary: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {r["scenario"]: r for r in summary["results"]}
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    after/before ratio of every metric both runs measured, per scenario.
+    """
+    old, new = _by_scenario(before), _by_scenario(after)
+    ratios: Dict[str, Dict[str, float]] = {}
+    for name in old.keys() & new.keys():
+        for metric in METRICS:
+            a, b = old[name].get(metric), new[name].get(metric)
+            if a and b is not None:
+                ratios.setdefault(name, {})[metric] = round(b / a, 3)
+    return ratios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=1.1, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+    if before.get("spec") != after.get("spec"):
+        print("warning: the runs used different data specs", file=sys.stderr)
+
+    ratios = compare(before, after)
+    regressions = []
+    for name, metrics in sorted(ratios.items()):
+        print(f"{name:12} " + "  ".join(f"{m}={r:.3f}" for m, r in metrics.items()))
+        if metrics.get("seconds", 0) > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"slower than x{args.threshold}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
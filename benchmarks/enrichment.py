@@ -0,0 +1,132 @@
+"""
+End-to-end throughput of the API enrichment path (initialize_tasks_api_pre
+then run_api_worker) against the local mock Sirene server, offline.
+
+    python -m benchmarks.enrichment --rows 200 --latency-ms 80 --rate-429 0.02 --output enrich.json
+
+Fault injection options are those of benchmarks.mock_sirene.
+"""
+from benchmarks.common import point_app_at, measure, environment, write_results
+from benchmarks.mock_sirene import MockConfig, create_app
+from benchmarks.synthetic import SyntheticSpec, generate_pair
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Any
+import argparse
+import asyncio
+import httpx
+import os
+import socket
+import tempfile
+import threading
+import time
+
+
+class MockServer:
+    """
+    Runs the mock Sirene app with uvicorn in a background thread.
+    """
+    def __init__(self, config: MockConfig):
+        import uvicorn
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "MockServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Mock Sirene server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def run_enrichment(rows: int, config: MockConfig, workdir: Path, trace_memory: bool = True) -> Dict[str, Any]:
+    with MockServer(config) as mock:
+        # Every SireneClient the app builds reads SIRENE_BASE_URL
+        os.environ["SIRENE_BASE_URL"] = mock.base_url
+        point_app_at(workdir)
+
+        from app.db import create_db_and_tables, engine
+        from app.models import Project
+        from app.duckdb_client import duckdb_client
+        from app.engine import initialize_tasks_api_pre, run_api_worker
+        from app.review import count_tasks
+        from app.sirene import governor
+        from sqlmodel import Session
+
+        # Pace like against INSEE, to the mock's quota (0 = unlimited)
+        governor.limit = config.quota_per_minute
+
+        create_db_and_tables()
+        spec = SyntheticSpec(rows=rows, width=1, seed=config.seed)
+        files = generate_pair(spec, workdir / "csv")
+
+        with Session(engine) as session:
+            project = Project(name="enrichment", mode="API", status="Mapping", mapping_config={
+                "join_key": {"target": "siret", "source": "siret"},
+                "field_map": {"col_0": "uniteLegale.denominationUniteLegale"},
+                # Synthetic keys are sequential numbers, most of them fail the SIRET checksum
+                "siret_check": False,
+            })
+            session.add(project)
+            session.commit()
+            session.refresh(project)
+            project_id = project.id
+            project.target_table_name = duckdb_client.project_table(project_id, "target")
+            duckdb_client.ingest_csv(project.target_table_name, str(files["target"]))
+            session.add(project)
+            session.commit()
+
+        def init() -> Dict[str, Any]:
+            initialize_tasks_api_pre(project_id)
+            return {"tasks": count_tasks(project_id)}
+
+        results = [
+            measure("api_init", init, trace_memory=trace_memory),
+            measure("api_worker", lambda: asyncio.run(run_api_worker(project_id)), trace_memory=trace_memory),
+        ]
+        worker = results[-1]
+        # Tasks whose candidate was fetched (found or not) have a diff count
+        worker["enriched"] = count_tasks(project_id, min_diffs=0)
+        worker["tasks_per_second"] = round(worker["enriched"] / worker["seconds"], 2) if worker["seconds"] else None
+        worker["server_counts"] = httpx.get(f"{mock.base_url}/_stats").json()["counts"]
+        return {"results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    for name, default in asdict(MockConfig()).items():
+        if name != "size":
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    config = MockConfig(size=args.rows, **{name: getattr(args, name) for name in asdict(MockConfig()) if name != "size"})
+    with tempfile.TemporaryDirectory(prefix="reconlab-bench-") as tmp:
+        summary = run_enrichment(args.rows, config, Path(tmp), trace_memory=not args.no_tracemalloc)
+
+    write_results({
+        "benchmark": "enrichment",
+        "rows": args.rows,
+        "mock": asdict(config),
+        "environment": environment(),
+        **summary,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Local stand-in for the INSEE Sirene API, for load tests that must not spend
+real quota. Serves /siret/{siret}, the multi-criteria /siret?q= search (AND,
+OR groups, ranges) and /informations from a generated dataset, with
+injectable latency, 429s (with Retry-After), 5xx errors and timeouts.
+
+    python -m benchmarks.mock_sirene --port 8765 --size 10000 --latency-ms 80 --rate-429 0.02
+    SIRENE_BASE_URL=http://127.0.0.1:8765 SIRENE_QUOTA_PER_MINUTE=0 python main.py
+
+Known SIRETs are the 14-digit zero-padded numbers below --size, the keys of
+benchmarks.synthetic, except a deterministic --missing-rate share (404).
+"""
+from dataclasses import dataclass, asdict
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from typing import Dict, Any, List, Optional, Iterator
+from collections import Counter
+import argparse
+import asyncio
+import random
+import re
+import time
+import zlib
+
+STREETS = ["DE LA PAIX", "VICTOR HUGO", "DES LILAS", "DU GENERAL LECLERC", "JEAN JAURES", "DE LA GARE", "PASTEUR"]
+STREET_TYPES = ["RUE", "AV", "BD", "PL", "CHE"]
+CITIES = [("75002", "PARIS"), ("69003", "LYON"), ("13001", "MARSEILLE"), ("31000", "TOULOUSE"),
+          ("33000", "BORDEAUX"), ("59000", "LILLE"), ("44000", "NANTES"), ("67000", "STRASBOURG")]
+NAF_CODES = ["62.01Z", "47.11F", "56.10A", "43.21A", "70.22Z", "86.21Z", "41.20A"]
+WORDS = ["ATLAS", "BOREAL", "CEDRE", "DELTA", "EOLE", "FLORE", "GAIA", "HORIZON", "IRIS", "JADE", "KORA", "LUMEN"]
+SUFFIXES = ["SAS", "SARL", "SA", "EURL", "SCI"]
+
+
+@dataclass
+class MockConfig:
+    size: int = 10_000
+    missing_rate: float = 0.1    # Share of known-range SIRETs answering 404
+    latency_ms: float = 0.0      # Added before every response
+    jitter_ms: float = 0.0       # Uniform extra latency
+    rate_429: float = 0.0        # Share of requests answered 429
+    retry_after: int = 1         # Retry-After seconds of those 429s
+    quota_per_minute: int = 0    # Fixed-window quota like INSEE's (0 = unlimited)
+    rate_5xx: float = 0.0        # Share of requests answered 500/503
+    rate_timeout: float = 0.0    # Share of requests held for timeout_seconds, then 504
+    timeout_seconds: float = 30.0
+    seed: int = 42
+
+
+def _bucket(seed: int, siret: str) -> float:
+    return zlib.crc32(f"{seed}:{siret}".encode()) / 2**32
+
+
+def make_etablissement(siret: str, seed: int = 42) -> Dict[str, Any]:
+    """
+    Deterministic establishment document shaped like the API's "etablissement".
+    """
+    rng = random.Random(f"{seed}:{siret}")
+    postcode, city = rng.choice(CITIES)
+    naf = rng.choice(NAF_CODES)
+    created = f"{rng.randint(1970, 2023)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    updated = f"{rng.randint(2019, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00.000"
+    active = rng.random() > 0.15
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "statutDiffusionEtablissement": "O",
+        "dateCreationEtablissement": created,
+        "etablissementSiege": siret[9:] == "00001" or rng.random() > 0.7,
+        "dateDernierTraitementEtablissement": updated,
+        "uniteLegale": {
+            "denominationUniteLegale": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SUFFIXES)}",
+            "categorieJuridiqueUniteLegale": rng.choice(["5710", "5499", "5599", "6540"]),
+            "activitePrincipaleUniteLegale": naf,
+            "etatAdministratifUniteLegale": "A" if active else "C",
+        },
+        "adresseEtablissement": {
+            "numeroVoieEtablissement": str(rng.randint(1, 250)),
+            "typeVoieEtablissement": rng.choice(STREET_TYPES),
+            "libelleVoieEtablissement": rng.choice(STREETS),
+            "codePostalEtablissement": postcode,
+            "libelleCommuneEtablissement": city,
+        },
+        "periodesEtablissement": [{
+            "dateFin": None,
+            "dateDebut": created,
+            "etatAdministratifEtablissement": "A" if active else "F",
+            "activitePrincipaleEtablissement": naf,
+        }],
+    }
+
+
+def _leaves(doc: Dict[str, Any]) -> Iterator[tuple]:
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            yield from _leaves(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    yield from _leaves(item)
+        else:
+            yield key, value
+
+
+def _parse_query(q: str) -> List[List[tuple]]:
+    """
+    "field:value AND (field:a OR field:b) AND field:[from TO to]" -> AND-ed terms,
+    each a list of OR-ed (field, value) alternatives. Values match exactly or by
+    prefix (val*), quotes optional; ranges compare as text, * is open.
+    """
+    terms = []
+    for part in re.split(r"\s+AND\s+", q.strip(), flags=re.IGNORECASE):
+        part = part.strip()
+        if part.startswith("(") and part.endswith(")"):
+            part = part[1:-1]
+        alternatives = []
+        for alternative in re.split(r"\s+OR\s+", part, flags=re.IGNORECASE):
+            field, sep, value = alternative.partition(":")
+            if not sep:
+                raise ValueError(f"Unsupported search term '{alternative}'")
+            alternatives.append((field.strip(), value.strip().strip('"').upper()))
+        terms.append(alternatives)
+    return terms
+
+
+def _value_matches(wanted: str, candidates: List[str]) -> bool:
+    range_ = re.fullmatch(r"\[(\S+) TO (\S+)\]", wanted)
+    if range_:
+        low, high = range_.groups()
+        return any((low == "*" or v >= low) and (high == "*" or v <= high) for v in candidates)
+    if wanted.endswith("*"):
+        return any(v.startswith(wanted[:-1]) for v in candidates)
+    return wanted in candidates
+
+
+def _matches(doc: Dict[str, Any], terms: List[List[tuple]]) -> bool:
+    values: Dict[str, List[str]] = {}
+    for key, value in _leaves(doc):
+        values.setdefault(key, []).append(str(value).upper())
+    return all(any(_value_matches(wanted, values.get(field, [])) for field, wanted in alternatives)
+               for alternatives in terms)
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    config = config or MockConfig()
+    app = FastAPI(title="Mock Sirene")
+    rng = random.Random(config.seed)
+    stats: Counter = Counter()
+    window = {"start": time.monotonic(), "count": 0}
+
+    def exists(siret: str) -> bool:
+        return siret.isdigit() and len(siret) == 14 and int(siret) < config.size \
+            and _bucket(config.seed, siret) >= config.missing_rate
+
+    def error(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+        return JSONResponse({"header": {"statut": status, "message": message}}, status_code=status, headers=headers)
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith("/_"):
+            return await call_next(request)
+        stats["requests"] += 1
+
+        delay = config.latency_ms + rng.uniform(0, config.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        if config.quota_per_minute:
+            now = time.monotonic()
+            if now - window["start"] >= 60:
+                window.update(start=now, count=0)
+            window["count"] += 1
+            if window["count"] > config.quota_per_minute:
+                stats["429"] += 1
+                retry = max(1, int(60 - (now - window["start"])) + 1)
+                return error(429, "Too Many Requests", {"Retry-After": str(retry)})
+
+        draw = rng.random()
+        if draw < config.rate_429:
+            stats["429"] += 1
+            return error(429, "Too Many Requests", {"Retry-After": str(config.retry_after)})
+        draw -= config.rate_429
+        if draw < config.rate_5xx:
+            status = rng.choice([500, 503])
+            stats[str(status)] += 1
+            return error(status, "Erreur interne du serveur")
+        draw -= config.rate_5xx
+        if draw < config.rate_timeout:
+            stats["timeout"] += 1
+            await asyncio.sleep(config.timeout_seconds)
+            return error(504, "Gateway Timeout")
+
+        response = await call_next(request)
+        stats[str(response.status_code)] += 1
+        return response
+
+    @app.get("/informations")
+    async def informations() -> Dict[str, Any]:
+        return {
+            "etatService": "UP",
+            "versionService": "3.11",
+            "datesDernieresMisesAJourDesDonnees": [
+                {"collection": "Etablissements", "dateDerniereMiseADisposition": "2025-01-01T00:00:00.000"},
+            ],
+        }
+
+    @app.get("/siret/{siret}")
+    async def get_siret(siret: str):
+        if not (siret.isdigit() and len(siret) == 14):
+            return error(400, f"Erreur de syntaxe dans le paramètre siret={siret}")
+        if not exists(siret):
+            return error(404, f"Aucun élément trouvé pour le siret {siret}")
+        return {"header": {"statut": 200, "message": "ok"}, "etablissement": make_etablissement(siret, config.seed)}
+
+    @app.get("/siret")
+    async def search(q: str = "", nombre: int = 20, debut: int = 0):
+        try:
+            terms = _parse_query(q) if q else []
+        except ValueError as e:
+            return error(400, str(e))
+        nombre = max(1, min(nombre, 1000))
+
+        found, page = 0, []
+        for i in range(config.size):
+            siret = f"{i:014d}"
+            if not exists(siret):
+                continue
+            doc = make_etablissement(siret, config.seed)
+            if _matches(doc, terms):
+                if debut <= found < debut + nombre:
+                    page.append(doc)
+                found += 1
+        if not found:
+            return error(404, "Aucun élément trouvé")
+        return {
+            "header": {"statut": 200, "message": "OK", "total": found, "debut": debut, "nombre": len(page)},
+            "etablissements": page,
+        }
+
+    @app.get("/_stats")
+    async def get_stats() -> Dict[str, Any]:
+        return {"config": asdict(config), "counts": dict(stats)}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, default in asdict(MockConfig()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+
+    config = MockConfig(**{name: getattr(args, name) for name in asdict(MockConfig())})
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+End-to-end benchmark of the CSV pipeline on synthetic data: ingest,
+task initialization, card validation, task search, bulk API decisions and export,
+each timed and memory-profiled, with the results written as JSON.
+
+    python -m benchmarks.pipeline --size 1m --output results/pipeline_1m.json
+    python -m benchmarks.compare results/before.json results/after.json
+
+The app runs against throwaway databases in a temporary directory.
+"""
+from benchmarks.common import point_app_at, measure, latency_summary, environment, write_results
+from benchmarks.synthetic import SyntheticSpec, generate_pair, SIZES
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Any, List
+import argparse
+import tempfile
+import time
+
+SCENARIOS = ["ingest", "init", "validation", "search", "decisions", "export"]
+
+
+def run_pipeline(spec: SyntheticSpec, workdir: Path, scenarios: List[str], reviews: int = 200,
+                 trace_memory: bool = True) -> List[Dict[str, Any]]:
+    point_app_at(workdir)
+
+    from app.db import create_db_and_tables, engine
+    from app.models import Project
+    from app.duckdb_client import duckdb_client
+    from app.engine import initialize_tasks_csv
+    from app.review import claim_tasks, record_decision, count_tasks, apply_decisions
+    from app.api import DECISION_BATCH_SIZE
+    from app.export import export_project
+    from app.models import ReconciliationTask
+    from app.search import search_tasks
+    from sqlmodel import Session
+    import random
+
+    create_db_and_tables()
+    results = []
+
+    files: Dict[str, Path] = {}
+    results.append(measure("generate", lambda: files.update(generate_pair(spec, workdir / "csv")), trace_memory=False))
+
+    with Session(engine) as session:
+        project = Project(name="bench", mode="CSV", status="Mapping", mapping_config=spec.mapping)
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        project_id = project.id
+        project.target_table_name = duckdb_client.project_table(project_id, "target")
+        project.source_table_name = duckdb_client.project_table(project_id, "source")
+        session.add(project)
+        session.commit()
+        target_table, source_table = project.target_table_name, project.source_table_name
+
+    def ingest() -> Dict[str, Any]:
+        duckdb_client.ingest_csv(target_table, str(files["target"]))
+        duckdb_client.ingest_csv(source_table, str(files["source"]))
+        with duckdb_client.tables(target_table, source_table):
+            rows = duckdb_client.query(f"SELECT (SELECT count(*) FROM {target_table}), (SELECT count(*) FROM {source_table})")[0]
+        return {"target_rows": rows[0], "source_rows": rows[1]}
+
+    def init() -> Dict[str, Any]:
+        initialize_tasks_csv(project_id)
+        return {"tasks": count_tasks(project_id)}
+
+    def validation() -> Dict[str, Any]:
+        # What one card costs: claim the next task, refresh the progress counts, record the decision
+        samples = []
+        for _ in range(reviews):
+            op_start = time.perf_counter()
+            claimed = claim_tasks(project_id, "bench", 1)
+            if not claimed:
+                break
+            count_tasks(project_id)
+            count_tasks(project_id, status="Pending")
+            task = claimed[0]
+            record_decision(task.id, "Keep Target", dict(task.target_data), owner="bench")
+            samples.append(time.perf_counter() - op_start)
+        return {"reviews": len(samples), **latency_summary(samples)}
+
+    def search() -> Dict[str, Any]:
+        # A reviewer jumping to a record, by its join key and by one of its values
+        rng = random.Random(spec.seed)
+        with Session(engine) as session:
+            tasks = [session.get(ReconciliationTask, i) for i in rng.sample(range(1, count_tasks(project_id) + 1), reviews)]
+        samples, found = [], 0
+        for task in tasks:
+            for query in (task.task_key, str(task.target_data["col_0"])):
+                op_start = time.perf_counter()
+                results = search_tasks(project_id, query)
+                samples.append(time.perf_counter() - op_start)
+                found += any(t.id == task.id for t in results)
+        return {"searches": len(samples), "found": found, **latency_summary(samples)}
+
+    def decisions() -> Dict[str, Any]:
+        # An upstream tool accepting the Source values of every Target row, addressed by join key
+        with duckdb_client.tables(target_table):
+            keys = [r[0] for r in duckdb_client.query(f"SELECT siret FROM {target_table}")]
+        recorded = 0
+        for i in range(0, len(keys), DECISION_BATCH_SIZE):
+            batch = [(n, {"key": key, "decision": "Accept Source"}) for n, key in enumerate(keys[i:i + DECISION_BATCH_SIZE], start=i + 1)]
+            recorded += sum(1 for r in apply_decisions(project_id, batch) if "error" not in r)
+        return {"decisions": len(keys), "recorded": recorded}
+
+    def export() -> Dict[str, Any]:
+        response = export_project(project_id)
+        return {"status_code": response.status_code, "bytes": len(response.body)}
+
+    steps = {"ingest": ingest, "init": init, "validation": validation, "search": search, "decisions": decisions, "export": export}
+    for name in SCENARIOS:
+        if name in scenarios:
+            results.append(measure(name, steps[name], trace_memory=trace_memory))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", choices=SIZES, help="Preset row count (overrides --rows)")
+    parser.add_argument("--rows", type=int, default=SyntheticSpec.rows)
+    parser.add_argument("--match-rate", type=float, default=SyntheticSpec.match_rate)
+    parser.add_argument("--duplicate-rate", type=float, default=SyntheticSpec.duplicate_rate)
+    parser.add_argument("--diff-rate", type=float, default=SyntheticSpec.diff_rate)
+    parser.add_argument("--width", type=int, default=SyntheticSpec.width)
+    parser.add_argument("--seed", type=int, default=SyntheticSpec.seed)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--reviews", type=int, default=200, help="Cards decided by the validation scenario")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip Python heap tracing, which slows Python-heavy stages")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(
+        rows=SIZES[args.size] if args.size else args.rows,
+        match_rate=args.match_rate, duplicate_rate=args.duplicate_rate,
+        diff_rate=args.diff_rate, width=args.width, seed=args.seed,
+    )
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="reconlab-bench-") as tmp:
+        results = run_pipeline(spec, Path(tmp), scenarios, reviews=args.reviews, trace_memory=not args.no_tracemalloc)
+
+    write_results({
+        "benchmark": "pipeline",
+        "spec": asdict(spec),
+        "environment": environment(),
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Startup cost of the app: `import main`, the first DuckDB query and
+time-to-first-response of `python main.py`.
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+
+Each measurement runs in a fresh process against throwaway databases; the
+first run of each is a warm-up (bytecode caches, new database files). The
+slowest modules of `python -X importtime -c "import main"` are reported too.
+"""
+from benchmarks.common import point_app_at, environment, write_results
+from pathlib import Path
+from typing import Dict, Any, List
+import argparse
+import httpx
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def time_first_query() -> float:
+    """
+    Seconds to the first DuckDB result in a process that imported main:
+    opening the DuckDB file plus whatever the result conversion imports.
+    """
+    code = ("import time, main; from app.duckdb_client import duckdb_client; start = time.perf_counter(); "
+            "duckdb_client.query_as_dict('SELECT 42 AS answer'); print(time.perf_counter() - start)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return float(out.split()[-1])
+
+
+def time_first_response(timeout: float = 60) -> float:
+    """
+    Seconds from spawning `python main.py` to the first 200 on `/`.
+    """
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env={**os.environ, "PORT": str(port)},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"main.py exited with status {proc.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"No response from main.py within {timeout} s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def slowest_imports(top: int = 15) -> List[Dict[str, Any]]:
+    """
+    Top-level modules by cumulative import time, parsed from -X importtime.
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                            check=True, capture_output=True, text=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Indentation marks nesting; keep the modules main and the interpreter import directly
+        if len(name) - len(name.lstrip()) <= 3:
+            modules.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+
+
+def _scenario(name: str, samples: List[float]) -> Dict[str, Any]:
+    return {
+        "scenario": name,
+        "seconds": round(statistics.median(samples), 4),
+        "min_seconds": round(min(samples), 4),
+        "max_seconds": round(max(samples), 4),
+        "runs": len(samples),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs per scenario, after one warm-up")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="reconlab-bench-") as tmp:
+        point_app_at(Path(tmp))
+        results = []
+        for name, func in (("import", time_import), ("first_query", time_first_query), ("first_response", time_first_response)):
+            func()
+            results.append(_scenario(name, [func() for _ in range(args.runs)]))
+        imports = slowest_imports()
+
+    write_results({
+        "benchmark": "startup",
+        "spec": {"runs": args.runs},
+        "environment": environment(),
+        "results": results,
+        "slowest_imports": imports,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Deterministic synthetic Target/Source CSV pairs for the benchmarks.
+
+Rows are generated by DuckDB from hashes of the row number and the seed, so
+the same parameters always give the same files (for a given DuckDB version)
+and 10M-row files take seconds rather than minutes.
+
+    python -m benchmarks.synthetic --rows 1000000 --out bench_data
+"""
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any
+import argparse
+import duckdb
+import json
+import time
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Hash buckets used to turn rates into deterministic row selections
+BUCKETS = 1_000_000
+
+
+@dataclass
+class SyntheticSpec:
+    rows: int = 10_000
+    match_rate: float = 0.8       # Share of Target rows with a Source candidate
+    duplicate_rate: float = 0.05  # Share of matched keys with a second Source candidate
+    diff_rate: float = 0.1        # Share of mapped values where the Source disagrees
+    width: int = 8                # Mapped columns besides the key
+    seed: int = 42
+
+    @property
+    def field_map(self) -> Dict[str, str]:
+        return {f"col_{k}": f"src_col_{k}" for k in range(self.width)}
+
+    @property
+    def mapping(self) -> Dict[str, Any]:
+        """
+        Project mapping_config joining the generated files.
+        """
+        return {"join_key": {"target": "siret", "source": "siret"}, "field_map": self.field_map}
+
+
+def _below(rate: float, *keys: str) -> str:
+    return f"hash({', '.join(keys)}) % {BUCKETS} < {int(rate * BUCKETS)}"
+
+
+def generate_pair(spec: SyntheticSpec, out_dir: Path) -> Dict[str, Path]:
+    """
+    Writes target.csv and source.csv for `spec` into `out_dir`.
+    Keys are 14-digit SIRET-like strings; Source rows come in hashed order.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    target_path = out_dir / "target.csv"
+    source_path = out_dir / "source.csv"
+    seed = int(spec.seed)
+
+    def value(k: int) -> str:
+        return f"'c{k}-' || CAST(hash(i, {k}, {seed}) % 100000 AS VARCHAR)"
+
+    target_cols = ",\n".join(f"{value(k)} AS col_{k}" for k in range(spec.width))
+
+    def source_value(k: int) -> str:
+        differs = _below(spec.diff_rate, "i", str(k), "copy", str(seed), "'diff'")
+        changed = f"'changed-' || CAST(hash(i, {k}, copy) % 100000 AS VARCHAR)"
+        return f"CASE WHEN {differs} THEN {changed} ELSE {value(k)} END"
+
+    source_cols = ",\n".join(f"{source_value(k)} AS src_col_{k}" for k in range(spec.width))
+
+    conn = duckdb.connect()
+    try:
+        conn.execute(f"""
+            COPY (
+                SELECT lpad(CAST(i AS VARCHAR), 14, '0') AS siret, {target_cols}
+                FROM range({int(spec.rows)}) r(i)
+            ) TO '{target_path.as_posix()}' (HEADER, DELIMITER ',')
+        """)
+        conn.execute(f"""
+            COPY (
+                WITH matched AS (
+                    SELECT i FROM range({int(spec.rows)}) r(i)
+                    WHERE {_below(spec.match_rate, 'i', str(seed), "'match'")}
+                ),
+                copies AS (
+                    SELECT i, 0 AS copy FROM matched
+                    UNION ALL
+                    SELECT i, 1 AS copy FROM matched
+                    WHERE {_below(spec.duplicate_rate, 'i', str(seed), "'duplicate'")}
+                )
+                SELECT lpad(CAST(i AS VARCHAR), 14, '0') AS siret, {source_cols}
+                FROM copies
+                ORDER BY hash(i, copy, {seed})
+            ) TO '{source_path.as_posix()}' (HEADER, DELIMITER ',')
+        """)
+    finally:
+        conn.close()
+
+    return {"target": target_path, "source": source_path}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", choices=SIZES, help="Preset row count (overrides --rows)")
+    parser.add_argument("--rows", type=int, default=SyntheticSpec.rows)
+    parser.add_argument("--match-rate", type=float, default=SyntheticSpec.match_rate)
+    parser.add_argument("--duplicate-rate", type=float, default=SyntheticSpec.duplicate_rate)
+    parser.add_argument("--diff-rate", type=float, default=SyntheticSpec.diff_rate)
+    parser.add_argument("--width", type=int, default=SyntheticSpec.width)
+    parser.add_argument("--seed", type=int, default=SyntheticSpec.seed)
+    parser.add_argument("--out", default="bench_data")
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(
+        rows=SIZES[args.size] if args.size else args.rows,
+        match_rate=args.match_rate, duplicate_rate=args.duplicate_rate,
+        diff_rate=args.diff_rate, width=args.width, seed=args.seed,
+    )
+    start = time.perf_counter()
+    paths = generate_pair(spec, Path(args.out))
+    print(json.dumps({
+        "spec": asdict(spec),
+        "files": {role: str(p) for role, p in paths.items()},
+        "seconds": round(time.perf_counter() - start, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
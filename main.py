@@ -1,22 +1,48 @@
-from nicegui import ui, app as nicegui_app, events
+import time
+STARTED = time.perf_counter()
+
+from nicegui import ui, app as nicegui_app, events, background_tasks
 from app.db import create_db_and_tables, engine
-from app.models import Project, ReconciliationTask
+from app.models import Project
 from app.duckdb_client import duckdb_client
+from app.maintenance import purge_project
 from app.engine import initialize_tasks_csv, initialize_tasks_api_pre, run_api_worker, verify_api_connectivity
 # Import new pages
 import app.ui_mapping
 import app.ui_validation
+import app.ui_review
+import app.ui_fast_review
+import app.ui_maintenance
+import app.ui_diagnostics # Also registers /metrics
+import app.ui_query_log
 import app.export # Register export route
-from sqlmodel import Session, select, delete
+import app.api # Register the decisions API
+from app.metrics import STARTUP_SECONDS
+from sqlmodel import Session, select
+from loguru import logger
 import asyncio
 from pathlib import Path
 import os
 
-# Initialize DB
-create_db_and_tables()
+STARTUP_SECONDS.set(time.perf_counter() - STARTED, phase="imports")
+
+def startup() -> None:
+    """
+    Runs before the first request is served; importing main stays side-effect free.
+    """
+    create_db_and_tables()
+    STARTUP_SECONDS.set(time.perf_counter() - STARTED, phase="schema")
+    # The Sirene check is a network round trip, it must not hold up the first page
+    background_tasks.create(verify_api_connectivity(), name='verify_api_connectivity')
+    STARTUP_SECONDS.set(time.perf_counter() - STARTED, phase="ready")
+    logger.info(f"Ready in {time.perf_counter() - STARTED:.2f} s "
+                f"(imports {STARTUP_SECONDS.value(phase='imports'):.2f} s)")
+
+nicegui_app.on_startup(startup)
 
-# Register startup check
-nicegui_app.on_startup(verify_api_connectivity)
+# Project databases are attached on demand; give back the idle ones
+DUCKDB_IDLE_SECONDS = int(os.getenv("DUCKDB_IDLE_SECONDS", "300"))
+nicegui_app.timer(60, lambda: duckdb_client.loaded and duckdb_client.detach_idle(DUCKDB_IDLE_SECONDS))
 
 # Store state
 class State:
@@ -66,21 +92,10 @@ def index():
             </q-td>
         ''')
 
-        def handle_delete(e):
+        async def handle_delete(e):
             row = e.args
-            with Session(engine) as session:
-                proj = session.get(Project, row['id'])
-                if proj:
-                    # Drop DuckDB tables
-                    duckdb_client.drop_table(proj.target_table_name)
-                    if proj.source_table_name:
-                        duckdb_client.drop_table(proj.source_table_name)
-
-                    # Delete associated tasks
-                    session.exec(delete(ReconciliationTask).where(ReconciliationTask.project_id == proj.id))
-
-                    session.delete(proj)
-                    session.commit()
+            # Tasks, DuckDB file, archive, then frees the SQLite pages (a full VACUUM the first time)
+            await asyncio.to_thread(purge_project, row['id'])
             ui.notify(f"Deleted project {row['id']}")
             ui.navigate.reload()
 
@@ -99,7 +114,9 @@ def index():
         table.on('resume', handle_resume)
 
     # New Project Wizard Button
-    ui.button('New Project', on_click=lambda: ui.navigate.to('/create')).classes('mt-4')
+    with ui.row().classes('mt-4'):
+        ui.button('New Project', on_click=lambda: ui.navigate.to('/create'))
+        ui.button('Storage', on_click=lambda: ui.navigate.to('/maintenance')).props('icon=storage outline')
 
 
 @ui.page('/create')
@@ -159,7 +176,7 @@ def create_project():
         uploaded_files[type_] = local_path.absolute().as_posix()
         ui.notify(f"Uploaded {e.file.name}")
 
-    def create():
+    async def create():
         if not name_input.value:
             ui.notify('Name is required', type='warning')
             return
@@ -188,9 +205,11 @@ def create_project():
             # Helper for options
             def get_opt(val): return None if val == 'Auto' else val
 
-            # Target
-            target_table = f"proj_{proj_id}_target"
-            duckdb_client.ingest_csv(
+            # Target, in the project's own DuckDB file. Ingest runs off the event loop,
+            # so projects can be created in parallel
+            target_table = duckdb_client.project_table(proj_id, "target")
+            await asyncio.to_thread(
+                duckdb_client.ingest_csv,
                 target_table,
                 uploaded_files['target'],
                 delimiter=get_opt(target_delimiter.value),
@@ -202,8 +221,9 @@ def create_project():
 
             # Source
             if source_type.value == 'CSV':
-                source_table = f"proj_{proj_id}_source"
-                duckdb_client.ingest_csv(
+                source_table = duckdb_client.project_table(proj_id, "source")
+                await asyncio.to_thread(
+                    duckdb_client.ingest_csv,
                     source_table,
                     uploaded_files['source'],
                     delimiter=get_opt(source_delimiter.value),
@@ -223,4 +243,4 @@ def create_project():
 
 # Start the app
 if __name__ in {"__main__", "__mp_main__"}:
-    ui.run(title='ReconLab', port=8080, reload=False)
+    ui.run(title='ReconLab', port=int(os.getenv('PORT', '8080')), reload=False)
@@ -32,3 +32,14 @@ def test_duckdb_ingest(tmp_path):
     # We can create a new instance pointing to :memory: or a temp file if we modified the class to accept path.
     # The current class hardcodes the path. I'll stick to testing the logic if I can, or skip integration test.
     pass
+
+def test_lazy_duckdb_client(tmp_path):
+    from app.duckdb_client import LazyDuckDBClient
+    db_file = tmp_path / "lazy.duckdb"
+    client = LazyDuckDBClient(db_path=str(db_file), projects_dir=tmp_path)
+    assert not client.loaded and not db_file.exists()
+
+    # Native rows, NULL stays None instead of pandas' NaN
+    assert client.query_as_dict("SELECT 1 AS a, NULL::DOUBLE AS b") == [{"a": 1, "b": None}]
+    assert client.loaded and db_file.exists()
+    assert client.get() is client.get()
@@ -0,0 +1,70 @@
+import csv
+import json
+import os
+import pytest
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def reconlab(tmp_path, *args):
+    env = {**os.environ,
+           "SQLITE_FILE": str(tmp_path / "cli.db"),
+           "DUCKDB_FILE": str(tmp_path / "cli.duckdb"),
+           "DUCKDB_PROJECTS_DIR": str(tmp_path / "projects"),
+           "ARCHIVE_DIR": str(tmp_path / "archive")}
+    return subprocess.run([sys.executable, "-m", "app.cli", *map(str, args)], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+def write_inputs(tmp_path, join_key="code"):
+    (tmp_path / "target.csv").write_text("code,city\n1,Paris\n2,Lyon\n3,Nice\n")
+    (tmp_path / "source.csv").write_text("code,ville\n1,Paris\n2,Lyon 2e\n")
+    (tmp_path / "mapping.json").write_text(json.dumps({
+        "join_key": {"target": join_key, "source": "code"}, "field_map": {"city": "ville"}}))
+    (tmp_path / "rules.json").write_text(json.dumps([{"field": "city", "when": "source_differs", "action": "take_source"}]))
+
+def test_run_pipeline_end_to_end(tmp_path):
+    write_inputs(tmp_path)
+    result = reconlab(tmp_path, "run", "--name", "nightly", "--target", tmp_path / "target.csv",
+                      "--source", tmp_path / "source.csv", "--mapping", tmp_path / "mapping.json",
+                      "--rules", tmp_path / "rules.json", "--output", tmp_path / "out.csv")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "1"
+    assert "3 tasks" in result.stderr and "1 resolved" in result.stderr
+
+    with open(tmp_path / "out.csv", newline="") as f:
+        rows = {r["code"]: r for r in csv.DictReader(f)}
+    assert rows["2"]["city"] == "Lyon 2e" and rows["2"]["_recon_status"] == "Modified"
+    assert rows["1"]["_recon_status"] == "Pending"
+
+    listing = reconlab(tmp_path, "list")
+    assert listing.stdout.split("\t")[:4] == ["1", "nightly", "CSV", "Processing"]
+
+def test_bad_mapping_is_a_usage_error(tmp_path):
+    write_inputs(tmp_path, join_key="siret")
+    result = reconlab(tmp_path, "create", "--name", "bad", "--target", tmp_path / "target.csv",
+                      "--source", tmp_path / "source.csv", "--mapping", tmp_path / "mapping.json")
+    assert result.returncode == 2
+    assert "Target join key 'siret'" in result.stderr
+    # No half-created project left behind
+    assert reconlab(tmp_path, "list").stdout == ""
+    assert list((tmp_path / "projects").glob("*.duckdb")) == []
+
+    assert reconlab(tmp_path, "export", 99, tmp_path / "out.csv").returncode == 2
+
+def test_failed_export_leaves_no_part_file(tmp_path, monkeypatch):
+    import app.cli as cli
+    import app.export
+    import app.maintenance
+
+    def fail(project_id, f):
+        f.write("half a row")
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(cli, "_get_project", lambda project_id: None)
+    monkeypatch.setattr(app.maintenance, "rehydrate_project", lambda project_id: False)
+    monkeypatch.setattr(app.export, "write_export", fail)
+
+    with pytest.raises(RuntimeError):
+        cli.export(1, str(tmp_path / "out.csv"))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,61 @@
+import json
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import text
+from app import codec
+from app.models import ReconciliationTask, CodecDictionary
+import app.db  # registers rl_json / rl_pack
+
+ROW = {
+    "siret": "12345678900012", "raison_sociale": "ACME", "adresse_ligne_1": "1 rue de la Paix",
+    "code_postal": "75001", "commune": "PARIS", "effectif": 12, "capital_social": None,
+}
+
+def test_roundtrip_with_and_without_dictionary():
+    plain = codec.encode(ROW)
+    codec.register_dictionary(list(ROW))
+    compact = codec.encode(ROW)
+
+    assert codec.decode(plain) == ROW
+    assert codec.decode(compact) == ROW
+    assert len(compact) < len(plain) < len(json.dumps(ROW))
+
+def test_legacy_json_text_is_decoded():
+    assert codec.decode('{"a": 1}') == {"a": 1}
+    assert codec.decode("null") is None
+
+def test_unknown_dictionary_is_loaded_from_database(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(app.db, "engine", engine)
+
+    keys = ["only_in_other_process", "x"]
+    dict_id = codec.register_dictionary(keys)
+    blob = codec.encode({"only_in_other_process": 1, "x": 2})
+    with Session(engine) as session:
+        session.add(CodecDictionary(id=dict_id, key_list=json.dumps(keys)))
+        session.commit()
+
+    # Forget it, as a fresh process would
+    monkeypatch.setattr(codec, "_dictionaries", {})
+    monkeypatch.setattr(codec, "_by_keyset", {})
+    assert codec.decode(blob) == {"only_in_other_process": 1, "x": 2}
+
+def test_orm_and_sql_functions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        task = ReconciliationTask(project_id=1, target_data=ROW, candidate_data=None)
+        session.add(task)
+        session.commit()
+        session.refresh(task)
+        assert task.target_data == ROW
+
+        conn = session.connection()
+        assert conn.execute(text("SELECT typeof(target_data), typeof(candidate_data) FROM reconciliationtask")).one() == ("blob", "null")
+        assert conn.execute(text("SELECT json_extract(rl_json(target_data), '$.commune') FROM reconciliationtask")).scalar() == "PARIS"
+
+        conn.execute(text("UPDATE reconciliationtask SET final_data = rl_pack(json_set(rl_json(target_data), '$.commune', 'LYON'))"))
+        session.commit()
+        session.refresh(task)
+        assert task.final_data == {**ROW, "commune": "LYON"}
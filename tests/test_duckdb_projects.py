@@ -0,0 +1,78 @@
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.duckdb_client import DuckDBClient
+from app.models import Project, ReconciliationTask
+import app.engine as engine_module
+
+def make_client(tmp_path):
+    csv = tmp_path / "target.csv"
+    csv.write_text("code,company\n1,Alice\n2,Bob\n")
+    client = DuckDBClient(":memory:", projects_dir=tmp_path / "projects")
+    return client, str(csv)
+
+def test_project_tables_live_in_own_file(tmp_path):
+    client, csv = make_client(tmp_path)
+    table = client.project_table(7, "target")
+
+    assert client.ingest_csv(table, csv) == ["code", "company"]
+    assert (tmp_path / "projects" / "proj_7.duckdb").exists()
+
+    # Idle catalogs are detached, and attached again on the next use
+    assert client.detach_idle(0) == ["proj_7"]
+    with client.tables(table):
+        assert client.query(f"SELECT count(*) FROM {table}") == [(2,)]
+
+def test_detach_idle_keeps_catalogs_in_use(tmp_path):
+    client, csv = make_client(tmp_path)
+    table = client.project_table(1, "target")
+    client.ingest_csv(table, csv)
+
+    with client.tables(table):
+        assert client.detach_idle(0) == []
+    assert client.detach_idle(0) == ["proj_1"]
+
+def test_drop_project_tables_unlinks_file(tmp_path):
+    client, csv = make_client(tmp_path)
+    table = client.project_table(2, "target")
+    client.ingest_csv(table, csv)
+    client.ingest_csv("legacy_target", csv)
+
+    client.drop_project_tables(table, None, "legacy_target")
+
+    assert not (tmp_path / "projects" / "proj_2.duckdb").exists()
+    assert client.get_columns("legacy_target") == []
+
+def test_initialize_tasks_from_project_file(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    client, csv = make_client(tmp_path)
+    monkeypatch.setattr(engine_module, "engine", engine)
+    monkeypatch.setattr(engine_module, "duckdb_client", client)
+
+    with Session(engine) as session:
+        project = Project(name="Files", mode="CSV", status="Mapping",
+                          mapping_config={"join_key": {"target": "code", "source": "code"},
+                                          "field_map": {"company": "company"}})
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        project_id = project.id
+
+    target_table = client.project_table(project_id, "target")
+    source_table = client.project_table(project_id, "source")
+    client.ingest_csv(target_table, csv)
+    client.ingest_csv(source_table, csv)
+    client.detach_idle(0)
+
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        project.target_table_name = target_table
+        project.source_table_name = source_table
+        session.add(project)
+        session.commit()
+
+    engine_module.initialize_tasks_csv(project_id)
+
+    with Session(engine) as session:
+        tasks = session.exec(select(ReconciliationTask)).all()
+        assert len(tasks) == 2
+        assert all(t.candidate_data is not None for t in tasks)
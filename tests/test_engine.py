@@ -102,3 +102,94 @@ def test_query_finds_legacy_null_string(session):
     # If none_as_null=True, loading "null" string might result in None?
     # Let's check.
     assert results[0].candidate_data is None
+
+@pytest.mark.anyio
+async def test_failed_lookups_go_to_dead_letter_list(tmp_path, monkeypatch):
+    import app.engine as engine_module
+    from app.sirene import SireneClient, SireneError
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(test_engine)
+    monkeypatch.setattr(engine_module, "engine", test_engine)
+
+    with Session(test_engine) as session:
+        proj = Project(name="API", mode="API", mapping_config={"join_key": {"target": "siret"}, "field_map": {}})
+        session.add(proj)
+        session.commit()
+        session.add_all([ReconciliationTask(project_id=proj.id, target_data={"siret": s}, task_key=s) for s in ("1", "2")])
+        session.commit()
+        project_id = proj.id
+
+    def candidates():
+        with Session(test_engine) as session:
+            return [t.candidate_data for t in session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id))]
+
+    async def lookup(siret):
+        if siret == "2":
+            raise SireneError("HTTP 503 after 4 attempts")
+        return None
+
+    with patch.object(SireneClient, "fetch_siret", new_callable=AsyncMock) as mock_fetch:
+        mock_fetch.side_effect = lookup
+        await engine_module.run_api_worker(project_id)
+    # Not found is stored as {}, a failure keeps no candidate and is dead-lettered
+    assert candidates() == [{}, None]
+    assert [(f.siret, f.error) for f in engine_module.list_failures(project_id)] == [("2", "HTTP 503 after 4 attempts")]
+
+    with patch.object(SireneClient, "fetch_siret", new_callable=AsyncMock) as mock_fetch:
+        mock_fetch.return_value = None
+        await engine_module.run_api_worker(project_id, only_failed=True)
+    assert [call.args[0] for call in mock_fetch.call_args_list] == ["2"]
+    assert candidates() == [{}, {}]
+    assert engine_module.list_failures(project_id) == []
+
+@pytest.mark.anyio
+async def test_resync_reopens_only_changed_tasks(tmp_path, monkeypatch):
+    import app.engine as engine_module
+    import app.raw_store as raw_store
+    import app.review as review
+    from app.sirene import SireneClient
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(test_engine)
+    for module in (engine_module, raw_store, review):
+        monkeypatch.setattr(module, "engine", test_engine)
+    monkeypatch.setattr(engine_module, "RESYNC_BATCH_SIZE", 2)
+
+    field_map = {"city": "adresseEtablissement.libelleCommuneEtablissement"}
+    with Session(test_engine) as session:
+        proj = Project(name="API", mode="API", status="Completed",
+                       mapping_config={"join_key": {"target": "siret"}, "field_map": field_map})
+        session.add(proj)
+        session.commit()
+        for siret, city in (("1", "LYON"), ("2", "NICE"), ("3", "METZ")):
+            session.add(ReconciliationTask(project_id=proj.id, target_data={"siret": siret, "city": city}, task_key=siret,
+                                           candidate_data={"siret": siret, field_map["city"]: city},
+                                           status="Resolved", decision="Keep Target"))
+        session.commit()
+        project_id = proj.id
+
+    changed = [
+        # Moved: reopened
+        {"siret": "1", "adresseEtablissement": {"libelleCommuneEtablissement": "BRON"}},
+        # Updated, but not in a mapped field: stays resolved
+        {"siret": "2", "adresseEtablissement": {"libelleCommuneEtablissement": "NICE"}, "etablissementSiege": True},
+    ]
+    with patch.object(SireneClient, "search_changed", new_callable=AsyncMock) as mock_search:
+        mock_search.side_effect = [changed, []]
+        report = await engine_module.resync_project(project_id)
+
+    assert [sorted(call.args[0]) for call in mock_search.call_args_list] == [["1", "2"], ["3"]]
+    assert (report["sirets"], report["queries"], report["changed"], report["reopened"]) == (3, 2, 2, 1)
+    with Session(test_engine) as session:
+        tasks = session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id)).all()
+        assert [(t.status, t.decision) for t in tasks] == [("Pending", None), ("Resolved", "Keep Target"), ("Resolved", "Keep Target")]
+        assert tasks[0].diff_fields == "|city|"
+        project = session.get(Project, project_id)
+        assert project.status == "Validation"
+        assert project.last_sync_at is not None
+        last_sync = project.last_sync_at
+
+    # The next re-sync only asks for changes since this one
+    with patch.object(SireneClient, "search_changed", new_callable=AsyncMock) as mock_search:
+        mock_search.return_value = []
+        await engine_module.resync_project(project_id)
+    assert mock_search.call_args.args[1] == last_sync - engine_module.RESYNC_OVERLAP
@@ -0,0 +1,85 @@
+import csv
+import io
+from datetime import timedelta
+from sqlmodel import Session, SQLModel, create_engine
+from app.models import Project, ReconciliationTask, utc_now
+import app.export as export
+import app.review as review
+
+def test_full_and_delta_exports(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(export, "engine", engine)
+    monkeypatch.setattr(review, "engine", engine)
+
+    with Session(engine) as session:
+        project = Project(name="Delta", mode="CSV", status="Processing",
+                          mapping_config={"join_key": {"target": "code", "source": "code"}, "field_map": {"city": "ville"}})
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        target = {"code": 1, "city": "Lyon", "adresse.cp": "69001"}
+        session.add_all([
+            ReconciliationTask(project_id=project.id, target_data=target, status="Resolved", decision="Manual Edit",
+                               final_data={**target, "city": "Lyon 1er", "adresse.cp": 69002}, decided_at=utc_now()),
+            ReconciliationTask(project_id=project.id, target_data={"code": 2, "city": "Nice", "adresse.cp": "06000"},
+                               status="Resolved", decision="Keep Target",
+                               final_data={"code": 2, "city": "Nice", "adresse.cp": "06000"}, decided_at=utc_now()),
+            ReconciliationTask(project_id=project.id, target_data={"code": 3, "city": "Metz", "adresse.cp": "57000"}),
+        ])
+        session.commit()
+        project_id = project.id
+
+    full = io.StringIO()
+    assert export.write_export(project_id, full) == 3
+    statuses = [r["_recon_status"] for r in csv.DictReader(io.StringIO(full.getvalue()))]
+    assert statuses == ["Modified", "Original", "Pending"]
+
+    delta = io.StringIO()
+    assert export.write_delta_export(project_id, delta) == 2
+    rows = list(csv.DictReader(io.StringIO(delta.getvalue())))
+    assert [(r["key"], r["field"], r["old"], r["new"], r["decision"]) for r in rows] == [
+        ("1", "city", "Lyon", "Lyon 1er", "Manual Edit"),
+        # A type change counts as a change, like the full export's comparison
+        ("1", "adresse.cp", "69001", "69002", "Manual Edit"),
+    ]
+    assert rows[0]["decided_at"]
+
+    later = io.StringIO()
+    assert export.write_delta_export(project_id, later, since=utc_now() + timedelta(minutes=1)) == 0
+    assert later.getvalue().strip() == ",".join(export.DELTA_COLUMNS)
+
+def test_unedited_card_confirmation_has_no_delta(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(export, "engine", engine)
+    monkeypatch.setattr(review, "engine", engine)
+
+    field_map = {"city": "ville", "cp": "code_postal"}
+    target = {"code": 1, "city": "Lyon", "cp": None, "ratio": 0.5}
+    candidate = {"ville": "LYON", "code_postal": 69001}
+    with Session(engine) as session:
+        project = Project(name="Card", mode="CSV", status="Validation", mapping_config={"field_map": field_map})
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        task = ReconciliationTask(project_id=project.id, task_key="1", target_data=target, candidate_data=candidate)
+        session.add(task)
+        session.commit()
+        project_id, task_id = project.id, task.id
+
+    # What the card's inputs hold when confirmed as shown
+    golden = {key: str(val) for key, val in target.items()}
+    final_data = review.typed_golden(golden, target, candidate, None, field_map)
+    assert final_data == target
+    assert review.record_decision(task_id, "User Confirmed", final_data)
+
+    delta = io.StringIO()
+    assert export.write_delta_export(project_id, delta) == 0
+    full = io.StringIO()
+    export.write_export(project_id, full)
+    assert [r["_recon_status"] for r in csv.DictReader(io.StringIO(full.getvalue()))] == ["Original"]
+
+    # A picked Source value keeps its type, a typed-in one is text
+    golden.update(cp="69001", city="Lyon 1er")
+    assert review.typed_golden(golden, target, candidate, None, field_map) == {**target, "cp": 69001, "city": "Lyon 1er"}
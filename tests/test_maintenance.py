@@ -0,0 +1,128 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.duckdb_client import DuckDBClient
+from app.models import Project, ReconciliationTask
+import app.maintenance as maintenance
+
+@pytest.fixture(name="env")
+def env_fixture(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    client = DuckDBClient(":memory:", projects_dir=tmp_path / "projects")
+    monkeypatch.setattr(maintenance, "engine", engine)
+    monkeypatch.setattr(maintenance, "duckdb_client", client)
+    monkeypatch.setattr(maintenance, "ARCHIVE_DIR", tmp_path / "archive")
+
+    csv = tmp_path / "target.csv"
+    csv.write_text("code,company\n1,Alice\n2,Bob\n")
+
+    with Session(engine) as session:
+        project = Project(name="Done", mode="CSV", status="Completed")
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        project.target_table_name = client.project_table(project.id, "target")
+        client.ingest_csv(project.target_table_name, str(csv))
+        session.add(project)
+        session.add_all([
+            ReconciliationTask(project_id=project.id, target_data={"code": 1, "company": "Alice"},
+                               candidate_data={"company": "Alicia"}, status="Resolved",
+                               decision="Accept Source", final_data={"code": 1, "company": "Alicia"}, diff_count=1),
+            ReconciliationTask(project_id=project.id, target_data={"code": 2, "company": "Bob"}, status="Skipped"),
+        ])
+        session.commit()
+        project_id = project.id
+
+    return engine, client, project_id
+
+def test_archive_and_rehydrate_round_trip(env, tmp_path):
+    engine, client, project_id = env
+    with Session(engine) as session:
+        before = [(t.id, t.status, t.decision, t.target_data, t.candidate_data, t.final_data, t.diff_count)
+                  for t in session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id))]
+
+    archive = maintenance.archive_project(project_id)
+
+    assert (archive / "tasks.parquet").exists()
+    assert (archive / "target.parquet").exists()
+    assert not (tmp_path / "projects" / f"proj_{project_id}.duckdb").exists()
+    with Session(engine) as session:
+        assert session.exec(select(ReconciliationTask)).all() == []
+        assert session.get(Project, project_id).archive_path == archive.as_posix()
+
+    report = maintenance.storage_report()
+    assert report["projects"][0]["archived"] is True
+    assert report["projects"][0]["tasks"] == 0
+    assert report["projects"][0]["archive_bytes"] > 0
+
+    assert maintenance.rehydrate_project(project_id) is True
+    assert maintenance.rehydrate_project(project_id) is False
+
+    with Session(engine) as session:
+        after = [(t.id, t.status, t.decision, t.target_data, t.candidate_data, t.final_data, t.diff_count)
+                 for t in session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id))]
+        project = session.get(Project, project_id)
+        assert project.archive_path is None
+    assert after == before
+    assert client.get_columns(project.target_table_name) == ["code", "company"]
+    assert not archive.exists()
+
+def test_only_completed_projects_are_archived(env):
+    engine, _, project_id = env
+    with Session(engine) as session:
+        project = session.get(Project, project_id)
+        project.status = "Processing"
+        session.add(project)
+        session.commit()
+
+    with pytest.raises(ValueError):
+        maintenance.archive_project(project_id)
+
+def test_failed_archive_keeps_the_hot_copies(env, tmp_path, monkeypatch):
+    engine, client, project_id = env
+
+    def fail(self):
+        raise RuntimeError("disk full")
+    with monkeypatch.context() as patch, pytest.raises(RuntimeError):
+        patch.setattr(Session, "commit", fail)
+        maintenance.archive_project(project_id)
+
+    assert (tmp_path / "projects" / f"proj_{project_id}.duckdb").exists()
+    with Session(engine) as session:
+        assert session.get(Project, project_id).archive_path is None
+        assert len(session.exec(select(ReconciliationTask)).all()) == 2
+
+def test_purge_and_compact(env):
+    engine, _, project_id = env
+    # First compaction converts the test database to incremental vacuum
+    maintenance.compact_sqlite()
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+
+    maintenance.purge_project(project_id)
+
+    report = maintenance.storage_report()
+    assert report["projects"] == []
+    assert report["sqlite_free_bytes"] == 0
+
+def test_purge_leaves_the_full_vacuum_to_compaction(env):
+    engine, _, project_id = env
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 0
+
+    maintenance.purge_project(project_id)
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 0
+    assert maintenance.compact_sqlite(max_pages=100) == 0
+
+def test_concurrent_rehydrations_restore_once(env):
+    engine, client, project_id = env
+    maintenance.archive_project(project_id)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        restored = list(pool.map(maintenance.rehydrate_project, [project_id, project_id]))
+    assert sorted(restored) == [False, True]
+    with Session(engine) as session:
+        assert len(session.exec(select(ReconciliationTask).where(ReconciliationTask.project_id == project_id)).all()) == 2
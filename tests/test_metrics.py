@@ -0,0 +1,38 @@
+import pytest
+from app.metrics import Registry, Counter, Gauge, Histogram
+
+def test_prometheus_text_format():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ["status"]))
+    rate = registry.register(Gauge("rate", "Rate"))
+    latency = registry.register(Histogram("latency_seconds", "Latency", ["endpoint"], buckets=(0.1, 1.0)))
+
+    requests.inc(status="200")
+    requests.inc(2, status='4"9')
+    rate.set(12.5)
+    latency.observe(0.05, endpoint="siret")
+    latency.observe(0.1, endpoint="siret")
+    latency.observe(3, endpoint="siret")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{status="200"} 1' in lines
+    assert 'requests_total{status="4\\"9"} 2' in lines
+    assert "rate 12.5" in lines
+    assert 'latency_seconds_bucket{endpoint="siret",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="siret",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="siret",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{endpoint="siret"} 3' in lines
+
+def test_labels_are_checked_and_summary():
+    latency = Histogram("h", "H", ["project"], buckets=(1.0, 2.0))
+    with pytest.raises(ValueError):
+        latency.observe(1.0)
+    assert latency.summary(project=1) == {"count": 0}
+
+    for value in (0.5, 1.5, 1.5, 1.5):
+        latency.observe(value, project=1)
+    summary = latency.summary(project=1)
+    assert summary["count"] == 4
+    assert summary["mean"] == pytest.approx(1.25)
+    assert 1.0 <= summary["p50"] <= 2.0
@@ -0,0 +1,82 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from benchmarks.mock_sirene import MockConfig, create_app, make_etablissement
+from benchmarks.enrichment import MockServer
+from app.sirene import SireneClient, RateLimitExceeded, QuotaGovernor
+import app.sirene as sirene
+
+@pytest.fixture(autouse=True)
+def unlimited_governor(monkeypatch):
+    # The mock's 429s must not pause the other tests
+    monkeypatch.setattr(sirene, "governor", QuotaGovernor(0))
+
+def test_lookup_search_and_informations():
+    client = TestClient(create_app(MockConfig(size=50, missing_rate=0.0)))
+
+    doc = client.get("/siret/00000000000007").json()["etablissement"]
+    assert doc == make_etablissement("00000000000007")
+    assert client.get("/siret/00000000009999").status_code == 404
+    assert client.get("/siret/123").status_code == 400
+
+    postcode = doc["adresseEtablissement"]["codePostalEtablissement"]
+    found = client.get("/siret", params={"q": f"codePostalEtablissement:{postcode}", "nombre": 5}).json()
+    assert found["header"]["total"] >= 1
+    assert len(found["etablissements"]) <= 5
+    assert all(e["adresseEtablissement"]["codePostalEtablissement"] == postcode for e in found["etablissements"])
+
+    assert client.get("/informations").json()["etatService"] == "UP"
+
+def test_injected_faults():
+    client = TestClient(create_app(MockConfig(size=10, rate_429=1.0, retry_after=7)))
+    response = client.get("/siret/00000000000001")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+
+    client = TestClient(create_app(MockConfig(size=10, quota_per_minute=2)))
+    assert [client.get("/informations").status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get("/_stats").json()["counts"]["429"] == 1
+
+def test_base_url_from_environment(monkeypatch):
+    assert SireneClient().base_url == SireneClient.BASE_URL
+    monkeypatch.setenv("SIRENE_BASE_URL", "http://localhost:8765/")
+    assert SireneClient().base_url == "http://localhost:8765"
+    assert SireneClient(base_url="http://other").base_url == "http://other"
+
+@pytest.mark.anyio
+async def test_client_against_mock_server():
+    with MockServer(MockConfig(size=10, missing_rate=0.0)) as mock:
+        client = SireneClient(base_url=mock.base_url)
+        assert await client.check_connection()
+        flat = await client.get_by_siret("00000000000003")
+        assert flat["siret"] == "00000000000003"
+        assert "adresseEtablissement.codePostalEtablissement" in flat
+
+    with MockServer(MockConfig(size=10, rate_429=1.0, retry_after=3)) as mock:
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await SireneClient(base_url=mock.base_url).fetch_siret("00000000000003")
+        assert excinfo.value.retry_after == 3
+
+@pytest.mark.anyio
+async def test_concurrent_lookups_share_one_request():
+    with MockServer(MockConfig(size=10, missing_rate=0.0, latency_ms=100)) as mock:
+        client = SireneClient(base_url=mock.base_url)
+        docs = await asyncio.gather(*(SireneClient(base_url=mock.base_url).fetch_siret("00000000000005") for _ in range(5)),
+                                    client.fetch_siret("00000000000006"))
+        assert [d["siret"] for d in docs] == ["00000000000005"] * 5 + ["00000000000006"]
+        assert httpx.get(f"{mock.base_url}/_stats").json()["counts"]["requests"] == 2
+
+        # Once settled, the next lookup is a new request
+        await client.fetch_siret("00000000000005")
+        assert httpx.get(f"{mock.base_url}/_stats").json()["counts"]["requests"] == 3
+
+@pytest.mark.anyio
+async def test_search_changed_against_mock_server():
+    from datetime import datetime
+    sirets = [f"{i:014d}" for i in range(10)]
+    since = datetime(2024, 1, 1)
+    expected = [s for s in sirets if make_etablissement(s)["dateDernierTraitementEtablissement"] >= since.isoformat()]
+    with MockServer(MockConfig(size=10, missing_rate=0.0)) as mock:
+        docs = await SireneClient(base_url=mock.base_url).search_changed(sirets, since)
+    assert sorted(d["siret"] for d in docs) == expected
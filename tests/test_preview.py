@@ -0,0 +1,63 @@
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.duckdb_client import DuckDBClient
+from app.models import Project, ReconciliationTask
+import app.engine as engine_module
+
+@pytest.fixture(name="env")
+def env_fixture(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    client = DuckDBClient(":memory:")
+    monkeypatch.setattr(engine_module, "engine", engine)
+    monkeypatch.setattr(engine_module, "duckdb_client", client)
+
+    target_csv = tmp_path / "target.csv"
+    target_csv.write_text("id,company,city\n1,Alice,Paris\n2,Bob,Lyon\n3,Carol,Nice\n4,Dan,Metz\n")
+    source_csv = tmp_path / "source.csv"
+    source_csv.write_text("code,title,town\n1,Alice,Paris\n2,Bob,Lille\n2,Bobby,Lyon\n3,Carole,Nice\n")
+    client.ingest_csv("t_target", str(target_csv))
+    client.ingest_csv("t_source", str(source_csv))
+
+    with Session(engine) as session:
+        project = Project(name="Preview", mode="CSV", status="Mapping",
+                          target_table_name="t_target", source_table_name="t_source")
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        project_id = project.id
+
+    return engine, project_id
+
+def test_preview_exact_counts(env):
+    engine, project_id = env
+    mapping = {
+        "join_key": {"target": "id", "source": "code"},
+        "field_map": {"company": "title", "city": "town"}
+    }
+    result = engine_module.preview_join(project_id, mapping, exact=True)
+
+    assert result["target_rows"] == 4
+    assert result["matched_rows"] == 3
+    assert result["match_rate"] == pytest.approx(0.75)
+    assert result["duplicate_rows"] == 1
+    assert result["duplicate_rate"] == pytest.approx(1 / 3)
+    # 4 joined pairs: (1) same, (2) Bob/Lille, (2) Bobby/Lyon, (3) Carole/Nice
+    assert result["field_disagreement"]["company"] == pytest.approx(2 / 4)
+    assert result["field_disagreement"]["city"] == pytest.approx(1 / 4)
+
+    # Dry-run: no task written, project untouched
+    with Session(engine) as session:
+        assert session.exec(select(ReconciliationTask)).all() == []
+        assert session.get(Project, project_id).status == "Mapping"
+
+def test_preview_sample_caps_rows(env):
+    _, project_id = env
+    mapping = {"join_key": {"target": "id", "source": "code"}, "field_map": {}}
+    result = engine_module.preview_join(project_id, mapping, sample_size=2)
+    assert result["target_rows"] == 2
+    assert result["exact"] is False
+
+def test_preview_invalid_mapping(env):
+    _, project_id = env
+    assert engine_module.preview_join(project_id, {"join_key": {"target": "id"}}) is None
@@ -0,0 +1,43 @@
+import asyncio
+import pstats
+import time
+import app.profiling as profiling
+
+def busy() -> int:
+    end = time.perf_counter() + 0.05
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+def test_off_returns_function_untouched(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "")
+    assert profiling.profiled("busy")(busy) is busy
+
+def test_profiles_sync_and_async_calls(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "1")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+
+    assert profiling.profiled()(busy)() > 0
+
+    @profiling.profiled("handler")
+    async def handler() -> int:
+        return await asyncio.to_thread(busy)
+
+    assert asyncio.run(handler()) > 0
+
+    stats = sorted(tmp_path.glob("*.pstats"))
+    assert [p.name.split("_", 1)[1] for p in stats] == ["busy.pstats", "handler.pstats"]
+    assert any(func[2] == "busy" for func in pstats.Stats(str(stats[0])).stats)
+    # The sampler sees the worker thread the async handler hands its work to
+    collapsed = (tmp_path / stats[1].name.replace(".pstats", ".collapsed")).read_text()
+    assert "busy (test_profiling.py" in collapsed
+
+def test_requested_only_for_profiled_requests(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "")
+    assert not profiling.profiling_requested()
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "1")
+    assert profiling.profiling_requested()
+    # Outside a request carrying ?profile=1
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "request")
+    assert not profiling.profiling_requested()
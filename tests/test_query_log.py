@@ -0,0 +1,65 @@
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app.duckdb_client import DuckDBClient
+import app.query_log as query_log
+
+@pytest.fixture(name="log")
+def log_fixture(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_log, "QUERY_LOG_FILE", tmp_path / "slow.jsonl")
+    monkeypatch.setitem(query_log.settings, "enabled", True)
+    monkeypatch.setitem(query_log.settings, "threshold_ms", 0)
+    monkeypatch.setitem(query_log.settings, "explain", True)
+    return tmp_path / "slow.jsonl"
+
+def test_sqlite_statements_logged_with_plan(log, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'q.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (a INTEGER)"))
+        conn.execute(text("SELECT * FROM t WHERE a = :a"), {"a": 1})
+
+    entry = next(e for e in query_log.read_entries() if e["statement"].startswith("SELECT"))
+    assert entry["source"] == "sqlite"
+    assert "SCAN" in entry["plan"][0]["detail"]
+    assert entry["params"] == "(1,)"
+
+def test_failing_statements_keep_their_own_timing(log, tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'q.db'}")
+    # Each call of the clock is one second later
+    clock = iter(range(1000))
+    monkeypatch.setattr(query_log, "time", SimpleNamespace(perf_counter=lambda: next(clock)))
+    with engine.begin() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 1"))
+
+    ok, failed = [e for e in query_log.read_entries() if e["statement"] in ("SELECT 1", "SELECT * FROM missing")]
+    assert failed["error"] and "no such table" in failed["error"]
+    assert ok["error"] is None
+    # Started and ended by the statement itself, not by the one that failed before it
+    assert ok["ms"] == 1000 and failed["ms"] == 1000
+
+def test_duckdb_profiles_read_only_statements(log, tmp_path):
+    client = DuckDBClient(":memory:", projects_dir=tmp_path)
+    client.query("CREATE TABLE t AS SELECT range AS i FROM range(10)")
+    client.query("SELECT count(*) FROM t WHERE i > ?", [3])
+
+    select, create = [e for e in query_log.read_entries() if e["source"] == "duckdb"]
+    assert select["plan"]["children"]
+    # Profiling would run the statement a second time
+    assert create["plan"] is None and create["plan_error"] is None
+
+def test_disabled_and_rotation(log, monkeypatch):
+    monkeypatch.setitem(query_log.settings, "enabled", False)
+    assert not query_log.is_slow(10.0)
+
+    monkeypatch.setattr(query_log, "MAX_LOG_BYTES", 300)
+    for i in range(10):
+        query_log.record("sqlite", f"SELECT {i}", None, 1.0)
+    assert log.with_name("slow.jsonl.1").exists()
+    assert not log.with_name(f"slow.jsonl.{query_log.BACKUP_COUNT + 1}").exists()
+    assert query_log.read_entries(limit=1)[0]["statement"] == "SELECT 9"
+
+    query_log.clear()
+    assert query_log.read_entries() == []
@@ -0,0 +1,215 @@
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.models import Project, ReconciliationTask
+from app.engine import apply_candidate
+import app.review as review
+
+FIELD_MAP = {"city": "adresse.ville", "name": "nom"}
+
+@pytest.fixture(name="project_id")
+def project_fixture(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(review, "engine", engine)
+
+    with Session(engine) as session:
+        project = Project(name="Grid", mode="CSV", status="Processing",
+                          mapping_config={"join_key": {"target": "id", "source": "id"}, "field_map": FIELD_MAP})
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+
+        rows = [
+            ({"id": 1, "city": "Paris", "name": "A"}, {"adresse.ville": "Paris", "nom": "A"}),
+            ({"id": 2, "city": "Lyon", "name": "B"}, {"adresse.ville": "Lille", "nom": "B"}),
+            ({"id": 3, "city": "Nice", "name": "C"}, {"adresse.ville": "Metz", "nom": "Cc"}),
+            ({"id": 4, "city": "Brest", "name": "D"}, {"adresse.ville": None, "nom": "D"}),
+        ]
+        for target, candidate in rows:
+            task = ReconciliationTask(project_id=project.id, target_data=target, status="Pending")
+            apply_candidate(task, candidate, FIELD_MAP)
+            session.add(task)
+        session.commit()
+        return project.id
+
+def test_filters_and_counts(project_id):
+    assert review.count_tasks(project_id) == 4
+    assert review.count_tasks(project_id, min_diffs=1) == 2
+    assert review.count_tasks(project_id, max_diffs=0) == 2
+    assert review.count_tasks(project_id, field="name") == 1
+
+    tasks = review.query_tasks(project_id, field="city")
+    assert [t.target_data["id"] for t in tasks] == [2, 3]
+    # Field names are matched literally, "_" is no wildcard
+    assert review.count_tasks(project_id, field="cit_") == 0
+
+def test_seek_pagination(project_id):
+    first = review.query_tasks(project_id, sort="diff_count", limit=2)
+    assert [t.diff_count for t in first] == [2, 1]
+
+    last = first[-1]
+    rest = review.query_tasks(project_id, sort="diff_count", after=(last.diff_count, last.id), limit=2)
+    assert [t.diff_count for t in rest] == [0, 0]
+    assert {t.id for t in first}.isdisjoint({t.id for t in rest})
+
+def test_seek_pagination_reaches_unknown_diff_counts(project_id):
+    with Session(review.engine) as session:
+        session.add(ReconciliationTask(project_id=project_id, target_data={"id": 5}, status="Pending"))
+        session.commit()
+
+    seen, after = [], None
+    while True:
+        page = review.query_tasks(project_id, status="Pending", sort="diff_count", after=after, limit=2)
+        seen += page
+        if len(page) < 2:
+            break
+        after = (page[-1].diff_count, page[-1].id)
+    assert [t.diff_count for t in seen] == [2, 1, 0, 0, None]
+    assert len({t.id for t in seen}) == 5
+
+def test_bulk_accept_source(project_id):
+    ids = [t.id for t in review.query_tasks(project_id)]
+    updated = review.bulk_decide(project_id, ids, "Accept Source")
+    assert updated == 4
+
+    with Session(review.engine) as session:
+        tasks = session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id)).all()
+        assert all(t.status == "Resolved" and t.decision == "Accept Source" for t in tasks)
+        assert tasks[1].final_data == {"id": 2, "city": "Lille", "name": "B"}
+        assert tasks[2].final_data == {"id": 3, "city": "Metz", "name": "Cc"}
+        # Null source values keep the target
+        assert tasks[3].final_data == {"id": 4, "city": "Brest", "name": "D"}
+        # Nothing left to review: the project can be archived
+        assert session.get(Project, project_id).status == "Completed"
+
+def test_bulk_keep_target(project_id):
+    ids = [t.id for t in review.query_tasks(project_id, min_diffs=1)]
+    assert review.bulk_decide(project_id, ids, "Keep Target") == 2
+    assert review.count_tasks(project_id, status="Pending") == 2
+
+    with Session(review.engine) as session:
+        task = session.get(ReconciliationTask, ids[0])
+        assert task.final_data == task.target_data
+
+def test_source_overlay_skips_null_values():
+    target = {"id": 4, "city": "Brest", "name": "D"}
+    candidate = {"adresse.ville": None, "nom": "Dd"}
+    assert review.source_overlay(target, candidate, FIELD_MAP) == {"id": 4, "city": "Brest", "name": "Dd"}
+    assert review.source_overlay(target, None, FIELD_MAP) == target
+
+def test_card_rows_collapse_identical_and_unmapped_fields():
+    target = {"id": 3, "city": "Nice", "name": "C", "zip": "06000"}
+    candidate = {"adresse.ville": "Metz", "nom": "C"}
+    needs_review, rest = review.card_rows(target, candidate, {"zip": "06100"}, FIELD_MAP)
+    assert [r["key"] for r in needs_review] == ["city", "zip"]
+    assert needs_review[0] == {"key": "city", "target": "Nice", "source": "Metz", "golden": "Nice", "differs": True}
+    assert needs_review[1]["golden"] == "06100" and not needs_review[1]["differs"]
+    assert [r["key"] for r in rest] == ["id", "name"]
+    assert rest[0]["source"] is None and rest[0]["golden"] == "3"
+
+    # No candidate yet: nothing differs, every field is collapsed
+    needs_review, rest = review.card_rows(target, None, None, FIELD_MAP)
+    assert needs_review == [] and len(rest) == 4
+
+def test_claims_never_overlap(project_id):
+    first = review.claim_tasks(project_id, "alice", limit=2)
+    second = review.claim_tasks(project_id, "bob", limit=10)
+    assert len(first) == 2 and len(second) == 2
+    assert {t.id for t in first}.isdisjoint({t.id for t in second})
+    assert all(t.lease_owner == "alice" for t in first)
+
+    # Everything is leased: a third reviewer gets nothing
+    assert review.claim_tasks(project_id, "carol", limit=10) == []
+
+    # A reload of the same session gets its own leases back, unless excluded
+    again = review.claim_tasks(project_id, "alice", limit=10)
+    assert [t.id for t in again] == [t.id for t in first]
+    assert review.claim_tasks(project_id, "alice", limit=10, exclude_ids=[t.id for t in first]) == []
+
+def test_claims_seek_the_pending_tasks_in_id_order(project_id):
+    statements = []
+    capture = lambda conn, cursor, statement, params, context, executemany: statements.append((statement, params))
+    event.listen(review.engine, "before_cursor_execute", capture)
+    review.claim_tasks(project_id, "alice", 2, exclude_ids=[1])
+    event.remove(review.engine, "before_cursor_execute", capture)
+
+    statement, params = next(s for s in statements if s[0].startswith("UPDATE"))
+    with review.engine.connect() as conn:
+        plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params)]
+    assert any("USING INDEX ix_task_project_status_id (project_id=? AND status=?)" in detail for detail in plan), plan
+    assert not any("TEMP B-TREE" in detail for detail in plan), plan
+
+def test_expired_leases_are_reclaimed(project_id):
+    stale = review.claim_tasks(project_id, "alice", limit=4, ttl_seconds=-1)
+    assert len(stale) == 4
+    assert review.renew_leases("nobody") == 0
+
+    reclaimed = review.claim_tasks(project_id, "bob", limit=4)
+    assert [t.id for t in reclaimed] == [t.id for t in stale]
+
+    # Alice lost the lease: her late decision is dropped
+    assert not review.record_decision(stale[0].id, "Keep Target", {}, owner="alice")
+    assert review.record_decision(stale[0].id, "Keep Target", stale[0].target_data, owner="bob")
+
+    # Leases held by bob are skipped by bulk decisions
+    ids = [t.id for t in review.query_tasks(project_id)]
+    assert review.bulk_decide(project_id, ids, "Keep Target") == 1
+
+    assert review.release_leases("bob") == 3
+    assert review.bulk_decide(project_id, ids, "Keep Target") == 4
+
+def test_last_decision_completes_the_project(project_id):
+    tasks = review.claim_tasks(project_id, "alice", limit=4)
+    for task in tasks[:-1]:
+        assert review.record_decision(task.id, "Keep Target", task.target_data, owner="alice")
+    with Session(review.engine) as session:
+        assert session.get(Project, project_id).status == "Processing"
+
+    assert review.record_decision(tasks[-1].id, None, None, status="Skipped", owner="alice")
+    with Session(review.engine) as session:
+        assert session.get(Project, project_id).status == "Completed"
+
+def test_record_decision_skip(project_id):
+    task = review.claim_tasks(project_id, "alice", limit=1)[0]
+    assert review.record_decision(task.id, None, None, status="Skipped", owner="alice")
+    assert not review.record_decision(999, "Keep Target", {})
+
+    with Session(review.engine) as session:
+        skipped = session.get(ReconciliationTask, task.id)
+        assert skipped.status == "Skipped"
+        assert skipped.lease_owner is None
+    assert review.count_tasks(project_id, status="Pending") == 3
+
+    # A lease that ran out no longer protects the task
+    expired = review.claim_tasks(project_id, "bob", limit=1, ttl_seconds=-1)[0]
+    assert review.record_decision(expired.id, "Manual Edit", {"id": 0, "city": "Ys"}, owner="alice")
+    with Session(review.engine) as session:
+        assert session.get(ReconciliationTask, expired.id).final_data == {"id": 0, "city": "Ys"}
+
+def test_apply_decisions_by_id_and_key(project_id):
+    ids = [t.id for t in review.query_tasks(project_id)]
+    assert review.backfill_task_keys(project_id) == 4
+    review.claim_tasks(project_id, "reviewer", 1)  # Leases the first task
+
+    results = review.apply_decisions(project_id, [
+        (1, {"task_id": ids[1], "decision": "Accept Source"}),
+        (2, {"key": 3, "decision": "Manual Edit", "final_data": {"city": "Nizza"}}),
+        (3, {"key": "4", "decision": "Keep Target", "status": "Skipped"}),
+        (4, {"task_id": ids[0], "decision": "Keep Target"}),
+        (5, {"key": "99", "decision": "Keep Target"}),
+        (6, {"task_id": ids[2], "decision": "Manual Edit", "final_data": {"siren": "1"}}),
+        (7, {"task_id": ids[2], "decision": "Approve"}),
+    ])
+    assert [r.get("status") for r in results[:3]] == ["Resolved", "Resolved", "Skipped"]
+    assert results[3]["error"] == "task is open in a reviewer's card"
+    assert results[4]["error"] == "key matches 0 tasks"
+    assert results[5]["error"] == "unknown fields: siren"
+    assert results[6]["error"].startswith("decision must be one of")
+
+    with Session(review.engine) as session:
+        tasks = {t.id: t for t in session.exec(select(ReconciliationTask))}
+    assert tasks[ids[1]].final_data["city"] == "Lille"
+    assert tasks[ids[2]].final_data == {"id": 3, "city": "Nizza", "name": "C"}
+    assert tasks[ids[3]].status == "Skipped" and tasks[ids[3]].final_data["city"] == "Brest"
+    assert tasks[ids[0]].status == "Pending"
@@ -0,0 +1,83 @@
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.models import Project, ReconciliationTask
+import app.rules as rules_module
+import app.review as review
+
+FIELD_MAP = {"postcode": "adresse.codePostal", "name": "denomination", "city": "commune"}
+
+@pytest.fixture(name="project_id")
+def project_fixture(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(rules_module, "engine", engine)
+    monkeypatch.setattr(review, "engine", engine)
+
+    with Session(engine) as session:
+        project = Project(name="Rules", mode="API", status="Processing",
+                          mapping_config={"join_key": {"target": "siret"}, "field_map": FIELD_MAP})
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+
+        rows = [
+            ({"siret": "1", "postcode": "75001", "name": "A", "city": ""},
+             {"adresse.codePostal": "75002", "denomination": "AA", "commune": "PARIS"}),
+            ({"siret": "2", "postcode": "69001", "name": "B", "city": "Lyon"},
+             {"adresse.codePostal": "69001", "denomination": "BB", "commune": "LYON"}),
+            ({"siret": "3", "postcode": 13001, "name": "C", "city": None},
+             {"adresse.codePostal": None, "denomination": "C", "commune": None}),
+        ]
+        for target, candidate in rows:
+            session.add(ReconciliationTask(project_id=project.id, target_data=target, candidate_data=candidate))
+        session.commit()
+        return project.id
+
+def load_tasks():
+    with Session(rules_module.engine) as session:
+        return session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id)).all()
+
+RULES = [
+    {"field": "name", "action": "keep_target"},
+    {"field": "postcode", "action": "take_source", "when": "source_differs"},
+    {"field": "city", "action": "take_source", "when": "target_empty"},
+    {"field": "name", "action": "take_source", "when": "source_not_null"},
+]
+
+def test_dry_run_counts_without_writing(project_id):
+    report = rules_module.apply_rules(project_id, RULES, dry_run=True)
+    assert report["pending"] == 3
+    # keep_target counts the tasks it protects; the pinned take_source never fires
+    assert report["per_rule"] == [2, 1, 1, 0]
+    assert report["matched"] == 1
+    assert report["applied"] == 0
+    assert all(t.final_data is None for t in load_tasks())
+
+def test_apply_rules(project_id):
+    report = rules_module.apply_rules(project_id, RULES, dry_run=False)
+    assert report["applied"] == 1
+
+    first, second, third = load_tasks()
+    assert first.status == "Resolved"
+    assert first.decision == rules_module.RULE_DECISION
+    assert first.final_data == {"siret": "1", "postcode": "75002", "name": "A", "city": "PARIS"}
+    assert second.status == "Pending" and second.final_data is None
+    assert third.status == "Pending"
+
+def test_apply_rules_without_resolving_skips_leased(project_id):
+    leased = review.claim_tasks(project_id, "alice", limit=1)
+    rules = [{"field": "name", "action": "take_source", "when": "source_differs"}]
+    report = rules_module.apply_rules(project_id, rules, dry_run=False, resolve=False)
+    assert report["pending"] == 2
+    assert report["applied"] == 1
+
+    first, second, _ = load_tasks()
+    assert first.id == leased[0].id and first.final_data is None
+    assert second.status == "Pending"
+    assert second.final_data["name"] == "BB"
+
+def test_invalid_rules_are_rejected(project_id):
+    with pytest.raises(ValueError, match="not mapped"):
+        rules_module.apply_rules(project_id, [{"field": "siret", "action": "keep_target"}])
+    with pytest.raises(ValueError, match="unknown condition"):
+        rules_module.apply_rules(project_id, [{"field": "name", "action": "take_source", "when": "sometimes"}])
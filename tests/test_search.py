@@ -0,0 +1,118 @@
+import pytest
+from datetime import timedelta
+from sqlmodel import Session, SQLModel, create_engine
+from app.db import create_search_index
+from app.models import Project, ReconciliationTask, utc_now
+import app.review as review
+import app.search as search
+
+
+@pytest.fixture(name="db")
+def db_fixture(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    create_search_index(engine)
+    monkeypatch.setattr(search, "engine", engine)
+    monkeypatch.setattr(review, "engine", engine)
+    return engine
+
+
+def add_project(engine, rows, mode="CSV"):
+    with Session(engine) as session:
+        project = Project(name="Search", mode=mode, status="Validation", mapping_config={})
+        session.add(project)
+        session.commit()
+        ids = []
+        for key, target, candidate in rows:
+            task = ReconciliationTask(project_id=project.id, task_key=key, target_data=target, candidate_data=candidate)
+            session.add(task)
+            session.commit()
+            ids.append(task.id)
+        return project.id, ids
+
+
+def found(project_id, query):
+    return [t.id for t in search.search_tasks(project_id, query)]
+
+
+def test_full_text_search_over_target_and_source(db):
+    project_id, ids = add_project(db, [
+        ("1", {"id": 1, "name": "Boulangerie Dupont", "city": "Sèvres"}, {"nom": "BOULANGERIE DUPONT"}),
+        ("2", {"id": 2, "name": "Garage Martin", "city": "Paris"}, {"nom": "Garage Martin & Fils"}),
+    ])
+    other_id, _ = add_project(db, [("3", {"id": 3, "name": "Dupont Immobilier"}, None)])
+
+    assert found(project_id, "dupont") == [ids[0]]
+    assert found(project_id, "sevres") == [ids[0]]        # accents folded
+    assert found(project_id, "martin fils") == [ids[1]]   # Source values too
+    assert found(project_id, "martin fil") == []
+    assert found(project_id, "boul* sev*") == [ids[0]]
+    assert found(project_id, 'garage ("martin') == [ids[1]]  # no FTS5 syntax from user input
+    assert found(project_id, "lyon") == []
+    assert len(found(other_id, "dupont")) == 1
+
+
+def test_exact_lookups_come_first(db):
+    project_id, ids = add_project(db, [
+        ("35600000000048", {"siret": "35600000000048", "name": "La Poste"}, None),
+        ("73282932000074", {"siret": "73282932000074", "name": "Agence 35600000000048"}, None),
+    ], mode="API")
+
+    assert found(project_id, "356 000 000 00048") == [ids[0]]
+    assert found(project_id, "35600000000048") == [ids[0], ids[1]]
+    assert found(project_id, f"#{ids[1]}") == [ids[1]]
+
+
+def test_index_follows_writes(db):
+    project_id, ids = add_project(db, [("1", {"id": 1, "name": "Old Name"}, None)])
+
+    with Session(db) as session:
+        task = session.get(ReconciliationTask, ids[0])
+        task.candidate_data = {"nom": "Fresh Name"}
+        session.add(task)
+        session.commit()
+    assert found(project_id, "fresh") == [ids[0]]
+
+    # Decisions leave the index alone
+    assert review.record_decision(ids[0], "Manual Edit", {"id": 1, "name": "Golden Name"})
+    assert found(project_id, "golden") == []
+    assert found(project_id, "fresh") == [ids[0]]
+
+    with Session(db) as session:
+        task = session.get(ReconciliationTask, ids[0])
+        task.candidate_data = None
+        session.add(task)
+        session.commit()
+        assert found(project_id, "fresh") == []
+
+        session.delete(session.get(ReconciliationTask, ids[0]))
+        session.commit()
+    assert found(project_id, "old") == []
+
+
+def test_existing_tasks_are_indexed_once(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    SQLModel.metadata.create_all(engine)
+    project_id, ids = add_project(engine, [("1", {"id": 1, "name": "Before Search"}, None)])
+    monkeypatch.setattr(search, "engine", engine)
+
+    create_search_index(engine)
+    create_search_index(engine)
+    assert found(project_id, "before") == ids
+
+
+def test_claim_task_respects_other_leases(db):
+    project_id, ids = add_project(db, [("1", {"id": 1}, None), ("2", {"id": 2}, None)])
+    with Session(db) as session:
+        task = session.get(ReconciliationTask, ids[1])
+        task.lease_owner, task.lease_expires_at = "bob", utc_now() + timedelta(minutes=5)
+        session.add(task)
+        session.commit()
+
+    assert review.claim_task(project_id, ids[0], "alice").lease_owner == "alice"
+    assert review.claim_task(project_id, ids[1], "alice") is None
+    assert review.claim_task(project_id + 1, ids[0], "alice") is None
+
+    # Decided tasks open for another look, without a lease
+    assert review.record_decision(ids[1], "Keep Target", {"id": 2})
+    assert review.claim_task(project_id, ids[1], "alice").status == "Resolved"
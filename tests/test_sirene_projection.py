@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlmodel import Session, SQLModel, create_engine
+from app.models import Project, ReconciliationTask, SireneResponse
+from app.sirene import SireneClient
+import app.engine as engine_module
+import app.raw_store as raw_store
+
+RAW = {
+    "siret": "12345678900012",
+    "siren": "123456789",
+    "uniteLegale": {"denominationUniteLegale": "ACME", "categorieEntreprise": "PME"},
+    "adresseEtablissement": {"codePostalEtablissement": "75001", "libelleCommuneEtablissement": "PARIS"},
+}
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(engine_module, "engine", engine)
+    monkeypatch.setattr(raw_store, "engine", engine)
+    return engine
+
+def test_project_fields_keeps_identifiers():
+    client = SireneClient()
+    flat = client.flatten_json(RAW)
+    projected = client.project_fields(flat, ["adresseEtablissement.codePostalEtablissement", "missing"])
+    assert projected == {
+        "siret": "12345678900012",
+        "siren": "123456789",
+        "adresseEtablissement.codePostalEtablissement": "75001",
+    }
+
+@pytest.mark.anyio
+async def test_fetch_candidate_stores_raw_and_projects(engine):
+    mapping = {"projection": True, "field_map": {"name": "uniteLegale.denominationUniteLegale"}}
+    client = SireneClient("fake_token")
+
+    with patch.object(SireneClient, "fetch_siret", new_callable=AsyncMock) as mock_fetch:
+        mock_fetch.return_value = RAW
+        candidate = await engine_module.fetch_candidate(client, RAW["siret"], mapping)
+
+    assert candidate == {"siret": RAW["siret"], "siren": RAW["siren"], "uniteLegale.denominationUniteLegale": "ACME"}
+    with Session(engine) as session:
+        stored = session.get(SireneResponse, RAW["siret"])
+        assert raw_store.decode_payload(stored.payload) == RAW
+
+def test_reproject_after_mapping_change(engine):
+    raw_store.save_raw_response(RAW["siret"], RAW)
+    with Session(engine) as session:
+        project = Project(name="API", mode="API", status="Processing", mapping_config={
+            "projection": True,
+            "join_key": {"target": "siret"},
+            "field_map": {"city": "adresseEtablissement.libelleCommuneEtablissement"},
+        })
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        task = ReconciliationTask(project_id=project.id, target_data={"siret": RAW["siret"], "city": "Lyon"},
+                                  candidate_data={"siret": RAW["siret"]})
+        unknown = ReconciliationTask(project_id=project.id, target_data={"siret": "999"}, candidate_data={})
+        session.add_all([task, unknown])
+        session.commit()
+        project_id, task_id, unknown_id = project.id, task.id, unknown.id
+
+    assert engine_module.reproject_candidates(project_id) == 1
+
+    with Session(engine) as session:
+        task = session.get(ReconciliationTask, task_id)
+        assert task.candidate_data == {"siret": RAW["siret"], "siren": RAW["siren"],
+                                       "adresseEtablissement.libelleCommuneEtablissement": "PARIS"}
+        assert task.diff_count == 1
+        assert session.get(ReconciliationTask, unknown_id).candidate_data == {}
@@ -1,7 +1,27 @@
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
-from app.sirene import SireneClient, RateLimitExceeded
+from app.sirene import SireneClient, RateLimitExceeded, QuotaGovernor, CircuitBreaker, SireneError
+import app.sirene as sirene
+import asyncio
 import httpx
+import time
+
+@pytest.fixture(autouse=True)
+def governor(monkeypatch):
+    # A fresh, unlimited governor and breaker per test: 429s here would pause the next tests
+    governor = QuotaGovernor(0)
+    monkeypatch.setattr(sirene, "governor", governor)
+    monkeypatch.setattr(sirene, "breaker", CircuitBreaker(threshold=3, cooldown=0.2))
+    monkeypatch.setattr(sirene, "RETRY_BASE_DELAY", 0.001)
+    return governor
+
+def response(status: int, body: dict = None) -> MagicMock:
+    mock_response = MagicMock()
+    mock_response.status_code = status
+    mock_response.headers = {}
+    mock_response.json.return_value = body
+    mock_response.text = ""
+    return mock_response
 
 @pytest.mark.anyio
 async def test_rate_limit_exceeded():
@@ -36,3 +56,70 @@ async def test_rate_limit_default_retry():
             await client.get_by_siret("12345678901234")
 
         assert excinfo.value.retry_after == 60 # Default
+
+@pytest.mark.anyio
+async def test_429_pauses_every_client(governor):
+    mock_response = MagicMock()
+    mock_response.status_code = 429
+    mock_response.headers = {"Retry-After": "1"}
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = mock_response
+        with pytest.raises(RateLimitExceeded):
+            await SireneClient("a").fetch_siret("12345678901234")
+
+    start = time.monotonic()
+    await governor.acquire()
+    assert time.monotonic() - start >= 0.9
+
+@pytest.mark.anyio
+async def test_governor_paces_the_window_and_serves_interactive_first():
+    governor = QuotaGovernor(2, window=0.3)
+    order = []
+
+    async def request(name: str, priority: str) -> None:
+        await governor.acquire(priority)
+        order.append(name)
+
+    start = time.monotonic()
+    background = [asyncio.create_task(request(f"b{i}", "background")) for i in range(3)]
+    await asyncio.sleep(0.05)
+    # Arrives after the background requests, but is served before those still waiting
+    await asyncio.gather(request("i0", "interactive"), *background)
+
+    assert order == ["b0", "b1", "i0", "b2"]
+    # Two requests per 0.3 s window: the last two wait for the first ones to leave it
+    assert time.monotonic() - start >= 0.29
+    assert governor.depth() == {"interactive": 0, "background": 0}
+
+@pytest.mark.anyio
+async def test_transient_errors_are_retried():
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.side_effect = [httpx.ReadTimeout("timed out"), response(503), response(200, {"etablissement": {"siret": "1"}})]
+        assert await SireneClient("a").fetch_siret("12345678901234") == {"siret": "1"}
+        assert mock_get.call_count == 3
+        assert sirene.breaker.failures == 0
+
+        # Not found is an answer, not a failure
+        mock_get.side_effect = [response(404)]
+        assert await SireneClient("a").fetch_siret("12345678901234") is None
+
+        # A client error is not retried
+        mock_get.side_effect = [response(400)]
+        with pytest.raises(SireneError) as excinfo:
+            await SireneClient("a").fetch_siret("12345678901234")
+        assert not excinfo.value.transient
+
+@pytest.mark.anyio
+async def test_circuit_opens_while_the_api_is_down():
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = response(500)
+        with pytest.raises(SireneError, match="HTTP 500 after 4 attempts"):
+            await SireneClient("a").fetch_siret("12345678901234")
+        # The breaker opened on the third failure and held the fourth attempt back for its cooldown
+        assert mock_get.call_count == 4
+        assert sirene.breaker.remaining() > 0
+
+        # Interactive lookups fail fast instead of waiting for the cooldown
+        with pytest.raises(SireneError, match="unavailable"):
+            await SireneClient("a", priority="interactive").fetch_siret("12345678901235")
+        assert mock_get.call_count == 4
@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.duckdb_client import DuckDBClient
+from app.models import Project, ReconciliationTask
+from app.sirene import SireneClient
+import app.engine as engine_module
+import app.siret as siret_module
+import app.raw_store as raw_store
+
+# Valid, with separators, La Poste (fails Luhn, digits sum to 45), valid but lost its
+# leading zero (05521000900019), bad checksum, a SIREN, empty
+CSV = """siret,name
+73282932000074,A
+443 061 841 00047,B
+35600000049837,C
+5521000900019,D
+73282932000075,E
+732829320,F
+,G
+"""
+
+@pytest.fixture(name="make_project")
+def make_project_fixture(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    client = DuckDBClient(":memory:", projects_dir=tmp_path / "projects")
+    monkeypatch.setattr(engine_module, "engine", engine)
+    monkeypatch.setattr(raw_store, "engine", engine)
+    monkeypatch.setattr(engine_module, "duckdb_client", client)
+    monkeypatch.setattr(siret_module, "duckdb_client", client)
+    return lambda text: add_project(engine, client, tmp_path, text)
+
+@pytest.fixture(name="project_id")
+def project_fixture(make_project):
+    return make_project(CSV)
+
+def add_project(engine, client, tmp_path, text):
+    csv = tmp_path / "target.csv"
+    csv.write_text(text)
+    with Session(engine) as session:
+        project = Project(name="API", mode="API", status="Mapping",
+                          mapping_config={"join_key": {"target": "siret"}, "field_map": {}})
+        session.add(project)
+        session.commit()
+        session.refresh(project)
+        project.target_table_name = client.project_table(project.id, "target")
+        client.ingest_csv(project.target_table_name, str(csv))
+        session.add(project)
+        session.commit()
+        return project.id
+
+def test_check_sirets_counts(project_id):
+    table = siret_module.duckdb_client.project_table(project_id, "target")
+    assert siret_module.check_sirets(table, "siret") == {
+        "total": 7, "valid": 4, "normalized": 2, "missing": 1, "format": 1, "checksum": 1,
+    }
+
+def test_numeric_column_gets_its_leading_zeros_back(make_project):
+    project_id = make_project("siret,name\n73282932000074,A\n5521000900019,D\n")
+    table = siret_module.duckdb_client.project_table(project_id, "target")
+    with siret_module.duckdb_client.tables(table):
+        assert siret_module.duckdb_client.query(f"SELECT typeof(siret) FROM {table} LIMIT 1")[0][0] == "BIGINT"
+    assert siret_module.check_sirets(table, "siret") == {
+        "total": 2, "valid": 2, "normalized": 1, "missing": 0, "format": 0, "checksum": 0,
+    }
+
+    assert engine_module.initialize_tasks_api_pre(project_id) == 2
+    with Session(engine_module.engine) as session:
+        tasks = session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id)).all()
+    assert [(t.task_key, t.key_issue) for t in tasks] == [("73282932000074", None), ("05521000900019", None)]
+
+@pytest.mark.anyio
+async def test_invalid_sirets_are_flagged_and_never_fetched(project_id):
+    assert engine_module.initialize_tasks_api_pre(project_id) == 7
+    with Session(engine_module.engine) as session:
+        tasks = session.exec(select(ReconciliationTask).order_by(ReconciliationTask.id)).all()
+    assert [(t.task_key, t.key_issue) for t in tasks] == [
+        ("73282932000074", None),
+        ("44306184100047", None),
+        ("35600000049837", None),
+        ("05521000900019", None),
+        ("73282932000075", "checksum"),
+        ("732829320", "format"),
+        (None, "missing"),
+    ]
+    assert engine_module.key_issue_counts(project_id) == {"checksum": 1, "format": 1, "missing": 1}
+
+    with patch.object(SireneClient, "fetch_siret", new_callable=AsyncMock) as mock_fetch, \
+         patch.object(engine_module.asyncio, "sleep", new_callable=AsyncMock):
+        mock_fetch.return_value = None
+        await engine_module.run_api_worker(project_id)
+    assert sorted(call.args[0] for call in mock_fetch.call_args_list) == [
+        "05521000900019", "35600000049837", "44306184100047", "73282932000074"]
+
+@pytest.mark.anyio
+async def test_repeated_sirets_are_fetched_once(project_id):
+    engine_module.initialize_tasks_api_pre(project_id)
+    with Session(engine_module.engine) as session:
+        session.add(ReconciliationTask(project_id=project_id, target_data={"siret": "73282932000074", "name": "A2"},
+                                       task_key="73282932000074"))
+        session.commit()
+
+    with patch.object(SireneClient, "fetch_siret", new_callable=AsyncMock) as mock_fetch, \
+         patch.object(engine_module.asyncio, "sleep", new_callable=AsyncMock):
+        mock_fetch.return_value = {"siret": "73282932000074"}
+        await engine_module.run_api_worker(project_id)
+    assert [call.args[0] for call in mock_fetch.call_args_list].count("73282932000074") == 1
+
+    with Session(engine_module.engine) as session:
+        repeated = session.exec(select(ReconciliationTask).where(ReconciliationTask.task_key == "73282932000074")).all()
+    assert [t.candidate_data for t in repeated] == [{"siret": "73282932000074"}] * 2
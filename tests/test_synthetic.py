@@ -0,0 +1,16 @@
+import duckdb
+from benchmarks.synthetic import SyntheticSpec, generate_pair
+
+def test_generator_is_deterministic_and_follows_rates(tmp_path):
+    spec = SyntheticSpec(rows=20000, match_rate=0.5, duplicate_rate=0.1, width=3)
+    first = generate_pair(spec, tmp_path / "a")
+    second = generate_pair(spec, tmp_path / "b")
+    assert first["source"].read_bytes() == second["source"].read_bytes()
+
+    conn = duckdb.connect()
+    target = conn.execute(f"SELECT count(*) FROM '{first['target']}'").fetchone()[0]
+    keys, rows = conn.execute(f"SELECT count(DISTINCT siret), count(*) FROM '{first['source']}'").fetchone()
+    assert target == 20000
+    assert abs(keys / target - 0.5) < 0.02
+    assert abs((rows - keys) / keys - 0.1) < 0.02
+    assert conn.execute(f"SELECT * FROM '{first['source']}' LIMIT 0").description[1][0] == "src_col_0"